@@ -0,0 +1,304 @@
+# backend/agent/cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Sentinel returned on a cache miss, so falsy values such as [] can be cached
+MISSING = object()
+
+
+def _size_of(value: Any) -> int:
+    """Approximate size of a cached value in bytes"""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value).encode("utf-8"))
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with an optional TTL and byte budget
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            max_entries: Maximum number of entries kept before evicting the least recently used
+            ttl: Seconds an entry stays valid, or None to keep entries until evicted
+            max_bytes: Maximum total size of the cached values, or None for no size limit
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for a key, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting least recently used entries when full"""
+        if self.max_entries <= 0:
+            return
+        size = _size_of(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self) -> int:
+        """Remove every entry and return how many were removed"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache stored in a SQLite table, with an optional TTL
+    and byte budget
+
+    Values must be JSON serialisable. Several caches can share one database
+    file by using different table names. When a byte budget is set, the least
+    recently used rows are deleted once the table grows past it.
+    """
+
+    def __init__(self, path: str, table: str = "cache", ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: SQLite database file
+            table: Table holding this cache's entries
+            ttl: Seconds an entry stays valid, or None to keep entries until purged
+            max_bytes: Maximum total size of the stored values, or None for no size limit
+        """
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for a key, or MISSING"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at = row
+            if expires_at is not None and expires_at <= time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            if self.max_bytes is not None:
+                self._conn.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        data = json.dumps(value)
+        size = len(data.encode("utf-8"))
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, size, now, now, expires_at)
+            )
+            if self.max_bytes is not None:
+                self._evict_to_budget()
+            self._conn.commit()
+
+    def _evict_to_budget(self) -> None:
+        """Delete least recently used rows until the table fits max_bytes (lock held)"""
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"
+        ).fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows and return how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            self._conn.commit()
+            self.expirations += cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size, total_bytes = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+            return {
+                "size": size,
+                "bytes": total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    Memory LRU tier in front of an optional persistent SQLite tier
+
+    Disk hits are promoted into the memory tier so hot keys stay in-process.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is MISSING and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not MISSING:
+                self.memory.set(key, value)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> int:
+        """Purge both tiers and return how many entries were removed"""
+        count = self.memory.clear()
+        if self.disk is not None:
+            count = max(count, self.disk.clear())
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory": self.memory.stats()
+            }
+        stats["evictions"] = stats["memory"]["evictions"]
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+            stats["evictions"] += stats["disk"]["evictions"]
+        return stats
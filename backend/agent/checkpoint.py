@@ -0,0 +1,256 @@
+# backend/agent/checkpoint.py
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    WRITES_IDX_MAP,
+    get_checkpoint_id,
+    get_checkpoint_metadata
+)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer storing each run's checkpoints in a SQLite file
+
+    Every checkpoint is stored whole (research state is small, and runs are
+    a handful of steps), together with the writes of tasks that finished in
+    the step after it. Checkpoints expire `ttl` seconds after they were
+    written: expired rows are invisible at once and deleted at most every
+    `purge_interval` seconds. Several processes on one host can share the
+    file.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, purge_interval: float = 60.0):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a process-local store)
+            ttl: Seconds a checkpoint can be read back, or None to keep checkpoints until deleted
+            purge_interval: Minimum seconds between deletions of expired rows
+        """
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB NOT NULL, metadata_type TEXT, "
+            "metadata BLOB NOT NULL, created_at REAL NOT NULL, expires_at REAL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB, "
+            "task_path TEXT NOT NULL DEFAULT '', expires_at REAL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_expires ON checkpoints (expires_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checkpoint_writes_expires ON checkpoint_writes (expires_at)")
+        self._conn.commit()
+        self.saved = 0
+        self.expirations = 0
+
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.ttl if self.ttl else None
+
+    def _maybe_purge(self, now: float) -> None:
+        """Delete expired rows if the purge interval has passed (lock held)"""
+        if self.ttl is None or now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        cursor = self._conn.execute("DELETE FROM checkpoints WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._conn.execute("DELETE FROM checkpoint_writes WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self.expirations += cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete expired checkpoints now and return how many were removed"""
+        with self._lock:
+            before = self.expirations
+            self._last_purge = 0.0
+            self._maybe_purge(time.time())
+            self._conn.commit()
+            return self.expirations - before
+
+    def _tuple(self, row: Tuple, thread_id: str, checkpoint_ns: str) -> CheckpointTuple:
+        """Checkpoint tuple of a checkpoints row with its pending writes (lock held)"""
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id
+            }},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id
+                }}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ]
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """The checkpoint named by config, or the thread's latest one if it names none"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND (expires_at IS NULL OR expires_at > ?)"
+        )
+        params: Tuple = (thread_id, checkpoint_ns, time.time())
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            return self._tuple(row, thread_id, checkpoint_ns) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """Checkpoints of a thread (or of every thread without config), newest first"""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints WHERE (expires_at IS NULL OR expires_at > ?)"
+        )
+        params: Tuple = (time.time(),)
+        if config is not None:
+            query += " AND thread_id = ?"
+            params += (config["configurable"]["thread_id"],)
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params += (config["configurable"]["checkpoint_ns"],)
+            if get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params += (get_checkpoint_id(config),)
+        if before is not None and get_checkpoint_id(before):
+            query += " AND checkpoint_id < ?"
+            params += (get_checkpoint_id(before),)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                checkpoint_tuple = self._tuple(tuple(row), thread_id, checkpoint_ns)
+                # Metadata is serialized, so filtering happens after loading
+                if filter and any(checkpoint_tuple.metadata.get(key) != value for key, value in filter.items()):
+                    continue
+                tuples.append(checkpoint_tuple)
+                if limit is not None and len(tuples) >= limit:
+                    break
+        yield from tuples
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        """Save a checkpoint and return the config that points at it"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data, now, self._expires_at(now))
+            )
+            self._maybe_purge(now)
+            self._conn.commit()
+            self.saved += 1
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]
+        }}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        """Save the writes of a task that finished after the checkpoint in config"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        now = time.time()
+        rows = []
+        for index, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, index),
+                         channel, type_, data, task_path, self._expires_at(now)))
+        columns = "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path, expires_at)"
+        with self._lock:
+            # Special writes (errors, interrupts) replace earlier ones; regular writes keep the first saved
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO checkpoint_writes {columns} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] < 0]
+            )
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO checkpoint_writes {columns} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] >= 0]
+            )
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint and write of a thread"""
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM checkpoint_writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    # The async executor uses the same local SQLite calls; they are short and do not wait on the network
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints WHERE expires_at IS NULL OR expires_at > ?",
+                (time.time(),)
+            ).fetchone()
+            return {
+                "threads": threads,
+                "checkpoints": checkpoints,
+                "saved": self.saved,
+                "expirations": self.expirations,
+                "ttl": self.ttl
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,151 @@
+# backend/agent/context.py
+import re
+from typing import Any, Dict, List, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from .tools import estimate_tokens
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words too common to say anything about relevance
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which",
+    "who", "why", "with"
+}
+
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Jaccard similarity of snippet shingles
+
+
+def _normalize_url(url: str) -> str:
+    """Canonical form of a URL for duplicate detection (no fragment, tracking params or trailing slash)"""
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.startswith("utm_")])
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+def tokenize_terms(text: str) -> List[str]:
+    """Lowercased content words of a text, without stopwords"""
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _format_result(index: int, result: Dict[str, Any], with_content: bool = True) -> str:
+    block = (
+        f"Result {index}:\n"
+        f"Title: {result.get('title', 'No title')}\n"
+        f"Source: {result.get('link', 'No link')}\n"
+        f"Snippet: {result.get('snippet', 'No snippet')}\n"
+    )
+    if with_content and result.get("content"):
+        block += f"Page text: {result['content']}\n"
+    return block
+
+
+def deduplicate_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Drop results whose URL was already seen or whose snippet nearly repeats a kept one
+
+    Args:
+        results: Search results in their original order
+
+    Returns:
+        The first occurrence of each distinct result, order preserved
+    """
+    kept = []
+    seen_urls = set()
+    kept_shingles: List[Set[Tuple[str, ...]]] = []
+
+    for result in results:
+        link = result.get("link", "")
+        if link:
+            url = _normalize_url(link)
+            if url in seen_urls:
+                continue
+        shingles = _shingles(result.get("snippet", ""))
+        if shingles and any(
+            len(shingles & other) / len(shingles | other) >= NEAR_DUPLICATE_THRESHOLD
+            for other in kept_shingles
+        ):
+            continue
+        if link:
+            seen_urls.add(url)
+        kept_shingles.append(shingles)
+        kept.append(result)
+    return kept
+
+
+def rank_results(query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order results by how many of the query's terms their title and snippet cover
+
+    Title matches count double. Ties keep the original search order, which
+    already reflects the search engine's own ranking.
+    """
+    query_terms = set(tokenize_terms(query))
+    if not query_terms:
+        return list(results)
+
+    def score(item: Tuple[int, Dict[str, Any]]) -> Tuple[float, int]:
+        position, result = item
+        title_terms = set(tokenize_terms(result.get("title", "")))
+        snippet_terms = set(tokenize_terms(result.get("snippet", "")))
+        matched = 2 * len(query_terms & title_terms) + len(query_terms & snippet_terms)
+        return (-matched / len(query_terms), position)
+
+    return [result for _, result in sorted(enumerate(results), key=score)]
+
+
+def pack_search_results(query: str, results: List[Dict[str, Any]], token_budget: int) -> Tuple[str, Dict[str, int]]:
+    """
+    Build the search results section of the synthesis prompt within a token budget
+
+    Results are deduplicated, ranked against the query and added best-first
+    until the budget is spent. A result carrying fetched page text that does
+    not fit is added with its snippet alone if that fits.
+
+    Args:
+        query: Original research query
+        results: Search results from every planned query
+        token_budget: Maximum estimated tokens for the packed text
+
+    Returns:
+        Tuple of the packed text and statistics about what was kept and saved
+    """
+    unpacked_tokens = sum(
+        estimate_tokens(_format_result(i, result)) for i, result in enumerate(results, 1)
+    )
+    unique = deduplicate_results(results)
+    ranked = rank_results(query, unique)
+
+    blocks = []
+    used_tokens = 0
+    for result in ranked:
+        block = _format_result(len(blocks) + 1, result)
+        tokens = estimate_tokens(block)
+        if used_tokens + tokens > token_budget and result.get("content"):
+            block = _format_result(len(blocks) + 1, result, with_content=False)
+            tokens = estimate_tokens(block)
+        if used_tokens + tokens > token_budget:
+            continue
+        blocks.append(block)
+        used_tokens += tokens
+
+    stats = {
+        "results_in": len(results),
+        "duplicates_removed": len(results) - len(unique),
+        "results_packed": len(blocks),
+        "results_dropped": len(unique) - len(blocks),
+        "token_budget": token_budget,
+        "tokens_packed": used_tokens,
+        "tokens_saved": max(0, unpacked_tokens - used_tokens)
+    }
+    return "\n".join(blocks), stats
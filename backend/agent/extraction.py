@@ -0,0 +1,272 @@
+# backend/agent/extraction.py
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+# Keywords that mark a dictionary as a JSON Schema node rather than shorthand fields
+_SCHEMA_KEYWORDS = {
+    "type", "properties", "items", "description", "required", "enum", "title", "default",
+    "format", "additionalProperties", "minItems", "maxItems"
+}
+_TYPES = {"string", "number", "integer", "boolean", "object", "array"}
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_MAX_CUTS = 20  # Incomplete trailing members dropped before giving up on a truncated reply
+
+
+def _is_schema_node(value: Dict[str, Any]) -> bool:
+    return bool(value) and set(value) <= _SCHEMA_KEYWORDS and ("type" in value or "properties" in value)
+
+
+def normalize_schema(schema: Any) -> Dict[str, Any]:
+    """
+    JSON Schema form of an extraction schema
+
+    Accepts JSON Schema ({"type": "object", "properties": {...}}) or the
+    shorthand of field names mapped to type names, nested objects and
+    one-element lists: {"name": "string", "tags": ["string"],
+    "address": {"city": "string"}}. A string that is not a type name is kept
+    as the description of a string field.
+    """
+    if isinstance(schema, dict):
+        if _is_schema_node(schema):
+            node = dict(schema)
+            if isinstance(node.get("properties"), dict):
+                node["properties"] = {key: normalize_schema(value) for key, value in node["properties"].items()}
+                node.setdefault("type", "object")
+            if "items" in node:
+                node["items"] = normalize_schema(node["items"])
+            return node
+        return {"type": "object", "properties": {key: normalize_schema(value) for key, value in schema.items()}}
+    if isinstance(schema, list):
+        return {"type": "array", "items": normalize_schema(schema[0]) if schema else {}}
+    if isinstance(schema, str):
+        name = schema.strip().lower()
+        return {"type": name} if name in _TYPES else {"type": "string", "description": schema}
+    return {}
+
+
+def chunk_text(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars
+
+    Chunks end at paragraph breaks where possible, then at sentence ends;
+    only a single sentence longer than max_chars is cut mid-sentence.
+    """
+    max_chars = max(1, max_chars)
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        if current and len(current) + 2 + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _close(text: str) -> Tuple[str, List[int]]:
+    """
+    Make a possibly truncated JSON text well-formed
+
+    Drops trailing commas, stray closers, text after the top-level value
+    and a last object member that has no value yet, closes an unterminated
+    string and appends the closers of every open array and object.
+
+    Returns:
+        The closed text and the positions in text of commas between
+        members, for dropping the last member when the result still fails
+    """
+    out: List[str] = []
+    stack: List[Tuple[str, int]] = []  # Closer and where the current member starts in out
+    commas: List[int] = []
+    in_string = False
+    escape = False
+
+    def drop_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+
+    for position, char in enumerate(text):
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            out.append(char)
+            stack.append(("}" if char == "{" else "]", len(out)))
+        elif char in "}]":
+            if not stack or stack[-1][0] != char:
+                continue
+            drop_trailing_comma()
+            out.append(char)
+            stack.pop()
+            if not stack:
+                break
+        elif char == ",":
+            if stack:
+                commas.append(position)
+                out.append(char)
+                stack[-1] = (stack[-1][0], len(out))
+        else:
+            out.append(char)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    if stack and stack[-1][0] == "}":
+        # An object member cut off before its value ("key" or "key":) is dropped
+        member = "".join(out[stack[-1][1]:]).strip()
+        if member and not re.match(r'^"(?:[^"\\]|\\.)*"\s*:\s*\S', member, re.DOTALL):
+            del out[stack[-1][1]:]
+    drop_trailing_comma()
+    return "".join(out) + "".join(closer for closer, _ in reversed(stack)), commas
+
+
+def repair_json(text: str) -> Tuple[Any, bool]:
+    """
+    Parse a model's JSON reply, repairing common damage locally
+
+    Handles Markdown code fences, prose around the JSON, trailing commas
+    and output truncated mid-string, mid-array or mid-object (incomplete
+    trailing members are dropped).
+
+    Returns:
+        Tuple of the parsed value and whether it needed repair
+
+    Raises:
+        ValueError: If no JSON value can be recovered
+    """
+    try:
+        return json.loads(text), False
+    except ValueError:
+        pass
+    fence = _FENCE.search(text)
+    candidate = fence.group(1) if fence else text
+    starts = [index for index in (candidate.find("{"), candidate.find("[")) if index >= 0]
+    if not starts:
+        raise ValueError("No JSON object in the reply")
+    candidate = candidate[min(starts):]
+    try:
+        return json.JSONDecoder().raw_decode(candidate)[0], True
+    except ValueError:
+        pass
+    for _ in range(_MAX_CUTS):
+        closed, commas = _close(candidate)
+        try:
+            return json.loads(closed), True
+        except ValueError as e:
+            if not commas:
+                raise ValueError(f"Invalid JSON: {str(e)}")
+            candidate = candidate[:commas[-1]]
+    raise ValueError("Invalid JSON: too many incomplete members")
+
+
+def _default(node: Dict[str, Any]) -> Any:
+    if node.get("type") == "array":
+        return []
+    if node.get("type") == "object" and isinstance(node.get("properties"), dict):
+        return conform({}, node)
+    return None
+
+
+def conform(value: Any, node: Dict[str, Any]) -> Any:
+    """
+    Fit an extracted value to its schema node
+
+    Object properties missing from the value get their defaults (null, or
+    an empty list for arrays) and unknown properties are dropped; a single
+    value where a list is expected becomes a one-element list, and numbers,
+    booleans and strings are converted where the conversion is unambiguous.
+    Values that cannot be converted become null.
+    """
+    kind = node.get("type")
+    if value is None:
+        return _default(node)
+    if kind == "object" or "properties" in node:
+        if not isinstance(value, dict):
+            return _default(node)
+        properties = node.get("properties")
+        if not isinstance(properties, dict):
+            return value
+        return {key: conform(value.get(key), child) for key, child in properties.items()}
+    if kind == "array":
+        items = value if isinstance(value, list) else [value]
+        child = node.get("items") or {}
+        return [item for item in (conform(item, child) for item in items) if item not in (None, "", [], {})]
+    if kind == "string":
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return str(value).strip()
+    if kind in ("number", "integer"):
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, str):
+            match = _NUMBER.search(value.replace(",", ""))
+            if not match:
+                return None
+            value = float(match.group())
+        if not isinstance(value, (int, float)):
+            return None
+        return int(value) if kind == "integer" else value
+    if kind == "boolean":
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ("true", "yes", "false", "no"):
+            return value.strip().lower() in ("true", "yes")
+        return None
+    return value
+
+
+def merge_extractions(values: List[Any], node: Dict[str, Any]) -> Any:
+    """
+    Merge conformed per-chunk extractions, in document order
+
+    Objects merge property by property, lists are concatenated without
+    repeating equal items, and for anything else the first chunk that
+    gives a value wins.
+    """
+    if node.get("type") == "object" and isinstance(node.get("properties"), dict):
+        dicts = [value for value in values if isinstance(value, dict)]
+        return {
+            key: merge_extractions([value.get(key) for value in dicts], child)
+            for key, child in node["properties"].items()
+        }
+    if node.get("type") == "array":
+        merged, seen = [], set()
+        for value in values:
+            for item in value or []:
+                key = json.dumps(item, sort_keys=True)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(item)
+        return merged
+    for value in values:
+        if value not in (None, ""):
+            return value
+    return _default(node)
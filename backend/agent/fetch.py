@@ -0,0 +1,553 @@
+# backend/agent/fetch.py
+import asyncio
+import atexit
+import codecs
+import ipaddress
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    PAGE_FETCH_MAX_WORKERS, PAGE_FETCH_PER_HOST, PAGE_FETCH_TIMEOUT, PAGE_FETCH_MAX_BYTES, PAGE_TEXT_MAX_CHARS,
+    PAGE_FETCH_ALLOW_PRIVATE, PAGE_FETCH_USER_AGENT, PAGE_CACHE_SIZE, PAGE_CACHE_FRESH_SECONDS, PAGE_CACHE_TTL,
+    PAGE_CACHE_DB, HTTP_CONNECT_TIMEOUT, ASYNC_HTTP_MAX_CONNECTIONS, HTTP_POOL_SIZE
+)
+from .cache import LRUCache, SQLiteCache, TieredCache, MISSING
+from .metrics import UPSTREAM_SECONDS, PAGE_FETCHES
+
+CHUNK_SIZE = 8192  # Bytes read per step; the byte cap, text cap and deadline are checked between steps
+MAX_REDIRECTS = 3
+HOST_POOLS = 100  # Hosts whose keep-alive connections the sync session keeps
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+class MainTextExtractor(HTMLParser):
+    """
+    Streaming main-text extraction from HTML
+
+    Fed the page piece by piece as it downloads, so only the text kept so
+    far is held in memory (plus, inside a script or style element that has
+    not been closed yet, its contents, which the byte cap bounds). Script, style, navigation and other boilerplate
+    elements are skipped; the remaining text is split into blocks at
+    block-level tags, and blocks that are too short or mostly link text
+    (menus, breadcrumbs, tag lists) are dropped. Once max_chars of text are
+    kept, `done` turns true so the caller can stop downloading.
+    """
+
+    SKIP_TAGS = {
+        "title", "script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer",
+        "aside", "form", "button", "select", "textarea"
+    }
+    BLOCK_TAGS = {
+        "p", "div", "li", "ul", "ol", "dl", "dt", "dd", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote",
+        "pre", "table", "tr", "td", "th", "article", "section", "main", "figcaption", "body"
+    }
+
+    def __init__(self, max_chars: int = PAGE_TEXT_MAX_CHARS, min_words: int = 6, max_link_density: float = 0.5):
+        """
+        Args:
+            max_chars: Text to keep before extraction stops
+            min_words: Blocks with fewer words are dropped
+            max_link_density: Blocks with a larger share of their text inside links are dropped
+        """
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.min_words = min_words
+        self.max_link_density = max_link_density
+        self.blocks: List[str] = []
+        self.chars = 0
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._parts: List[str] = []
+        self._link_chars = 0
+
+    @property
+    def done(self) -> bool:
+        return self.chars >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "a":
+            self._link_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def _end_block(self) -> None:
+        text = " ".join("".join(self._parts).split())
+        link_chars = self._link_chars
+        self._parts = []
+        self._link_chars = 0
+        if not text or self.done:
+            return
+        if len(text.split()) < self.min_words or link_chars / len(text) > self.max_link_density:
+            return
+        self.blocks.append(text)
+        self.chars += len(text) + 1
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+    def text(self) -> str:
+        return "\n".join(self.blocks)[:self.max_chars]
+
+
+class PageReader:
+    """
+    Decodes and extracts one response body as it streams in
+
+    Stops asking for more once the byte cap or the extracted text cap is
+    reached. Plain text pages are kept as they are, whitespace collapsed.
+    """
+
+    def __init__(self, content_type: str, max_bytes: int = PAGE_FETCH_MAX_BYTES, max_chars: int = PAGE_TEXT_MAX_CHARS):
+        match = _CHARSET.search(content_type)
+        charset = match.group(1) if match else "utf-8"
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            charset = "utf-8"
+        self._decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.bytes = 0
+        self.truncated = False  # Stopped at the byte cap before the text cap
+        self._extractor = None if content_type.startswith("text/plain") else MainTextExtractor(max_chars)
+        self._plain: List[str] = []
+        self._plain_chars = 0
+
+    @property
+    def done(self) -> bool:
+        if self.truncated:
+            return True
+        if self._extractor is not None:
+            return self._extractor.done
+        return self._plain_chars >= self.max_chars
+
+    def feed(self, chunk: bytes) -> bool:
+        """Feed the next piece of the body; returns False once no more is needed"""
+        remaining = self.max_bytes - self.bytes
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self.bytes += len(chunk)
+        self._feed_text(self._decoder.decode(chunk))
+        return not self.done
+
+    def _feed_text(self, text: str) -> None:
+        if self._extractor is not None:
+            self._extractor.feed(text)
+        elif self._plain_chars < self.max_chars:
+            self._plain.append(text)
+            self._plain_chars += len(text)
+
+    def text(self) -> str:
+        self._feed_text(self._decoder.decode(b"", final=True))
+        if self._extractor is not None:
+            self._extractor.close()
+            return self._extractor.text()
+        return " ".join("".join(self._plain).split())[:self.max_chars]
+
+
+class HostLimiter:
+    """
+    Caps concurrent downloads per host across every run
+
+    Threads share one semaphore per host; each event loop has its own
+    asyncio semaphores. Entries are dropped once no download holds or waits
+    for them, so the tables only hold hosts being fetched right now.
+    """
+
+    def __init__(self, per_host: int = PAGE_FETCH_PER_HOST):
+        self.per_host = max(1, per_host)
+        self._lock = threading.Lock()
+        self._threads: Dict[str, list] = {}
+        self._loops: Dict[Tuple[asyncio.AbstractEventLoop, str], list] = {}
+        self.waits = 0  # Downloads that had to wait for their host
+
+    def _enter(self, table: Dict, key: Any, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = [factory(), 0]
+            entry[1] += 1
+            if entry[1] > self.per_host:
+                self.waits += 1
+            return entry[0]
+
+    def _exit(self, table: Dict, key: Any) -> None:
+        with self._lock:
+            entry = table[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del table[key]
+
+    def acquire(self, host: str, timeout: float) -> bool:
+        """Take a slot for host, waiting at most timeout seconds; release() it when done"""
+        semaphore = self._enter(self._threads, host, lambda: threading.BoundedSemaphore(self.per_host))
+        if semaphore.acquire(timeout=max(0.0, timeout)):
+            return True
+        self._exit(self._threads, host)
+        return False
+
+    def release(self, host: str) -> None:
+        self._threads[host][0].release()
+        self._exit(self._threads, host)
+
+    async def aacquire(self, host: str, timeout: float) -> bool:
+        """acquire() for the running event loop; release with arelease()"""
+        key = (asyncio.get_running_loop(), host)
+        semaphore = self._enter(self._loops, key, lambda: asyncio.Semaphore(self.per_host))
+        try:
+            await asyncio.wait_for(semaphore.acquire(), max(0.0, timeout))
+            return True
+        except asyncio.TimeoutError:
+            self._exit(self._loops, key)
+            return False
+
+    def arelease(self, host: str) -> None:
+        key = (asyncio.get_running_loop(), host)
+        self._loops[key][0].release()
+        self._exit(self._loops, key)
+
+
+class PageTimeout(Exception):
+    """A page was not read within its deadline"""
+
+
+# Extracted text keyed on the URL (fragment removed), with the validators to revalidate it
+page_cache = TieredCache(
+    LRUCache(max_entries=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL),
+    SQLiteCache(PAGE_CACHE_DB, table="page_cache", ttl=PAGE_CACHE_TTL) if PAGE_CACHE_DB else None
+)
+host_limiter = HostLimiter()
+
+# One sync session for every page host: pages come from many hosts, so unlike the
+# upstream sessions in tools.py it keeps pools for HOST_POOLS hosts and never retries
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=HOST_POOLS, pool_maxsize=PAGE_FETCH_PER_HOST, max_retries=0))
+_session.mount("https://", HTTPAdapter(pool_connections=HOST_POOLS, pool_maxsize=PAGE_FETCH_PER_HOST, max_retries=0))
+atexit.register(_session.close)
+
+# Async clients for page downloads, one per event loop, kept apart from the
+# Serper/Groq pool so slow pages never hold connection slots LLM calls need
+_async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_POOL_SIZE),
+            timeout=httpx.Timeout(PAGE_FETCH_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_page_client() -> None:
+    """Close the running loop's page client (call before the loop shuts down)"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def is_fetchable(url: str) -> bool:
+    """
+    Whether a URL may be fetched: http(s) only, and no localhost or private
+    IP address unless PAGE_FETCH_ALLOW_PRIVATE is set
+
+    Host names are not resolved, so this stops search results and redirects
+    pointing straight at internal addresses, not names that resolve to them.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    if PAGE_FETCH_ALLOW_PRIVATE:
+        return True
+    host = parts.hostname.lower()
+    if host == "localhost" or host.endswith(".localhost"):
+        return False
+    try:
+        return ipaddress.ip_address(host).is_global
+    except ValueError:
+        return True
+
+
+def _cache_key(url: str) -> str:
+    return urldefrag(url.strip()).url
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _request_headers(cached: Any) -> Dict[str, str]:
+    headers = {"User-Agent": PAGE_FETCH_USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9"}
+    if cached is not MISSING:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+def _page(url: str, outcome: str, text: str = "", size: int = 0) -> Dict[str, Any]:
+    return {"url": url, "outcome": outcome, "text": text, "bytes": size}
+
+
+def _start_page(url: str, status: int, headers: Any, cached: Any) -> Tuple[Optional[Dict[str, Any]], Optional[PageReader]]:
+    """
+    Decide what to do with a response before reading its body
+
+    Returns:
+        (page, None) when the response is final without a body: not modified,
+        an error status or a content type that is not text; otherwise
+        (None, reader) to stream the body into
+    """
+    if status == 304 and cached is not MISSING:
+        return _page(url, "revalidated", cached["text"]), None
+    if status != 200:
+        return _page(url, "error"), None
+    content_type = (headers.get("Content-Type") or "text/html").lower()
+    if not content_type.startswith(TEXT_CONTENT_TYPES):
+        return _page(url, "skipped"), None
+    return None, PageReader(content_type)
+
+
+def _finish_page(url: str, reader: PageReader, headers: Any, use_cache: bool, timed_out: bool = False) -> Dict[str, Any]:
+    text = reader.text()
+    if timed_out:
+        # Whatever was extracted is still used, but a partial page is not cached
+        return _page(url, "timeout", text, reader.bytes)
+    if use_cache:
+        page_cache.set(_cache_key(url), {
+            "text": text,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "checked_at": time.time()
+        })
+    return _page(url, "truncated" if reader.truncated else "ok", text, reader.bytes)
+
+
+def _revalidated(url: str, cached: Dict[str, Any], use_cache: bool) -> None:
+    if use_cache:
+        page_cache.set(_cache_key(url), {**cached, "checked_at": time.time()})
+
+
+def _lookup(url: str, use_cache: bool) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Cached entry for a URL (or MISSING) and the page to return as is when it is still fresh"""
+    if not use_cache:
+        return MISSING, None
+    cached = page_cache.get(_cache_key(url))
+    if cached is not MISSING and time.time() - cached["checked_at"] < PAGE_CACHE_FRESH_SECONDS:
+        return cached, _page(url, "cached", cached["text"])
+    return cached, None
+
+
+def _record(url: str, page: Dict[str, Any], started: float) -> Dict[str, Any]:
+    page["url"] = url
+    PAGE_FETCHES.inc(page["outcome"])
+    if page["outcome"] != "cached":
+        UPSTREAM_SECONDS.observe(time.monotonic() - started, "page", "", page["outcome"])
+    return page
+
+
+def _get(url: str, cached: Any, use_cache: bool, deadline: float) -> Dict[str, Any]:
+    for _ in range(MAX_REDIRECTS + 1):
+        if not is_fetchable(url):
+            return _page(url, "skipped")
+        host = _host(url)
+        if not host_limiter.acquire(host, deadline - time.monotonic()):
+            raise PageTimeout(url)
+        try:
+            remaining = max(0.1, deadline - time.monotonic())
+            with _session.get(url, headers=_request_headers(cached), stream=True, allow_redirects=False,
+                              timeout=(min(HTTP_CONNECT_TIMEOUT, remaining), remaining)) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["Location"])
+                    continue
+                page, reader = _start_page(url, response.status_code, response.headers, cached)
+                if reader is None:
+                    if page["outcome"] == "revalidated":
+                        _revalidated(url, cached, use_cache)
+                    return page
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if not reader.feed(chunk):
+                        break
+                    if time.monotonic() > deadline:
+                        return _finish_page(url, reader, response.headers, use_cache, timed_out=True)
+                return _finish_page(url, reader, response.headers, use_cache)
+        finally:
+            host_limiter.release(host)
+    return _page(url, "error")
+
+
+def fetch_page(url: str, use_cache: bool = True, timeout: float = PAGE_FETCH_TIMEOUT) -> Dict[str, Any]:
+    """
+    Download a page and extract its main text
+
+    The body is streamed through the extractor and the download stops at
+    PAGE_FETCH_MAX_BYTES, once PAGE_TEXT_MAX_CHARS of text are extracted or
+    when the deadline passes. Extracted text is cached by URL; after
+    PAGE_CACHE_FRESH_SECONDS the entry is revalidated with its ETag or
+    Last-Modified date, and a 304 reuses the cached text.
+
+    Args:
+        url: Page URL (http or https)
+        use_cache: Serve and store extracted text through the page cache
+        timeout: Seconds allowed for the page, including waiting for a host slot
+
+    Returns:
+        Dictionary with url, outcome ("ok", "truncated", "cached",
+        "revalidated", "skipped", "timeout" or "error"), text and bytes read
+    """
+    cached, fresh = _lookup(url, use_cache)
+    started = time.monotonic()
+    if fresh is not None:
+        return _record(url, fresh, started)
+    try:
+        page = _get(url, cached, use_cache, started + timeout)
+    except (PageTimeout, requests.exceptions.Timeout):
+        page = _page(url, "timeout")
+    except Exception as e:
+        print(f"Error fetching page {url}: {str(e)}")
+        page = _page(url, "error")
+    return _record(url, page, started)
+
+
+async def _aget(url: str, cached: Any, use_cache: bool, deadline: float) -> Dict[str, Any]:
+    client = _get_async_client()
+    for _ in range(MAX_REDIRECTS + 1):
+        if not is_fetchable(url):
+            return _page(url, "skipped")
+        host = _host(url)
+        if not await host_limiter.aacquire(host, deadline - time.monotonic()):
+            raise PageTimeout(url)
+        try:
+            remaining = max(0.1, deadline - time.monotonic())
+            request = client.build_request("GET", url, headers=_request_headers(cached),
+                                           timeout=httpx.Timeout(remaining, connect=min(HTTP_CONNECT_TIMEOUT, remaining)))
+            response = await client.send(request, stream=True)
+            try:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["Location"])
+                    continue
+                page, reader = _start_page(url, response.status_code, response.headers, cached)
+                if reader is None:
+                    if page["outcome"] == "revalidated":
+                        _revalidated(url, cached, use_cache)
+                    return page
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    if not reader.feed(chunk):
+                        break
+                    if time.monotonic() > deadline:
+                        return _finish_page(url, reader, response.headers, use_cache, timed_out=True)
+                return _finish_page(url, reader, response.headers, use_cache)
+            finally:
+                await response.aclose()
+        finally:
+            host_limiter.arelease(host)
+    return _page(url, "error")
+
+
+async def afetch_page(url: str, use_cache: bool = True, timeout: float = PAGE_FETCH_TIMEOUT) -> Dict[str, Any]:
+    """
+    Download a page and extract its main text without blocking the event loop
+
+    Same arguments, limits, caching and result as fetch_page.
+    """
+    cached, fresh = _lookup(url, use_cache)
+    started = time.monotonic()
+    if fresh is not None:
+        return _record(url, fresh, started)
+    try:
+        page = await asyncio.wait_for(_aget(url, cached, use_cache, started + timeout), timeout + 1)
+    except (PageTimeout, asyncio.TimeoutError, httpx.TimeoutException):
+        page = _page(url, "timeout")
+    except Exception as e:
+        print(f"Error fetching page {url}: {str(e)}")
+        page = _page(url, "error")
+    return _record(url, page, started)
+
+
+def fetch_pages(urls: List[str], use_cache: bool = True, max_workers: int = PAGE_FETCH_MAX_WORKERS,
+                on_page: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch several pages concurrently on a small worker pool
+
+    Args:
+        urls: Page URLs
+        use_cache: Serve and store extracted text through the page cache
+        max_workers: Pages downloaded at once (each host is further capped by PAGE_FETCH_PER_HOST)
+        on_page: Called with each page as it finishes
+
+    Returns:
+        One page dictionary per URL, in the order of urls
+    """
+    if not urls:
+        return []
+    max_workers = max(1, min(max_workers, len(urls)))
+    rounds = -(-len(urls) // max_workers)
+    pages: List[Dict[str, Any]] = [_page(url, "timeout") for url in urls]
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page-fetch")
+    futures = {executor.submit(fetch_page, url, use_cache): i for i, url in enumerate(urls)}
+    try:
+        for future in as_completed(futures, timeout=PAGE_FETCH_TIMEOUT * rounds + 1):
+            pages[futures[future]] = future.result()
+            if on_page:
+                on_page(pages[futures[future]])
+    except FuturesTimeoutError:
+        pass  # Pages still downloading are reported as timed out
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return pages
+
+
+async def afetch_pages(urls: List[str], use_cache: bool = True, max_workers: int = PAGE_FETCH_MAX_WORKERS,
+                       on_page: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """fetch_pages on the event loop; same arguments and result"""
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def fetch(url: str) -> Dict[str, Any]:
+        async with semaphore:
+            page = await afetch_page(url, use_cache)
+        if on_page:
+            on_page(page)
+        return page
+
+    return list(await asyncio.gather(*(fetch(url) for url in urls)))
+
+
+def get_page_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss/eviction counters for the page text cache"""
+    return page_cache.stats()
+
+
+def purge_page_cache() -> int:
+    """Drop every cached page and return how many entries were removed"""
+    return page_cache.clear()
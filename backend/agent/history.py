@@ -1,10 +1,380 @@
 # backend/agent/history.py
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from collections import deque
+import json
+import sqlite3
+import threading
 import time
+import uuid
+import zlib
+from config import (
+    HISTORY_BACKEND,
+    HISTORY_DB_PATH,
+    HISTORY_MAX_ENTRIES_PER_USER,
+    HISTORY_RETENTION_DAYS
+)
 
-# Simple in-memory storage for chat history
-# In a production app, you'd use a database instead
-chat_histories = {}
+
+class HistoryStore:
+    """
+    Storage backend for research history
+
+    Entries are dictionaries with id, timestamp, query and results keys.
+    Implementations keep each user's entries in timestamp order and apply the
+    retention policy (maximum entries per user, maximum age) as they go.
+    `on_remove`, if set, is called with the ids of entries that were cleared
+    or dropped by the retention policy, so indexes over them can follow.
+    """
+
+    def __init__(self, max_entries_per_user: int = HISTORY_MAX_ENTRIES_PER_USER,
+                 retention_days: float = HISTORY_RETENTION_DAYS):
+        """
+        Args:
+            max_entries_per_user: Newest entries kept per user (0 keeps everything)
+            retention_days: Age after which entries are dropped (0 keeps them forever)
+        """
+        self.max_entries_per_user = max_entries_per_user
+        self.retention_seconds = retention_days * 86400 if retention_days else None
+        self.on_remove: Optional[Callable[[List[str]], None]] = None
+
+    def _cutoff(self) -> Optional[float]:
+        return time.time() - self.retention_seconds if self.retention_seconds else None
+
+    def _removed(self, entry_ids: List[str]) -> None:
+        """Report removed entries to on_remove (called without the store's lock)"""
+        if entry_ids and self.on_remove:
+            self.on_remove(entry_ids)
+
+    def append(self, user_id: str, entry: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def list_entries(self, user_id: str, limit: Optional[int] = None,
+                     before: Optional[float] = None, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retained entries for a user, newest first (ties on timestamp by descending id)
+
+        Args:
+            user_id: Identifier for the user
+            limit: Maximum number of entries to return, or None for all
+            before: Only return entries older than this timestamp (pagination cursor)
+            before_id: With before, also return entries at exactly that
+                timestamp whose id sorts below this one, so a page boundary
+                inside a run of equal timestamps skips nothing
+        """
+        raise NotImplementedError
+
+    def list_summaries(self, user_id: str, limit: Optional[int] = None,
+                       before: Optional[float] = None, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Like list_entries, but only the summary fields (no results payload)"""
+        raise NotImplementedError
+
+    def get_entry(self, user_id: str, entry_id: str) -> Optional[Dict[str, Any]]:
+        """A single full entry, or None if the user has no such entry"""
+        raise NotImplementedError
+
+    def list_recent(self, limit: int, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Newest full entries across all users, optionally only those written after `since`"""
+        raise NotImplementedError
+
+    def clear(self, user_id: str) -> bool:
+        raise NotImplementedError
+
+
+def history_cursor(entry: Dict[str, Any]) -> str:
+    """Pagination cursor for the entries after this one ("<timestamp>:<id>")"""
+    return f"{entry['timestamp']!r}:{entry['id']}"
+
+
+def parse_history_cursor(cursor: str) -> Tuple[float, Optional[str]]:
+    """
+    The (before, before_id) pair encoded by history_cursor
+
+    A bare timestamp is accepted too, as cursors were before ids were added.
+
+    Raises:
+        ValueError: If the timestamp part is not a number
+    """
+    timestamp, _, entry_id = cursor.partition(":")
+    return float(timestamp), entry_id or None
+
+
+def _is_before(entry: Dict[str, Any], before: Optional[float], before_id: Optional[str]) -> bool:
+    if before is None:
+        return True
+    if before_id is None:
+        return entry["timestamp"] < before
+    return (entry["timestamp"], entry["id"]) < (before, before_id)
+
+
+def summarize_entry(entry: Dict[str, Any], size: int) -> Dict[str, Any]:
+    """Lightweight projection of a history entry for listings"""
+    results = entry.get("results") or {}
+    return {
+        "id": entry["id"],
+        "timestamp": entry["timestamp"],
+        "query": entry["query"],
+        "model": results.get("model"),
+        "status": results.get("status"),
+        "size": size
+    }
+
+
+class InMemoryHistoryStore(HistoryStore):
+    """
+    Per-process history kept in bounded per-user deques
+
+    Each slot holds (entry, summary); the summary is computed once on append.
+    A user whose entries have all expired or been cleared is dropped, and
+    every PURGE_INTERVAL appends all users are swept for expired entries, so
+    one-off (anonymous) users do not accumulate.
+    """
+
+    PURGE_INTERVAL = 100  # Appends between sweeps of expired entries
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._histories: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    def _expire(self, user_id: str, entries: deque) -> List[str]:
+        """
+        Drop entries older than the retention window from the oldest end, and
+        the user once empty (lock held); returns the dropped entry IDs
+        """
+        cutoff = self._cutoff()
+        expired = []
+        while cutoff is not None and entries and entries[0][0]["timestamp"] < cutoff:
+            expired.append(entries.popleft()[0]["id"])
+        if not entries:
+            self._histories.pop(user_id, None)
+        return expired
+
+    def _purge(self) -> List[str]:
+        """Expire entries for every user (lock held)"""
+        expired = []
+        for user_id, entries in list(self._histories.items()):
+            expired += self._expire(user_id, entries)
+        return expired
+
+    def append(self, user_id: str, entry: Dict[str, Any]) -> None:
+        summary = summarize_entry(entry, len(json.dumps(entry["results"]).encode("utf-8")))
+        with self._lock:
+            entries = self._histories.get(user_id)
+            if entries is None:
+                entries = deque(maxlen=self.max_entries_per_user or None)
+                self._histories[user_id] = entries
+            # A full deque drops its oldest entry on append
+            removed = [entries[0][0]["id"]] if entries.maxlen and len(entries) == entries.maxlen else []
+            entries.append((entry, summary))
+            removed += self._expire(user_id, entries)
+            self._inserts += 1
+            if self._inserts % self.PURGE_INTERVAL == 0:
+                removed += self._purge()
+        self._removed(removed)
+
+    def _page(self, user_id: str, limit: Optional[int], before: Optional[float],
+              before_id: Optional[str]) -> List[tuple]:
+        page = []
+        with self._lock:
+            entries = self._histories.get(user_id)
+            if not entries:
+                return []
+            expired = self._expire(user_id, entries)
+            # Appends arrive in timestamp order, so walking from the right is newest first
+            for slot in reversed(entries):
+                if not _is_before(slot[0], before, before_id):
+                    continue
+                # Past the limit, only entries tied with the last one can still sort ahead of it
+                if limit is not None and len(page) >= limit and slot[0]["timestamp"] < page[-1][0]["timestamp"]:
+                    break
+                page.append(slot)
+        self._removed(expired)
+        page.sort(key=lambda slot: (slot[0]["timestamp"], slot[0]["id"]), reverse=True)
+        return page[:limit]
+
+    def list_entries(self, user_id: str, limit: Optional[int] = None,
+                     before: Optional[float] = None, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [entry for entry, _ in self._page(user_id, limit, before, before_id)]
+
+    def list_summaries(self, user_id: str, limit: Optional[int] = None,
+                       before: Optional[float] = None, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [summary for _, summary in self._page(user_id, limit, before, before_id)]
+
+    def get_entry(self, user_id: str, entry_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for entry, _ in reversed(self._histories.get(user_id, ())):
+                if entry["id"] == entry_id:
+                    return entry
+        return None
+
+    def list_recent(self, limit: int, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            expired = self._purge()
+            entries = [
+                entry
+                for slots in self._histories.values()
+                for entry, _ in slots
+                if since is None or entry["timestamp"] >= since
+            ]
+        self._removed(expired)
+        entries.sort(key=lambda entry: entry["timestamp"], reverse=True)
+        return entries[:limit]
+
+    def clear(self, user_id: str) -> bool:
+        with self._lock:
+            entries = self._histories.pop(user_id, None)
+        if entries is None:
+            return False
+        self._removed([entry["id"] for entry, _ in entries])
+        return True
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    History persisted in an embedded SQLite database (WAL mode)
+
+    Rows are insert-only and indexed by (user_id, timestamp), so listing a
+    user's history reads the index in order instead of sorting. The results
+    payload is stored as zlib-compressed JSON. The database file can be
+    shared by several worker processes.
+    """
+
+    PURGE_INTERVAL = 100  # Inserts between sweeps of expired entries
+
+    def __init__(self, path: str = HISTORY_DB_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, timestamp REAL NOT NULL, query TEXT NOT NULL, "
+            "model TEXT, status TEXT, size INTEGER NOT NULL, results BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_user_time ON history (user_id, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_time ON history (timestamp)")
+        self._conn.commit()
+
+    def append(self, user_id: str, entry: Dict[str, Any]) -> None:
+        payload = json.dumps(entry["results"]).encode("utf-8")
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO history (id, user_id, timestamp, query, model, status, size, results) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry["id"], user_id, entry["timestamp"], entry["query"],
+                    entry["results"].get("model"), entry["results"].get("status"),
+                    len(payload), zlib.compress(payload)
+                )
+            )
+            removed = []
+            if self.max_entries_per_user:
+                # Only the oldest rows beyond the cap are touched, via the (user_id, timestamp) index
+                removed += self._delete(
+                    "user_id = ? AND timestamp <= ("
+                    "SELECT timestamp FROM history WHERE user_id = ? ORDER BY timestamp DESC LIMIT 1 OFFSET ?)",
+                    (user_id, user_id, self.max_entries_per_user)
+                )
+            self._inserts += 1
+            cutoff = self._cutoff()
+            if cutoff is not None and self._inserts % self.PURGE_INTERVAL == 0:
+                removed += self._delete("timestamp < ?", (cutoff,))
+            self._conn.commit()
+        self._removed(removed)
+
+    def _delete(self, where: str, params: tuple) -> List[str]:
+        """Delete the matching rows and return their IDs (lock held, caller commits)"""
+        ids = [row[0] for row in self._conn.execute(f"SELECT id FROM history WHERE {where}", params)]
+        if ids:
+            self._conn.execute(f"DELETE FROM history WHERE {where}", params)
+        return ids
+
+    def _select(self, columns: str, user_id: str, limit: Optional[int], before: Optional[float],
+                before_id: Optional[str]) -> List[tuple]:
+        sql = f"SELECT {columns} FROM history WHERE user_id = ? AND timestamp >= ?"
+        params = [user_id, self._cutoff() or 0]
+        if before is not None and before_id is not None:
+            sql += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+            params += [before, before, before_id]
+        elif before is not None:
+            sql += " AND timestamp < ?"
+            params.append(before)
+        # The (user_id, timestamp) index gives the order; id only breaks ties
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _entry_from_row(row: tuple) -> Dict[str, Any]:
+        entry_id, timestamp, query, results = row
+        return {
+            "id": entry_id,
+            "timestamp": timestamp,
+            "query": query,
+            "results": json.loads(zlib.decompress(results))
+        }
+
+    def list_entries(self, user_id: str, limit: Optional[int] = None,
+                     before: Optional[float] = None, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self._select("id, timestamp, query, results", user_id, limit, before, before_id)
+        return [self._entry_from_row(row) for row in rows]
+
+    def list_summaries(self, user_id: str, limit: Optional[int] = None,
+                       before: Optional[float] = None, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Summaries come straight from the columns; the compressed payload is never read
+        rows = self._select("id, timestamp, query, model, status, size", user_id, limit, before, before_id)
+        return [
+            {"id": entry_id, "timestamp": timestamp, "query": query, "model": model, "status": status, "size": size}
+            for entry_id, timestamp, query, model, status, size in rows
+        ]
+
+    def get_entry(self, user_id: str, entry_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, timestamp, query, results FROM history WHERE id = ? AND user_id = ?",
+                (entry_id, user_id)
+            ).fetchone()
+        return self._entry_from_row(row) if row else None
+
+    def list_recent(self, limit: int, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        since = max(since or 0, self._cutoff() or 0)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, timestamp, query, results FROM history WHERE timestamp >= ? ORDER BY timestamp DESC LIMIT ?",
+                (since, limit)
+            ).fetchall()
+        return [self._entry_from_row(row) for row in rows]
+
+    def clear(self, user_id: str) -> bool:
+        with self._lock:
+            removed = self._delete("user_id = ?", (user_id,))
+            self._conn.commit()
+        self._removed(removed)
+        return bool(removed)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_history_store(backend: str = HISTORY_BACKEND) -> HistoryStore:
+    """Create the history store selected by HISTORY_BACKEND ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        return SQLiteHistoryStore()
+    if backend == "memory":
+        return InMemoryHistoryStore()
+    raise ValueError(f"Unknown history backend: {backend}")
+
+
+# Shared history store used by the API
+history_store = create_history_store()
 
 def save_research_query(user_id: str, query: str, results: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -16,41 +386,48 @@ def save_research_query(user_id: str, query: str, results: Dict[str, Any]) -> Di
     Returns:
         The saved history entry with timestamp
     """
-    if user_id not in chat_histories:
-        chat_histories[user_id] = []
-    
+    now = time.time()
+
     # Create history entry
     entry = {
-        "id": f"query_{int(time.time())}",
-        "timestamp": time.time(),
+        "id": f"query_{int(now * 1000)}_{uuid.uuid4().hex[:8]}",
+        "timestamp": now,
         "query": query,
         "results": results
     }
-    
+
     # Add to history
-    chat_histories[user_id].append(entry)
-    
+    history_store.append(user_id, entry)
+
     return entry
 
-def get_user_history(user_id: str) -> List[Dict[str, Any]]:
+def get_user_history(user_id: str, limit: Optional[int] = None, before: Optional[float] = None,
+                     summary: bool = False, before_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Get all history entries for a user
+    Get history entries for a user
     Args:
         user_id: Identifier for the user
+        limit: Maximum number of entries to return (all if None)
+        before: Only return entries older than this timestamp
+        summary: Return only id, query, model, status, timestamp and size
+        before_id: With before, also return entries at that timestamp with a lower id
     Returns:
         List of history entries, sorted by timestamp (newest first)
     """
-    if user_id not in chat_histories:
-        return []
-    
-    # Sort by timestamp, newest first
-    sorted_history = sorted(
-        chat_histories[user_id], 
-        key=lambda x: x["timestamp"], 
-        reverse=True
-    )
-    
-    return sorted_history
+    if summary:
+        return history_store.list_summaries(user_id, limit=limit, before=before, before_id=before_id)
+    return history_store.list_entries(user_id, limit=limit, before=before, before_id=before_id)
+
+def get_history_entry(user_id: str, entry_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a single full history entry
+    Args:
+        user_id: Identifier for the user
+        entry_id: ID of the history entry
+    Returns:
+        The entry including its results, or None if not found
+    """
+    return history_store.get_entry(user_id, entry_id)
 
 def clear_user_history(user_id: str) -> bool:
     """
@@ -60,7 +437,4 @@ def clear_user_history(user_id: str) -> bool:
     Returns:
         True if history was cleared, False if user had no history
     """
-    if user_id in chat_histories:
-        chat_histories[user_id] = []
-        return True
-    return False
\ No newline at end of file
+    return history_store.clear(user_id)
@@ -0,0 +1,191 @@
+# backend/agent/metrics.py
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import METRICS_LATENCY_BUCKETS
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Named metric with a fixed set of labels; one series per label-value combination"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Tuple[str, ...]) -> LabelValues:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self._samples())
+
+
+class _ValueMetric(_Metric):
+    """
+    One value per series, either updated in-process or computed at scrape time
+
+    A collector function returning {label values: value} is called each time
+    the registry is rendered, for values another component already tracks.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 collector: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labels)
+        self.collector = collector
+        self._values: Dict[LabelValues, float] = {}
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self.collector:
+            values.update({self._key(tuple(key)): value for key, value in self.collector().items()})
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Counter(_ValueMetric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ValueMetric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observed values (e.g. seconds)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = METRICS_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = sorted(float(bucket) for bucket in buckets)
+        # Per series: non-cumulative bucket counts (last one is +Inf), sum, count
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, (total, count)) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {int(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = (),
+                collector: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labels, collector))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = (),
+              collector: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, collector))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = METRICS_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Shared registry; the API layer adds scrape-time gauges for queue and cache state
+registry = MetricsRegistry()
+
+NODE_SECONDS = registry.histogram(
+    "research_node_seconds", "Time spent in each research graph node", ("node", "mode")
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "upstream_request_seconds", "Duration of Serper, Groq and result page calls, cache hits excluded",
+    ("service", "model", "outcome")
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens reported in Groq's usage field", ("model", "kind")
+)
+RESEARCH_RUNS = registry.counter(
+    "research_runs_total", "Research runs finished by the agent", ("mode", "status")
+)
+RESEARCH_SECONDS = registry.histogram(
+    "research_run_seconds", "Wall-clock time of whole research runs", ("mode",)
+)
+PAGE_FETCHES = registry.counter(
+    "page_fetches_total", "Result pages read by the fetching stage, cache hits included", ("outcome",)
+)
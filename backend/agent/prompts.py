@@ -58,3 +58,54 @@ Reflect on the following:
 
 Identify any improvements needed and explain why they would enhance the research quality.
 """
+
+SUB_TOPIC_SUMMARY_PROMPT = """
+You are researching: "{query}"
+
+Summarize what the search results below say about the sub-topic: "{sub_query}"
+
+Search results:
+{search_results}
+
+Keep only facts relevant to the research topic, cite the source URL after each fact,
+and note anything the results leave unanswered. Use at most 200 words of bullet points.
+"""
+
+SUMMARY_MERGE_PROMPT = """
+Combine the sub-topic summaries below into a comprehensive response about: "{query}"
+
+Sub-topic summaries:
+{summaries}
+
+Your response should:
+1. Provide a clear overview of the topic
+2. Merge overlapping findings and point out where the summaries disagree
+3. Structure the information logically
+4. Keep the citations to sources from the summaries
+5. Highlight any limitations or gaps in the information
+
+Format the response in a clean, readable structure with appropriate headings and sections.
+"""
+
+EXTRACTION_PROMPT = """
+Extract information from the following text according to this JSON schema:
+
+{schema}
+
+Text{part}:
+{text}
+
+Return only a valid JSON object that follows the schema exactly.
+Use null for values the text does not give and an empty list for lists without items.
+"""
+
+EXTRACTION_CORRECTION_PROMPT = """
+Your previous answer could not be used: {problem}
+
+Previous answer:
+{response}
+
+Return only the corrected JSON object, following this JSON schema exactly:
+
+{schema}
+"""
@@ -0,0 +1,53 @@
+# backend/agent/quality.py
+import re
+from typing import Any, Dict, List, Tuple
+from .context import tokenize_terms
+from .tools import is_llm_error
+
+_HEADING_OR_BULLET = re.compile(r"^\s*(#{1,6}\s|[-*•]\s|\d+[.)]\s)", re.MULTILINE)
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+_NUMBERED_CITATION = re.compile(r"\[\d+\]")
+
+TARGET_WORDS = 250  # A draft this long is considered complete enough
+TARGET_STRUCTURE = 3  # Headings or list items
+TARGET_CITATIONS = 3  # Distinct sources referenced
+
+
+def assess_research_quality(query: str, research: str, search_results: List[Dict[str, Any]]) -> Tuple[float, Dict[str, float]]:
+    """
+    Score a research draft with cheap local heuristics
+
+    The score averages four checks, each between 0 and 1: length, structure
+    (headings and lists), citations of the search results, and coverage of
+    the query's terms.
+
+    Args:
+        query: Original research query
+        research: Draft research text
+        search_results: Results the draft was written from
+
+    Returns:
+        Tuple of the overall score and the individual check scores
+    """
+    if is_llm_error(research):
+        return 0.0, {"length": 0.0, "structure": 0.0, "citations": 0.0, "coverage": 0.0}
+
+    words = len(research.split())
+    structure = len(_HEADING_OR_BULLET.findall(research))
+
+    known_links = {result.get("link", "").rstrip("/") for result in search_results if result.get("link")}
+    cited = {url.rstrip("/.,;") for url in _URL.findall(research)}
+    citations = len(cited & known_links) if known_links else len(cited)
+    citations = max(citations, len(set(_NUMBERED_CITATION.findall(research))))
+
+    query_terms = set(tokenize_terms(query))
+    research_terms = set(tokenize_terms(research))
+    coverage = len(query_terms & research_terms) / len(query_terms) if query_terms else 1.0
+
+    checks = {
+        "length": min(1.0, words / TARGET_WORDS),
+        "structure": min(1.0, structure / TARGET_STRUCTURE),
+        "citations": min(1.0, citations / TARGET_CITATIONS),
+        "coverage": coverage
+    }
+    return sum(checks.values()) / len(checks), checks
@@ -0,0 +1,228 @@
+# backend/agent/ratelimit.py
+import re
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket using reservations
+
+    A reservation debits the bucket immediately, even into the negative, and
+    returns how long the caller must wait before its share has refilled. This
+    keeps concurrent callers in arrival order without holding the lock while
+    sleeping.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            capacity: Maximum tokens the bucket holds (the allowed burst)
+            refill_per_second: Tokens added back every second
+            clock: Monotonic source of the current time (replaced in tests)
+        """
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+            self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Debit tokens and return the seconds to wait before using them
+
+        Requests larger than the bucket are clamped to its capacity so they
+        wait for a full bucket instead of forever.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= amount
+            wait = -self._tokens / self.refill_per_second if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until the tokens are available and return the seconds waited"""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def adjust(self, delta: float) -> None:
+        """Add (positive) or remove (negative) tokens, e.g. to reconcile an estimate"""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens = min(self.capacity, self._tokens + delta)
+
+    def sync(self, remaining: float, reset_seconds: Optional[float] = None) -> None:
+        """
+        Align the bucket with the upstream's view of the remaining quota
+
+        The local level is only ever lowered. When nothing is left and the
+        upstream reports when the window resets, the bucket blocks until then.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if remaining < self._tokens:
+                self._tokens = float(remaining)
+            if remaining <= 0 and reset_seconds:
+                self._blocked_until = max(self._blocked_until, now + reset_seconds)
+
+    def block_for(self, seconds: float) -> None:
+        """Refuse to hand out tokens for the next number of seconds"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def headroom(self) -> float:
+        """Share of the capacity available right now: 0 when empty, overdrawn or blocked, 1 when full"""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if self._blocked_until > now:
+                return 0.0
+            return max(0.0, self._tokens / self.capacity)
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit duration such as "7.66s", "2m59.56s", "120ms" or "30"
+
+    Returns:
+        Seconds as a float, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class ModelRateLimiter:
+    """
+    Per-model limiter covering requests-per-minute and tokens-per-minute
+
+    Each model gets its own pair of token buckets, so research threads using
+    different models never wait on each other. The buckets adapt to the
+    rate-limit headers returned by the API (x-ratelimit-* and Retry-After).
+    """
+
+    def __init__(self, limits: Mapping[str, Mapping[str, int]], default_limits: Mapping[str, int],
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            limits: Per-model {"rpm": ..., "tpm": ...} quotas
+            default_limits: Quota used for models missing from limits
+            clock: Monotonic source of the current time for the buckets (replaced in tests)
+        """
+        self.limits = dict(limits)
+        self.default_limits = dict(default_limits)
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def _get_buckets(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            with self._lock:
+                buckets = self._buckets.get(model)
+                if buckets is None:
+                    limits = self.limits.get(model, self.default_limits)
+                    buckets = (
+                        TokenBucket(limits["rpm"], limits["rpm"] / 60.0, clock=self._clock),
+                        TokenBucket(limits["tpm"], limits["tpm"] / 60.0, clock=self._clock)
+                    )
+                    self._buckets[model] = buckets
+        return buckets
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """
+        Debit one request and the estimated tokens for a model without blocking
+
+        Returns:
+            Seconds the caller must wait before sending the request (async
+            callers sleep this long on their event loop)
+        """
+        requests_bucket, tokens_bucket = self._get_buckets(model)
+        return max(requests_bucket.reserve(1), tokens_bucket.reserve(tokens))
+
+    def acquire(self, model: str, tokens: int) -> float:
+        """
+        Block until one request and the estimated tokens are available for a model
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve(model, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def headroom(self, model: str) -> float:
+        """
+        Share of a model's request and token quota still available, from 0 to 1
+
+        Background work such as research batches checks this before starting
+        more calls, so it backs off while interactive requests use the quota.
+        """
+        return min(bucket.headroom() for bucket in self._get_buckets(model))
+
+    def record_usage(self, model: str, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known"""
+        _, tokens_bucket = self._get_buckets(model)
+        tokens_bucket.adjust(estimated_tokens - actual_tokens)
+
+    def update_from_headers(self, model: str, headers: Mapping[str, str]) -> None:
+        """
+        Adapt a model's buckets to the rate-limit headers of a response
+
+        Args:
+            model: Model the response belongs to
+            headers: Response headers (case-insensitive mapping)
+        """
+        requests_bucket, tokens_bucket = self._get_buckets(model)
+
+        for bucket, kind in ((requests_bucket, "requests"), (tokens_bucket, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            bucket.sync(remaining, parse_duration(headers.get(f"x-ratelimit-reset-{kind}")))
+
+        retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after:
+            requests_bucket.block_for(retry_after)
+
+    def block(self, model: str, seconds: float) -> None:
+        """Stop handing out requests for a model, e.g. after a 429 without headers"""
+        requests_bucket, _ = self._get_buckets(model)
+        requests_bucket.block_for(seconds)
@@ -1,203 +1,1019 @@
 # backend/agent/researcher.py (modified)
-from typing import Dict, List, Any, Tuple, Optional, TypedDict, Annotated, Callable
+from typing import Dict, List, Any, Tuple, Optional, TypedDict, Annotated, Callable, Union
+import asyncio
 import json
+import operator
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from pydantic import BaseModel, Field
-from .tools import search_web, query_llm, extract_information
+from .tools import search_web, query_llm, async_search_web, async_query_llm, extract_information, model_router, is_llm_error
+from .checkpoint import SQLiteCheckpointSaver
+from .fetch import fetch_pages as fetch_page_texts, afetch_pages as afetch_page_texts
+from .context import pack_search_results, deduplicate_results, rank_results
+from .quality import assess_research_quality
+from .metrics import NODE_SECONDS, RESEARCH_RUNS, RESEARCH_SECONDS
 from .prompts import (
     RESEARCHER_SYSTEM_PROMPT,
     SEARCH_PLANNING_PROMPT,
     INFORMATION_SYNTHESIS_PROMPT,
-    REFLECTION_PROMPT
+    REFLECTION_PROMPT,
+    SUB_TOPIC_SUMMARY_PROMPT,
+    SUMMARY_MERGE_PROMPT
 )
+from config import (
+    SEARCH_MAX_WORKERS, SEARCH_TIMEOUT, SEARCH_CONTEXT_BUDGETS, DEFAULT_SEARCH_CONTEXT_BUDGET, DEFAULT_MODEL,
+    PIPELINE_MODES, DEFAULT_PIPELINE_MODE, REFLECTION_QUALITY_THRESHOLD, MAPREDUCE_MAX_CONCURRENCY,
+    PAGE_FETCH_ENABLED, PAGE_FETCH_MAX_PAGES, CHECKPOINT_DB, CHECKPOINT_TTL, CHECKPOINT_PURGE_INTERVAL
+)
+
+def merge_usage(current: Optional[Dict[str, int]], update: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """State reducer adding up the LLM call and token counters reported by each node"""
+    merged = dict(current or {})
+    for key, value in (update or {}).items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+def keep_first(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """State reducer keeping the first error when parallel map steps fail in the same step"""
+    return current or update
+
+def keep_last(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """State reducer for fields that parallel map steps may all set to the same value"""
+    return update
 
 # Define the state schema as a TypedDict
 class ResearchState(TypedDict, total=False):
     query: str
     model: str  # Added model field
+    mode: str  # Pipeline mode: "fast", "standard", "thorough" or "mapreduce"
     search_queries: List[str]
     search_results: List[Dict[str, Any]]
+    search_results_by_query: List[List[Dict[str, Any]]]  # Parallel to search_queries
+    fetch_pages: bool  # Read the top result pages before synthesis
+    fetch_stats: Dict[str, int]  # Fetched pages per outcome
+    summaries: Annotated[List[Dict[str, Any]], operator.add]  # Map step output, one per sub-topic
+    context_stats: Dict[str, int]
     draft_research: str
+    quality: Dict[str, Any]
     final_research: str
-    status: str
+    usage: Annotated[Dict[str, int], merge_usage]
+    timings: Annotated[Dict[str, float], merge_usage]  # Seconds spent per node; parallel map steps add up
+    status: Annotated[str, keep_last]
     progress: Dict[str, Any]
-    error: Optional[str]
+    error: Annotated[Optional[str], keep_first]
+
+# Input of one map step in mapreduce mode, sent to the summarizing node per planned query
+class SubTopicState(TypedDict):
+    query: str
+    model: str
+    mode: str
+    sub_query: str
+    index: int
+    total: int
+    results: List[Dict[str, Any]]
+
+# Per-run callbacks travel in the run config, so one compiled graph serves every request
+def get_progress_callback(config: Optional[RunnableConfig]) -> Optional[Callable[[Dict[str, Any]], None]]:
+    return (config or {}).get("configurable", {}).get("progress_callback")
+
+def get_chunk_callback(config: Optional[RunnableConfig]) -> Optional[Callable[[str, str], None]]:
+    return (config or {}).get("configurable", {}).get("chunk_callback")
+
+def get_use_cache(config: Optional[RunnableConfig]) -> bool:
+    """Whether this run may serve searches and completions from the caches"""
+    return (config or {}).get("configurable", {}).get("use_cache", True)
 
-def create_research_agent(progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+# Helper function to report progress
+def report_progress(state: ResearchState, config: RunnableConfig, step: str, message: str, percent: float) -> None:
+    """Report progress through the run's callback if available"""
+    progress_callback = get_progress_callback(config)
+    if progress_callback:
+        progress_data = {
+            "step": step,
+            "message": message,
+            "percent": percent,
+            "query": state.get("query", "")
+        }
+        state["progress"] = progress_data
+        progress_callback(progress_data)
+
+def stream_to(config: RunnableConfig, stage: str) -> Optional[Callable[[str], None]]:
+    """Token callback forwarding generated text for a stage, if streaming is enabled"""
+    chunk_callback = get_chunk_callback(config)
+    if not chunk_callback:
+        return None
+    return lambda text: chunk_callback(stage, text)
+
+class CompletionError(Exception):
+    """Raised in a node whose LLM call returned query_llm's error string instead of a completion"""
+
+class ResearchCancelled(Exception):
     """
-    Create and return a research agent using LangGraph
+    Raised by a run's progress callback to stop the run
     
-    Args:
-        progress_callback: Optional callback function to report progress
+    Nodes let it through instead of recording it as the node's error, so
+    the graph stops at the next progress report and the caller sees it.
     """
-    # Helper function to report progress
-    def report_progress(state: ResearchState, step: str, message: str, percent: float) -> None:
-        """Report progress through the callback if available"""
-        if progress_callback:
-            progress_data = {
-                "step": step,
-                "message": message,
-                "percent": percent,
-                "query": state.get("query", "")
-            }
-            state["progress"] = progress_data
-            progress_callback(progress_data)
-
-    # Define the graph nodes (steps in the research process)
-    def plan_search_queries(state: ResearchState) -> ResearchState:
-        """Generate search queries based on the research question"""
-        try:
-            report_progress(state, "planning", "Planning search queries...", 10)
-            
-            prompt = SEARCH_PLANNING_PROMPT.format(query=state["query"])
-            report_progress(state, "planning", f"Generating optimal search queries using {state.get('model', 'default model')}...", 15)
-            
-            response = query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"))
-            
-            # Extract search queries from the response
-            queries = []
-            for line in response.split("\n"):
-                if line.strip().startswith("- Search Query"):
-                    query_text = line.split(":", 1)[1].strip() if ":" in line else ""
-                    if query_text:
-                        queries.append(query_text)
-            
-            if not queries:
-                queries = [state["query"]]
-            
-            report_progress(state, "planning", f"Generated {len(queries)} search queries", 20)    
-                
-            return {"search_queries": queries, "status": "searching"}
-        except Exception as e:
-            report_progress(state, "error", f"Error in planning search: {str(e)}", 0)
-            return {"error": f"Error in planning search: {str(e)}", "status": "error"}
-    
-    def execute_searches(state: ResearchState) -> ResearchState:
-        """Execute the planned search queries"""
-        try:
-            all_results = []
-            query_count = len(state["search_queries"])
-            
-            report_progress(state, "searching", f"Starting web searches with {query_count} queries...", 25)
-            
-            for i, query in enumerate(state["search_queries"]):
-                percent = 25 + (i / query_count * 25)  # Progress from 25% to 50%
-                report_progress(state, "searching", f"Searching the web [{i+1}/{query_count}]: '{query}'", percent)
-                
-                results = search_web(query)
-                all_results.extend(results)
-                
-                report_progress(state, "searching", f"Found {len(results)} results for query {i+1}", percent + 5)
-            
-            report_progress(state, "searching", f"Web search complete. Found {len(all_results)} total results", 50)
-            
-            return {"search_results": all_results, "status": "synthesizing"}
-        except Exception as e:
-            report_progress(state, "error", f"Error in executing searches: {str(e)}", 0)
-            return {"error": f"Error in executing searches: {str(e)}", "status": "error"}
+
+def completion(response: str) -> str:
+    """
+    A node's LLM output, failing the node if the call failed
     
-    def synthesize_information(state: ResearchState) -> ResearchState:
-        """Synthesize information from search results"""
-        try:
-            report_progress(state, "synthesizing", "Analyzing search results...", 55)
-            
-            search_results_text = ""
-            result_count = len(state["search_results"])
-            
-            report_progress(state, "synthesizing", f"Processing {result_count} search results...", 60)
-            
-            for i, result in enumerate(state["search_results"], 1):
-                search_results_text += f"Result {i}:\n"
-                search_results_text += f"Title: {result.get('title', 'No title')}\n"
-                search_results_text += f"Source: {result.get('link', 'No link')}\n"
-                search_results_text += f"Snippet: {result.get('snippet', 'No snippet')}\n\n"
-            
-            report_progress(state, "synthesizing", f"Synthesizing information using {state.get('model', 'default model')}...", 65)
+    Without this, "Error: Max retries reached..." would become the draft or
+    the final research of a run reported as completed.
+    """
+    if is_llm_error(response):
+        raise CompletionError(response)
+    return response
+
+def parse_search_queries(response: str, query: str) -> List[str]:
+    """Extract the planned search queries from the planning response, falling back to the query itself"""
+    queries = []
+    for line in response.split("\n"):
+        if line.strip().startswith("- Search Query"):
+            query_text = line.split(":", 1)[1].strip() if ":" in line else ""
+            if query_text:
+                queries.append(query_text)
+    
+    return queries or [query]
+
+def build_synthesis_prompt(state: ResearchState, config: RunnableConfig) -> Tuple[str, Dict[str, int]]:
+    """Pack the search results into the model's context budget and build the synthesis prompt"""
+    report_progress(state, config, "synthesizing", "Analyzing search results...", 55)
+    
+    result_count = len(state["search_results"])
+    
+    report_progress(state, config, "synthesizing", f"Processing {result_count} search results...", 60)
+    
+    # Deduplicate, rank and trim the results to what the model can use
+    token_budget = SEARCH_CONTEXT_BUDGETS.get(state.get("model") or DEFAULT_MODEL, DEFAULT_SEARCH_CONTEXT_BUDGET)
+    search_results_text, context_stats = pack_search_results(
+        state["query"], state["search_results"], token_budget
+    )
+    
+    report_progress(
+        state,
+        config,
+        "synthesizing",
+        f"Packed {context_stats['results_packed']} of {result_count} results "
+        f"({context_stats['duplicates_removed']} duplicates removed, ~{context_stats['tokens_saved']} tokens saved)",
+        62
+    )
+    
+    report_progress(state, config, "synthesizing", f"Synthesizing information using {state.get('model', 'default model')}...", 65)
+    
+    prompt = INFORMATION_SYNTHESIS_PROMPT.format(
+        query=state["query"],
+        search_results=search_results_text
+    )
+    
+    report_progress(state, config, "synthesizing", "Generating initial research draft...", 70)
+    return prompt, context_stats
+
+def build_improvement_prompt(draft_research: str, reflection: str) -> str:
+    """Prompt asking the model to rewrite its draft according to its own reflection"""
+    return f"""
+        Your original research:
+        
+        {draft_research}
+        
+        Your reflection on areas to improve:
+        
+        {reflection}
+        
+        Now, provide an improved version of the research that addresses these points.
+        """
+
+def map_model_for(state: Dict[str, Any]) -> str:
+    """Model expected to write the sub-topic summaries in mapreduce mode (sizes their context budget)"""
+    return model_router.preferred("summarizing", state.get("model"))
+
+def build_sub_topic_prompt(state: SubTopicState, model: str) -> Tuple[str, Dict[str, int]]:
+    """Pack one planned query's results into the map model's budget and build its summary prompt"""
+    token_budget = SEARCH_CONTEXT_BUDGETS.get(model, DEFAULT_SEARCH_CONTEXT_BUDGET)
+    search_results_text, context_stats = pack_search_results(state["sub_query"], state["results"], token_budget)
+    prompt = SUB_TOPIC_SUMMARY_PROMPT.format(
+        query=state["query"],
+        sub_query=state["sub_query"],
+        search_results=search_results_text
+    )
+    return prompt, context_stats
+
+def build_merge_prompt(state: ResearchState, config: RunnableConfig) -> Tuple[str, Dict[str, int]]:
+    """Order the sub-topic summaries by planned query and build the reduce prompt"""
+    summaries = sorted(state.get("summaries", []), key=lambda summary: summary["index"])
+    
+    report_progress(
+        state,
+        config,
+        "synthesizing",
+        f"Merging {len(summaries)} sub-topic summaries using {state.get('model', 'default model')}...",
+        65
+    )
+    
+    # The reduce step sees every packed result through the summaries, so add up their packing stats
+    context_stats: Dict[str, int] = {"sub_topics": len(summaries)}
+    for summary in summaries:
+        for key, value in summary["context_stats"].items():
+            context_stats[key] = context_stats.get(key, 0) + value
+    
+    summaries_text = "\n\n".join(
+        f"### Sub-topic {summary['index'] + 1}: {summary['query']}\n{summary['summary']}"
+        for summary in summaries
+    ) or "No search results were found."
+    prompt = SUMMARY_MERGE_PROMPT.format(query=state["query"], summaries=summaries_text)
+    
+    report_progress(state, config, "synthesizing", "Generating research draft from the summaries...", 70)
+    return prompt, context_stats
+
+def sub_topic_summary(state: SubTopicState, summary: str, context_stats: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "index": state["index"],
+        "query": state["sub_query"],
+        "summary": summary,
+        "context_stats": context_stats
+    }
+
+def after_searching(state: ResearchState) -> str:
+    """Status once the searches are done: read the top result pages first if this run fetches pages"""
+    return "fetching" if state.get("fetch_pages") else "synthesizing"
+
+def select_pages(state: ResearchState) -> List[str]:
+    """Links of the best distinct results, ranked the same way the synthesis prompt packs them"""
+    ranked = rank_results(state["query"], deduplicate_results(state["search_results"]))
+    return [result["link"] for result in ranked if result.get("link")][:PAGE_FETCH_MAX_PAGES]
+
+def attach_page_text(state: ResearchState, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Copy each page's extracted text onto the results linking to it, as their content"""
+    text_by_link = {page["url"]: page["text"] for page in pages if page["text"]}
+    
+    def with_content(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {**result, "content": text_by_link[result["link"]]} if result.get("link") in text_by_link else result
+            for result in results
+        ]
+    
+    return {
+        "search_results": with_content(state["search_results"]),
+        "search_results_by_query": [with_content(results) for results in state.get("search_results_by_query", [])]
+    }
+
+def summarize_fetches(pages: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Page counts per outcome, plus pages with usable text and bytes downloaded"""
+    stats = {"pages": len(pages), "pages_with_text": 0, "bytes": 0}
+    for page in pages:
+        stats[page["outcome"]] = stats.get(page["outcome"], 0) + 1
+        stats["pages_with_text"] += bool(page["text"])
+        stats["bytes"] += page["bytes"]
+    return stats
+
+def page_progress(state: ResearchState, config: RunnableConfig, total: int) -> Callable[[Dict[str, Any]], None]:
+    """Progress callback for each page read, from 50% to 54%"""
+    done = []
+    
+    def on_page(page: Dict[str, Any]) -> None:
+        done.append(page)
+        report_progress(
+            state,
+            config,
+            "searching",
+            f"Read result page {len(done)}/{total} ({page['outcome']}): {page['url']}",
+            50 + len(done) / total * 4
+        )
+    
+    return on_page
+
+# Define the graph nodes (steps in the research process)
+def plan_search_queries(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Generate search queries based on the research question"""
+    try:
+        report_progress(state, config, "planning", "Planning search queries...", 10)
+        
+        prompt = SEARCH_PLANNING_PROMPT.format(query=state["query"])
+        report_progress(state, config, "planning", f"Generating optimal search queries using {state.get('model', 'default model')}...", 15)
+        
+        usage = {}
+        response = query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"), use_cache=get_use_cache(config), usage=usage, stage="planning")
+        queries = parse_search_queries(response, state["query"])
+        
+        report_progress(state, config, "planning", f"Generated {len(queries)} search queries", 20)    
             
-            prompt = INFORMATION_SYNTHESIS_PROMPT.format(
-                query=state["query"],
-                search_results=search_results_text
+        return {"search_queries": queries, "usage": usage, "status": "searching"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in planning search: {str(e)}", 0)
+        return {"error": f"Error in planning search: {str(e)}", "status": "error"}
+
+def execute_searches(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Execute the planned search queries concurrently"""
+    try:
+        queries = state["search_queries"]
+        query_count = len(queries)
+        results_by_query: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        
+        report_progress(state, config, "searching", f"Starting web searches with {query_count} queries...", 25)
+        
+        # Serper calls are I/O bound, so fan them out over a small worker pool.
+        # Each call is bounded by SEARCH_TIMEOUT; the overall deadline allows one
+        # timeout per "round" of workers in case the pool is smaller than the plan.
+        max_workers = max(1, min(SEARCH_MAX_WORKERS, query_count))
+        rounds = -(-query_count // max_workers)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        futures = {
+            executor.submit(search_web, query, timeout=SEARCH_TIMEOUT, use_cache=get_use_cache(config)): i
+            for i, query in enumerate(queries)
+        }
+        
+        completed = 0
+        try:
+            for future in as_completed(futures, timeout=SEARCH_TIMEOUT * rounds + 1):
+                i = futures[future]
+                results_by_query[i] = future.result()
+                completed += 1
+                percent = 25 + (completed / query_count * 25)  # Progress from 25% to 50%
+                report_progress(
+                    state,
+                    config,
+                    "searching",
+                    f"Found {len(results_by_query[i])} results for query {i+1} [{completed}/{query_count}]: '{queries[i]}'",
+                    percent
+                )
+        except FuturesTimeoutError:
+            report_progress(
+                state,
+                config,
+                "searching",
+                f"{query_count - completed} of {query_count} searches timed out and were skipped",
+                50
             )
-            
-            report_progress(state, "synthesizing", "Generating initial research draft...", 70)
-            
-            draft_research = query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"))
-            
-            report_progress(state, "synthesizing", "Draft research complete", 75)
-            
-            return {"draft_research": draft_research, "status": "reflecting"}
-        except Exception as e:
-            report_progress(state, "error", f"Error in synthesizing information: {str(e)}", 0)
-            return {"error": f"Error in synthesizing information: {str(e)}", "status": "error"}
-    
-    def reflect_and_improve(state: ResearchState) -> ResearchState:
-        """Reflect on the research and improve it"""
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # Merge in planned-query order so the synthesis prompt is stable across runs
+        all_results = [result for results in results_by_query for result in results]
+        
+        report_progress(state, config, "searching", f"Web search complete. Found {len(all_results)} total results", 50)
+        
+        return {"search_results": all_results, "search_results_by_query": results_by_query, "status": after_searching(state)}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in executing searches: {str(e)}", 0)
+        return {"error": f"Error in executing searches: {str(e)}", "status": "error"}
+
+def fetch_result_pages(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Read the main text of the top result pages and attach it to their results"""
+    try:
+        urls = select_pages(state)
+        report_progress(state, config, "searching", f"Reading {len(urls)} result pages...", 50)
+        
+        pages = fetch_page_texts(urls, use_cache=get_use_cache(config), on_page=page_progress(state, config, len(urls)))
+        fetch_stats = summarize_fetches(pages)
+        
+        report_progress(state, config, "searching", f"Read {fetch_stats['pages_with_text']} of {len(urls)} result pages", 54)
+        
+        return {**attach_page_text(state, pages), "fetch_stats": fetch_stats, "status": "synthesizing"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        # Pages only add detail to the snippets, so the run goes on without them
+        report_progress(state, config, "searching", f"Could not read result pages: {str(e)}", 54)
+        return {"status": "synthesizing"}
+
+def synthesize_information(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Synthesize information from search results"""
+    try:
+        prompt, context_stats = build_synthesis_prompt(state, config)
+        
+        usage = {}
+        draft_research = completion(query_llm(
+            prompt,
+            system_prompt=RESEARCHER_SYSTEM_PROMPT,
+            model=state.get("model"),
+            use_cache=get_use_cache(config),
+            on_token=stream_to(config, "synthesizing"),
+            usage=usage,
+            stage="synthesizing"
+        ))
+        
+        report_progress(state, config, "synthesizing", "Draft research complete", 75)
+        
+        return {"draft_research": draft_research, "context_stats": context_stats, "usage": usage, "status": "reviewing"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in synthesizing information: {str(e)}", 0)
+        return {"error": f"Error in synthesizing information: {str(e)}", "status": "error"}
+
+def review_draft(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Decide whether the draft needs a reflection round, based on the pipeline mode"""
+    try:
+        mode = state.get("mode") or DEFAULT_PIPELINE_MODE
+        score, checks = assess_research_quality(
+            state["query"], state["draft_research"], state.get("search_results", [])
+        )
+        
+        if mode == "thorough":
+            reflect = True
+        elif mode == "standard":
+            reflect = score < REFLECTION_QUALITY_THRESHOLD
+        else:
+            # fast skips reflection; in mapreduce the merge already is a second pass over the findings
+            reflect = False
+        
+        quality = {"score": round(score, 3), "checks": checks, "reflected": reflect}
+        
+        if reflect:
+            report_progress(state, config, "reviewing", f"Draft quality {score:.2f}, refining with reflection...", 78)
+            return {"quality": quality, "status": "reflecting"}
+        
+        report_progress(state, config, "completed", "Research completed successfully", 100)
+        return {"quality": quality, "final_research": state["draft_research"], "status": "completed"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in reviewing draft: {str(e)}", 0)
+        return {"error": f"Error in reviewing draft: {str(e)}", "status": "error"}
+
+def reflect_and_improve(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Reflect on the research and improve it"""
+    try:
+        report_progress(state, config, "reflecting", "Reflecting on research quality...", 80)
+        
+        prompt = REFLECTION_PROMPT.format(
+            query=state["query"],
+            research_content=state["draft_research"]
+        )
+        
+        report_progress(state, config, "reflecting", f"Analyzing draft using {state.get('model', 'default model')}...", 85)
+        
+        usage = {}
+        reflection = completion(query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"), use_cache=get_use_cache(config), usage=usage, stage="reflecting"))
+        
+        report_progress(state, config, "reflecting", "Improving research based on analysis...", 90)
+        
+        improved_prompt = build_improvement_prompt(state["draft_research"], reflection)
+        
+        report_progress(state, config, "reflecting", "Finalizing research output...", 95)
+        
+        final_research = completion(query_llm(
+            improved_prompt,
+            system_prompt=RESEARCHER_SYSTEM_PROMPT,
+            model=state.get("model"),
+            use_cache=get_use_cache(config),
+            on_token=stream_to(config, "reflecting"),
+            usage=usage,
+            stage="reflecting"
+        ))
+        
+        report_progress(state, config, "completed", "Research completed successfully", 100)
+        
+        return {"final_research": final_research, "usage": usage, "status": "completed"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in reflection: {str(e)}", 0)
+        return {"error": f"Error in reflection: {str(e)}", "status": "error"}
+
+def summarize_sub_topic(state: SubTopicState, config: RunnableConfig) -> ResearchState:
+    """Map step of mapreduce mode: summarize the results of one planned query"""
+    try:
+        prompt, context_stats = build_sub_topic_prompt(state, map_model_for(state))
+        
+        usage = {}
+        summary = completion(query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"), use_cache=get_use_cache(config), usage=usage, stage="summarizing"))
+        
+        report_progress(
+            state,
+            config,
+            "synthesizing",
+            f"Summarized sub-topic {state['index'] + 1} of {state['total']}: '{state['sub_query']}'",
+            60
+        )
+        
+        return {"summaries": [sub_topic_summary(state, summary, context_stats)], "usage": usage}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in summarizing sub-topic: {str(e)}", 0)
+        return {"error": f"Error in summarizing sub-topic: {str(e)}", "status": "error"}
+
+def merge_summaries(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Reduce step of mapreduce mode: merge the sub-topic summaries into the draft"""
+    if state.get("error"):
+        # A failed map step ends the run with its error; the router stops after this node
+        return {}
+    try:
+        prompt, context_stats = build_merge_prompt(state, config)
+        
+        usage = {}
+        draft_research = completion(query_llm(
+            prompt,
+            system_prompt=RESEARCHER_SYSTEM_PROMPT,
+            model=state.get("model"),
+            use_cache=get_use_cache(config),
+            on_token=stream_to(config, "synthesizing"),
+            usage=usage,
+            stage="synthesizing"
+        ))
+        
+        report_progress(state, config, "synthesizing", "Draft research complete", 75)
+        
+        return {"draft_research": draft_research, "context_stats": context_stats, "usage": usage, "status": "reviewing"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in merging summaries: {str(e)}", 0)
+        return {"error": f"Error in merging summaries: {str(e)}", "status": "error"}
+
+# Async variants of the nodes, used by ainvoke; they share prompts and parsing with the sync nodes
+async def aplan_search_queries(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Generate search queries based on the research question (async)"""
+    try:
+        report_progress(state, config, "planning", "Planning search queries...", 10)
+        
+        prompt = SEARCH_PLANNING_PROMPT.format(query=state["query"])
+        report_progress(state, config, "planning", f"Generating optimal search queries using {state.get('model', 'default model')}...", 15)
+        
+        usage = {}
+        response = await async_query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"), use_cache=get_use_cache(config), usage=usage, stage="planning")
+        queries = parse_search_queries(response, state["query"])
+        
+        report_progress(state, config, "planning", f"Generated {len(queries)} search queries", 20)
+        
+        return {"search_queries": queries, "usage": usage, "status": "searching"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in planning search: {str(e)}", 0)
+        return {"error": f"Error in planning search: {str(e)}", "status": "error"}
+
+async def aexecute_searches(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Execute the planned search queries concurrently on the event loop"""
+    try:
+        queries = state["search_queries"]
+        query_count = len(queries)
+        results_by_query: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        
+        report_progress(state, config, "searching", f"Starting web searches with {query_count} queries...", 25)
+        
+        # Same bounds as the threaded version: SEARCH_MAX_WORKERS requests in
+        # flight, each limited by SEARCH_TIMEOUT, with one timeout per round overall
+        max_workers = max(1, min(SEARCH_MAX_WORKERS, query_count))
+        rounds = -(-query_count // max_workers)
+        semaphore = asyncio.Semaphore(max_workers)
+        
+        async def search(i: int, query: str) -> int:
+            async with semaphore:
+                results_by_query[i] = await async_search_web(query, timeout=SEARCH_TIMEOUT, use_cache=get_use_cache(config))
+            return i
+        
+        tasks = [asyncio.ensure_future(search(i, query)) for i, query in enumerate(queries)]
+        completed = 0
         try:
-            report_progress(state, "reflecting", "Reflecting on research quality...", 80)
-            
-            prompt = REFLECTION_PROMPT.format(
-                query=state["query"],
-                research_content=state["draft_research"]
+            for next_done in asyncio.as_completed(tasks, timeout=SEARCH_TIMEOUT * rounds + 1):
+                i = await next_done
+                completed += 1
+                percent = 25 + (completed / query_count * 25)  # Progress from 25% to 50%
+                report_progress(
+                    state,
+                    config,
+                    "searching",
+                    f"Found {len(results_by_query[i])} results for query {i+1} [{completed}/{query_count}]: '{queries[i]}'",
+                    percent
+                )
+        except asyncio.TimeoutError:
+            report_progress(
+                state,
+                config,
+                "searching",
+                f"{query_count - completed} of {query_count} searches timed out and were skipped",
+                50
             )
-            
-            report_progress(state, "reflecting", f"Analyzing draft using {state.get('model', 'default model')}...", 85)
-            
-            reflection = query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"))
-            
-            report_progress(state, "reflecting", "Improving research based on analysis...", 90)
-            
-            improved_prompt = f"""
-            Your original research:
-            
-            {state["draft_research"]}
-            
-            Your reflection on areas to improve:
-            
-            {reflection}
-            
-            Now, provide an improved version of the research that addresses these points.
-            """
-            
-            report_progress(state, "reflecting", "Finalizing research output...", 95)
-            
-            final_research = query_llm(improved_prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"))
-            
-            report_progress(state, "completed", "Research completed successfully", 100)
-            
-            return {"final_research": final_research, "status": "completed"}
-        except Exception as e:
-            report_progress(state, "error", f"Error in reflection: {str(e)}", 0)
-            return {"error": f"Error in reflection: {str(e)}", "status": "error"}
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        all_results = [result for results in results_by_query for result in results]
+        
+        report_progress(state, config, "searching", f"Web search complete. Found {len(all_results)} total results", 50)
+        
+        return {"search_results": all_results, "search_results_by_query": results_by_query, "status": after_searching(state)}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in executing searches: {str(e)}", 0)
+        return {"error": f"Error in executing searches: {str(e)}", "status": "error"}
+
+async def afetch_result_pages(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Read the main text of the top result pages on the event loop"""
+    try:
+        urls = select_pages(state)
+        report_progress(state, config, "searching", f"Reading {len(urls)} result pages...", 50)
+        
+        pages = await afetch_page_texts(urls, use_cache=get_use_cache(config), on_page=page_progress(state, config, len(urls)))
+        fetch_stats = summarize_fetches(pages)
+        
+        report_progress(state, config, "searching", f"Read {fetch_stats['pages_with_text']} of {len(urls)} result pages", 54)
+        
+        return {**attach_page_text(state, pages), "fetch_stats": fetch_stats, "status": "synthesizing"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "searching", f"Could not read result pages: {str(e)}", 54)
+        return {"status": "synthesizing"}
+
+async def asynthesize_information(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Synthesize information from search results (async)"""
+    try:
+        prompt, context_stats = build_synthesis_prompt(state, config)
+        
+        usage = {}
+        draft_research = completion(await async_query_llm(
+            prompt,
+            system_prompt=RESEARCHER_SYSTEM_PROMPT,
+            model=state.get("model"),
+            use_cache=get_use_cache(config),
+            on_token=stream_to(config, "synthesizing"),
+            usage=usage,
+            stage="synthesizing"
+        ))
+        
+        report_progress(state, config, "synthesizing", "Draft research complete", 75)
+        
+        return {"draft_research": draft_research, "context_stats": context_stats, "usage": usage, "status": "reviewing"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in synthesizing information: {str(e)}", 0)
+        return {"error": f"Error in synthesizing information: {str(e)}", "status": "error"}
+
+async def areview_draft(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Quality gate (async); it is local and cheap, so it runs inline on the loop"""
+    return review_draft(state, config)
+
+async def areflect_and_improve(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Reflect on the research and improve it (async)"""
+    try:
+        report_progress(state, config, "reflecting", "Reflecting on research quality...", 80)
+        
+        prompt = REFLECTION_PROMPT.format(
+            query=state["query"],
+            research_content=state["draft_research"]
+        )
+        
+        report_progress(state, config, "reflecting", f"Analyzing draft using {state.get('model', 'default model')}...", 85)
+        
+        usage = {}
+        reflection = completion(await async_query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"), use_cache=get_use_cache(config), usage=usage, stage="reflecting"))
+        
+        report_progress(state, config, "reflecting", "Improving research based on analysis...", 90)
+        
+        improved_prompt = build_improvement_prompt(state["draft_research"], reflection)
+        
+        report_progress(state, config, "reflecting", "Finalizing research output...", 95)
+        
+        final_research = completion(await async_query_llm(
+            improved_prompt,
+            system_prompt=RESEARCHER_SYSTEM_PROMPT,
+            model=state.get("model"),
+            use_cache=get_use_cache(config),
+            on_token=stream_to(config, "reflecting"),
+            usage=usage,
+            stage="reflecting"
+        ))
+        
+        report_progress(state, config, "completed", "Research completed successfully", 100)
+        
+        return {"final_research": final_research, "usage": usage, "status": "completed"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in reflection: {str(e)}", 0)
+        return {"error": f"Error in reflection: {str(e)}", "status": "error"}
+
+async def asummarize_sub_topic(state: SubTopicState, config: RunnableConfig) -> ResearchState:
+    """Map step of mapreduce mode (async)"""
+    try:
+        prompt, context_stats = build_sub_topic_prompt(state, map_model_for(state))
+        
+        usage = {}
+        summary = completion(await async_query_llm(prompt, system_prompt=RESEARCHER_SYSTEM_PROMPT, model=state.get("model"), use_cache=get_use_cache(config), usage=usage, stage="summarizing"))
+        
+        report_progress(
+            state,
+            config,
+            "synthesizing",
+            f"Summarized sub-topic {state['index'] + 1} of {state['total']}: '{state['sub_query']}'",
+            60
+        )
+        
+        return {"summaries": [sub_topic_summary(state, summary, context_stats)], "usage": usage}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in summarizing sub-topic: {str(e)}", 0)
+        return {"error": f"Error in summarizing sub-topic: {str(e)}", "status": "error"}
+
+async def amerge_summaries(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """Reduce step of mapreduce mode (async)"""
+    if state.get("error"):
+        # A failed map step ends the run with its error; the router stops after this node
+        return {}
+    try:
+        prompt, context_stats = build_merge_prompt(state, config)
+        
+        usage = {}
+        draft_research = completion(await async_query_llm(
+            prompt,
+            system_prompt=RESEARCHER_SYSTEM_PROMPT,
+            model=state.get("model"),
+            use_cache=get_use_cache(config),
+            on_token=stream_to(config, "synthesizing"),
+            usage=usage,
+            stage="synthesizing"
+        ))
+        
+        report_progress(state, config, "synthesizing", "Draft research complete", 75)
+        
+        return {"draft_research": draft_research, "context_stats": context_stats, "usage": usage, "status": "reviewing"}
+    except ResearchCancelled:
+        raise
+    except Exception as e:
+        report_progress(state, config, "error", f"Error in merging summaries: {str(e)}", 0)
+        return {"error": f"Error in merging summaries: {str(e)}", "status": "error"}
+
+# Define conditional routing
+def router(state: ResearchState) -> str:
+    """Route to the next node based on the current status"""
+    if state.get("error"):
+        return END
+    return state.get("status", "planning")
+
+def route_search_results(state: ResearchState) -> Union[str, List[Send]]:
+    """
+    Send the search results to synthesis, or fan them out per query in mapreduce mode
+    
+    Each planned query with results becomes its own summarizing task; the
+    tasks run in parallel, bounded by the run's max_concurrency. Runs that
+    fetch pages go through the fetching node first, which routes back here.
+    """
+    if state.get("error"):
+        return END
+    if state.get("status") == "fetching":
+        return "fetching"
+    if state.get("mode") != "mapreduce":
+        return "synthesizing"
+    
+    sub_topics = [
+        (sub_query, results)
+        for sub_query, results in zip(state["search_queries"], state["search_results_by_query"])
+        if results
+    ]
+    sends = [
+        Send("summarizing", {
+            "query": state["query"],
+            "model": state.get("model"),
+            "mode": state.get("mode"),
+            "sub_query": sub_query,
+            "index": index,
+            "total": len(sub_topics),
+            "results": results
+        })
+        for index, (sub_query, results) in enumerate(sub_topics)
+    ]
+    return sends or "merging"
+
+def _timed(name: str, state: Dict[str, Any], started: float, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Record a node's duration in the node histogram and in the run's timings"""
+    elapsed = time.perf_counter() - started
+    NODE_SECONDS.observe(elapsed, name, state.get("mode") or DEFAULT_PIPELINE_MODE)
+    return {**update, "timings": {name: elapsed}}
+
+def timed_node(name: str, func: Callable, afunc: Callable) -> RunnableLambda:
+    """Graph node running func under invoke and afunc under ainvoke, timed either way"""
+    def run(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        started = time.perf_counter()
+        return _timed(name, state, started, func(state, config))
+    
+    async def arun(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        started = time.perf_counter()
+        return _timed(name, state, started, await afunc(state, config))
+    
+    return RunnableLambda(run, afunc=arun, name=name)
+
+def create_research_agent(checkpointer: Optional[SQLiteCheckpointSaver] = None):
+    """
+    Build and compile the research workflow graph
     
+    The compiled graph holds no per-run state: progress and chunk callbacks are
+    passed in the run config (config["configurable"]), so the graph is
+    compiled once and shared by every research run. Each node has a sync and
+    an async implementation, so the same graph serves invoke and ainvoke, and
+    is timed into the run's timings and the research_node_seconds histogram.
+    
+    Args:
+        checkpointer: Saves the state after every step under the run's
+            thread_id, which each run must then pass in its config
+    """
     # Create the workflow graph with explicit state schema
     workflow = StateGraph(state_schema=ResearchState)
     
     # Add nodes
-    workflow.add_node("planning", plan_search_queries)
-    workflow.add_node("searching", execute_searches)
-    workflow.add_node("synthesizing", synthesize_information)
-    workflow.add_node("reflecting", reflect_and_improve)
-    
-    # Define conditional routing
-    def router(state: ResearchState) -> str:
-        """Route to the next node based on the current status"""
-        if state.get("error"):
-            return END
-        return state.get("status", "planning")
+    workflow.add_node("planning", timed_node("planning", plan_search_queries, aplan_search_queries))
+    workflow.add_node("searching", timed_node("searching", execute_searches, aexecute_searches))
+    workflow.add_node("fetching", timed_node("fetching", fetch_result_pages, afetch_result_pages))
+    workflow.add_node("synthesizing", timed_node("synthesizing", synthesize_information, asynthesize_information))
+    workflow.add_node("reviewing", timed_node("reviewing", review_draft, areview_draft))
+    workflow.add_node("reflecting", timed_node("reflecting", reflect_and_improve, areflect_and_improve))
+    workflow.add_node("summarizing", timed_node("summarizing", summarize_sub_topic, asummarize_sub_topic))
+    workflow.add_node("merging", timed_node("merging", merge_summaries, amerge_summaries))
     
     # Add edges - directly connect nodes based on the expected flow
     workflow.add_edge("planning", "searching")
-    workflow.add_edge("searching", "synthesizing")
-    workflow.add_edge("synthesizing", "reflecting")
+    # mapreduce mode fans out one summarizing task per planned query, then merges them
+    # Runs that fetch pages read the top results between searching and either path
+    workflow.add_conditional_edges("searching", route_search_results, ["fetching", "synthesizing", "summarizing", "merging", END])
+    workflow.add_conditional_edges("fetching", route_search_results, ["synthesizing", "summarizing", "merging", END])
+    workflow.add_edge("summarizing", "merging")
+    # A failed draft ends the run with its own error instead of reaching the quality gate
+    workflow.add_conditional_edges("synthesizing", router, {"reviewing": "reviewing", END: END})
+    workflow.add_conditional_edges("merging", router, {"reviewing": "reviewing", END: END})
+    # The quality gate either finishes the run or hands the draft to reflection
+    workflow.add_conditional_edges("reviewing", router, {"reflecting": "reflecting", "completed": END, END: END})
     workflow.add_edge("reflecting", END)
     
     # Set start node
     workflow.set_entry_point("planning")
     
     # Compile the graph
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+# Compiled once at import and reused by every run
+research_agent = create_research_agent()
+
+# Runs given a thread_id are checkpointed after every step, so a failed or
+# cancelled run can continue from its last successful node. The saver and its
+# graph are created on first use, and only when CHECKPOINT_DB is set.
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+_checkpointed_research_agent = None
+_checkpointer_lock = threading.Lock()
+
+def get_checkpointer() -> Optional[SQLiteCheckpointSaver]:
+    """
+    Get the checkpoint saver, opening CHECKPOINT_DB on first use
+    
+    Returns:
+        The shared SQLiteCheckpointSaver, or None when checkpoints are disabled
+    """
+    global _checkpointer, _checkpointed_research_agent
+    if not CHECKPOINT_DB:
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = SQLiteCheckpointSaver(
+                CHECKPOINT_DB, ttl=CHECKPOINT_TTL, purge_interval=CHECKPOINT_PURGE_INTERVAL
+            )
+            _checkpointed_research_agent = create_research_agent(_checkpointer)
+    return _checkpointer
+
+def get_checkpointed_research_agent():
+    """The research graph compiled with the checkpoint saver, or None when checkpoints are disabled"""
+    if get_checkpointer() is None:
+        return None
+    return _checkpointed_research_agent
+
+def get_checkpoint_stats() -> Optional[Dict[str, Any]]:
+    """Checkpoint counts, or None when checkpoints are disabled"""
+    saver = get_checkpointer()
+    return saver.stats() if saver is not None else None
+
+# Where progress stands when a run resumes at a node
+RESUME_PERCENT = {
+    "planning": 10, "searching": 25, "fetching": 50, "synthesizing": 55, "summarizing": 55,
+    "merging": 65, "reviewing": 75, "reflecting": 80
+}
 
-def run_research_agent(query: str, model: str = None, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+def _run_config(progress_callback, chunk_callback, use_cache: bool, thread_id: Optional[str] = None) -> RunnableConfig:
+    configurable = {
+        "progress_callback": progress_callback,
+        "chunk_callback": chunk_callback,
+        "use_cache": use_cache
+    }
+    if thread_id is not None:
+        configurable["thread_id"] = thread_id
+    return {
+        "configurable": configurable,
+        # Only the mapreduce fan-out runs several nodes in one step
+        "max_concurrency": MAPREDUCE_MAX_CONCURRENCY
+    }
+
+def _agent_for(thread_id: Optional[str]):
+    """The checkpointed graph for runs with a thread ID when checkpoints are enabled, else the plain one"""
+    if thread_id is not None:
+        agent = get_checkpointed_research_agent()
+        if agent is not None:
+            return agent, thread_id
+    return research_agent, None
+
+def _release_checkpoints(thread_id: Optional[str], result: Dict[str, Any]) -> None:
+    """A completed run is never resumed, so its checkpoints go now rather than at expiry"""
+    if thread_id is not None and result.get("status") == "completed":
+        get_checkpointer().delete_thread(thread_id)
+
+def resume_point(thread_id: str):
+    """
+    Latest checkpoint of a run that has nodes left to run and no error
+    
+    For a node that failed, this is the checkpoint written before it ran.
+    
+    Returns:
+        The LangGraph state snapshot, or None if checkpoints are disabled or
+        the run has none left (it completed, never ran or expired)
+    """
+    agent = get_checkpointed_research_agent()
+    if agent is None:
+        return None
+    for snapshot in agent.get_state_history({"configurable": {"thread_id": thread_id}}):
+        if snapshot.next and not snapshot.values.get("error"):
+            return snapshot
+    return None
+
+def initial_research_state(query: str, model: str, mode: str, fetch_pages: Optional[bool]) -> Dict[str, Any]:
+    return {
+        "query": query,
+        "model": model,
+        "mode": mode,
+        "fetch_pages": PAGE_FETCH_ENABLED if fetch_pages is None else fetch_pages,
+        "status": "planning"
+    }
+
+def _record_run(mode: str, status: str, elapsed: float) -> None:
+    RESEARCH_RUNS.inc(mode, status)
+    RESEARCH_SECONDS.observe(elapsed, mode)
+
+def _research_response(query: str, model: str, mode: str, started: float, final_state: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape the final graph state into the research result returned to callers"""
+    elapsed = time.time() - started
+    status = final_state.get("status", "unknown")
+    _record_run(mode, status, elapsed)
+    return {
+        "query": query,
+        "model": model,
+        "status": status,
+        "research": final_state.get("final_research", "") or final_state.get("draft_research", ""),
+        "search_queries": final_state.get("search_queries", []),
+        "search_results": final_state.get("search_results", []),
+        "context_stats": final_state.get("context_stats", {}),
+        "metadata": {
+            "mode": mode,
+            "elapsed_seconds": round(elapsed, 3),
+            "usage": final_state.get("usage", {}),
+            "quality": final_state.get("quality", {}),
+            "pages": final_state.get("fetch_stats", {}),
+            "timings": {node: round(seconds, 3) for node, seconds in final_state.get("timings", {}).items()}
+        },
+        "error": final_state.get("error")
+    }
+
+def _error_response(query: str, model: str, mode: str, started: float, error: Exception,
+                    progress_callback: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
+    """Report an unexpected failure and build the matching error result"""
+    import traceback
+    traceback.print_exc()
+    _record_run(mode, "error", time.time() - started)
+    
+    if progress_callback:
+        progress_callback({
+            "step": "error",
+            "message": f"Unexpected error: {str(error)}",
+            "percent": 0,
+            "query": query
+        })
+        
+    return {
+        "query": query,
+        "model": model,
+        "status": "error",
+        "error": f"Unexpected error: {str(error)}",
+        "research": "",
+        "search_queries": [],
+        "search_results": [],
+        "metadata": {
+            "mode": mode,
+            "elapsed_seconds": round(time.time() - started, 3)
+        }
+    }
+
+def run_research_agent(query: str, model: str = None, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       chunk_callback: Optional[Callable[[str, str], None]] = None,
+                       mode: str = DEFAULT_PIPELINE_MODE, use_cache: bool = True,
+                       fetch_pages: Optional[bool] = None, thread_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Run the research agent with a given query
     
@@ -205,50 +1021,160 @@ def run_research_agent(query: str, model: str = None, progress_callback: Optiona
         query: Research query string
         model: LLM model to use
         progress_callback: Optional callback function to report progress
+        chunk_callback: Optional callback receiving (stage, text) for streamed output
+        mode: Pipeline mode - "fast" (plan, search, synthesize), "standard"
+            (reflect only when the quality gate flags the draft), "thorough"
+            (always reflect) or "mapreduce" (summarize each query's results in
+            parallel and merge them, without reflection)
+        use_cache: Set to False to bypass the search, page and LLM caches for a fresh run
+        fetch_pages: Read the top result pages before synthesis (defaults to PAGE_FETCH_ENABLED)
+        thread_id: Checkpoint the run under this ID so resume_research_agent
+            can continue it if it fails (ignored when CHECKPOINT_DB is empty)
         
     Returns:
         Dictionary with research results and metadata
+        
+    Raises:
+        ResearchCancelled: If progress_callback raises it to stop the run
     """
+    if mode not in PIPELINE_MODES:
+        mode = DEFAULT_PIPELINE_MODE
+    started = time.time()
+    
     try:
-        agent = create_research_agent(progress_callback)
+        # Initialize state with the query, model, pipeline mode and whether to read result pages
+        initial_state = initial_research_state(query, model, mode, fetch_pages)
         
-        # Initialize state with the query and model
-        initial_state = {"query": query, "model": model, "status": "planning"}
+        # Execute the shared agent with this run's callbacks
+        agent, thread_id = _agent_for(thread_id)
+        final_state = agent.invoke(initial_state, config=_run_config(progress_callback, chunk_callback, use_cache, thread_id))
         
-        # Execute the agent
-        final_state = agent.invoke(initial_state)
+        result = _research_response(query, model, mode, started, final_state)
+        _release_checkpoints(thread_id, result)
+        return result
+    
+    except ResearchCancelled:
+        _record_run(mode, "cancelled", time.time() - started)
+        raise
+    
+    except Exception as e:
+        return _error_response(query, model, mode, started, e, progress_callback)
+
+async def arun_research_agent(query: str, model: str = None, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                              chunk_callback: Optional[Callable[[str, str], None]] = None,
+                              mode: str = DEFAULT_PIPELINE_MODE, use_cache: bool = True,
+                              fetch_pages: Optional[bool] = None, thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the research agent on the current event loop
+    
+    Same arguments and result as run_research_agent; searches and LLM calls
+    use the async HTTP client, so many runs can share one thread.
+    """
+    if mode not in PIPELINE_MODES:
+        mode = DEFAULT_PIPELINE_MODE
+    started = time.time()
+    
+    try:
+        initial_state = initial_research_state(query, model, mode, fetch_pages)
         
-        # Prepare response
-        response = {
-            "query": query,
-            "model": model,
-            "status": final_state.get("status", "unknown"),
-            "research": final_state.get("final_research", "") or final_state.get("draft_research", ""),
-            "search_queries": final_state.get("search_queries", []),
-            "search_results": final_state.get("search_results", []),
-            "error": final_state.get("error")
-        }
+        agent, thread_id = _agent_for(thread_id)
+        final_state = await agent.ainvoke(initial_state, config=_run_config(progress_callback, chunk_callback, use_cache, thread_id))
         
-        return response
+        result = _research_response(query, model, mode, started, final_state)
+        _release_checkpoints(thread_id, result)
+        return result
+    
+    except ResearchCancelled:
+        _record_run(mode, "cancelled", time.time() - started)
+        raise
     
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        return _error_response(query, model, mode, started, e, progress_callback)
+
+def _resume_config(snapshot, progress_callback, chunk_callback, use_cache: bool) -> RunnableConfig:
+    """Run config continuing the snapshot's run from that checkpoint, reporting where it picks up"""
+    config = _run_config(progress_callback, chunk_callback, use_cache, snapshot.config["configurable"]["thread_id"])
+    config["configurable"]["checkpoint_id"] = snapshot.config["configurable"]["checkpoint_id"]
+    if progress_callback:
+        node = snapshot.next[0]
+        progress_callback({
+            "step": node,
+            "message": f"Resuming research at the {node} step",
+            "percent": RESUME_PERCENT.get(node, 0),
+            "query": snapshot.values.get("query", "")
+        })
+    return config
+
+def _resumed_response(snapshot, started: float, final_state: Dict[str, Any]) -> Dict[str, Any]:
+    values = snapshot.values
+    result = _research_response(values["query"], values.get("model"), values.get("mode"), started, final_state)
+    result["metadata"]["resumed_from"] = list(dict.fromkeys(snapshot.next))
+    _release_checkpoints(snapshot.config["configurable"]["thread_id"], result)
+    return result
+
+def resume_research_agent(thread_id: str, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          chunk_callback: Optional[Callable[[str, str], None]] = None,
+                          use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Continue a checkpointed run from its last successful node
+    
+    Nodes that finished before the failure are not run again, so their LLM
+    calls and searches are not repeated. Usage and timings in the result
+    cover the whole run, including the part before the resume.
+    
+    Args:
+        thread_id: Thread ID the run was started with
+        progress_callback: Optional callback function to report progress
+        chunk_callback: Optional callback receiving (stage, text) for streamed output
+        use_cache: Set to False to bypass the search, page and LLM caches
         
-        if progress_callback:
-            progress_callback({
-                "step": "error",
-                "message": f"Unexpected error: {str(e)}",
-                "percent": 0,
-                "query": query
-            })
-            
-        return {
-            "query": query,
-            "model": model,
-            "status": "error",
-            "error": f"Unexpected error: {str(e)}",
-            "research": "",
-            "search_queries": [],
-            "search_results": []
-        }
+    Returns:
+        Dictionary with research results and metadata, with the nodes the
+        run resumed at in metadata.resumed_from
+        
+    Raises:
+        LookupError: If the run has no checkpoint to resume from
+    """
+    snapshot = resume_point(thread_id)
+    if snapshot is None:
+        raise LookupError(f"No checkpoint to resume research run {thread_id} from")
+    values = snapshot.values
+    started = time.time()
+    
+    try:
+        config = _resume_config(snapshot, progress_callback, chunk_callback, use_cache)
+        final_state = get_checkpointed_research_agent().invoke(None, config=config)
+        return _resumed_response(snapshot, started, final_state)
+    
+    except ResearchCancelled:
+        _record_run(values.get("mode"), "cancelled", time.time() - started)
+        raise
+    
+    except Exception as e:
+        return _error_response(values["query"], values.get("model"), values.get("mode"), started, e, progress_callback)
+
+async def aresume_research_agent(thread_id: str, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                 chunk_callback: Optional[Callable[[str, str], None]] = None,
+                                 use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Continue a checkpointed run on the current event loop
+    
+    Same arguments, result and errors as resume_research_agent.
+    """
+    snapshot = resume_point(thread_id)
+    if snapshot is None:
+        raise LookupError(f"No checkpoint to resume research run {thread_id} from")
+    values = snapshot.values
+    started = time.time()
+    
+    try:
+        config = _resume_config(snapshot, progress_callback, chunk_callback, use_cache)
+        final_state = await get_checkpointed_research_agent().ainvoke(None, config=config)
+        return _resumed_response(snapshot, started, final_state)
+    
+    except ResearchCancelled:
+        _record_run(values.get("mode"), "cancelled", time.time() - started)
+        raise
+    
+    except Exception as e:
+        return _error_response(values["query"], values.get("model"), values.get("mode"), started, e, progress_callback)
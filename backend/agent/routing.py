@@ -0,0 +1,157 @@
+# backend/agent/routing.py
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+OUTCOMES = ("ok", "rate_limited", "error", "timeout")
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ModelRouter:
+    """
+    Picks the model for each LLM call and the models to fail over to
+
+    A stage (e.g. "planning") can prefer its own model over the one chosen for
+    the run. After the preferred model come the other models of the fallback
+    chain. Models that are cooling down after a 429, 5xx, timeout or a call
+    slower than the latency SLO, or whose recent error rate or median latency
+    is too high, are moved behind the healthy ones. Outcomes are recorded per
+    model in a sliding window of recent calls.
+    """
+
+    def __init__(self, available_models: Iterable[str], default_model: str, stage_models: Mapping[str, str],
+                 fallback_chain: Iterable[str], max_fallbacks: int, latency_slo: float, cooldown: float,
+                 window: int, error_rate_threshold: float, min_samples: int = 5):
+        """
+        Args:
+            available_models: Models that may be routed to
+            default_model: Model used when neither the stage nor the caller names one
+            stage_models: Preferred model per stage; empty values defer to the caller's model
+            fallback_chain: Models to fail over to, in order
+            max_fallbacks: Other models tried after the preferred one (0 disables failover)
+            latency_slo: Seconds a call may take before the model counts as slow
+            cooldown: Seconds a failing or slow model is kept behind the healthy ones
+            window: Recent calls per model kept for the error rate and latency stats
+            error_rate_threshold: Error rate (0-1) over the window that marks a model unhealthy
+            min_samples: Calls needed in the window before the error rate and latency count
+        """
+        self.available_models = list(available_models)
+        self.default_model = default_model
+        self.stage_models = dict(stage_models)
+        self.fallback_chain = [model for model in fallback_chain if model in self.available_models]
+        self.max_fallbacks = max_fallbacks
+        self.latency_slo = latency_slo
+        self.cooldown = cooldown
+        self.window = window
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self._recent: Dict[str, Deque[Tuple[bool, Optional[float]]]] = {}
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        self._fallbacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def preferred(self, stage: Optional[str], model: Optional[str]) -> str:
+        """The model a stage should use before any failover"""
+        preferred = self.stage_models.get(stage) if stage else None
+        for candidate in (preferred, model):
+            if candidate in self.available_models:
+                return candidate
+        return self.default_model
+
+    def candidates(self, stage: Optional[str], model: Optional[str]) -> List[str]:
+        """
+        Models to try for one call, best first
+
+        Args:
+            stage: Pipeline stage making the call, or None
+            model: Model chosen for the run
+
+        Returns:
+            The preferred model followed by up to max_fallbacks others, with
+            unhealthy models moved behind healthy ones
+        """
+        preferred = self.preferred(stage, model)
+        if self.max_fallbacks <= 0:
+            return [preferred]
+        chain = [preferred] + [candidate for candidate in self.fallback_chain if candidate != preferred]
+        with self._lock:
+            now = time.monotonic()
+            healthy = [candidate for candidate in chain if self._is_healthy(candidate, now)]
+        unhealthy = [candidate for candidate in chain if candidate not in healthy]
+        return (healthy + unhealthy)[:self.max_fallbacks + 1]
+
+    def is_healthy(self, model: str) -> bool:
+        """Whether a model is out of cooldown with an acceptable recent error rate and latency"""
+        with self._lock:
+            return self._is_healthy(model, time.monotonic())
+
+    def _is_healthy(self, model: str, now: float) -> bool:
+        if now < self._cooldown_until.get(model, 0.0):
+            return False
+        recent = self._recent.get(model)
+        if not recent or len(recent) < self.min_samples:
+            return True
+        errors = sum(1 for ok, _ in recent if not ok)
+        if errors / len(recent) > self.error_rate_threshold:
+            return False
+        median = _percentile([latency for ok, latency in recent if ok and latency is not None], 0.5)
+        return median is None or median <= self.latency_slo
+
+    def record(self, model: str, outcome: str, latency: Optional[float] = None,
+               cooldown: Optional[float] = None) -> None:
+        """
+        Record the outcome of one call
+
+        Args:
+            model: Model that was called
+            outcome: "ok", "rate_limited", "error" or "timeout"
+            latency: Seconds the call took, for successful calls
+            cooldown: Seconds to keep the model behind healthy ones (e.g. from
+                Retry-After); failures and slow calls default to the router's cooldown
+        """
+        ok = outcome == "ok"
+        with self._lock:
+            recent = self._recent.setdefault(model, deque(maxlen=self.window))
+            recent.append((ok, latency))
+            totals = self._totals.setdefault(model, dict.fromkeys(OUTCOMES, 0))
+            totals[outcome] = totals.get(outcome, 0) + 1
+            if not ok or (latency is not None and latency > self.latency_slo):
+                until = time.monotonic() + (cooldown if cooldown is not None else self.cooldown)
+                self._cooldown_until[model] = max(self._cooldown_until.get(model, 0.0), until)
+
+    def record_fallback(self, from_model: str, to_model: str) -> None:
+        with self._lock:
+            key = f"{from_model}->{to_model}"
+            self._fallbacks[key] = self._fallbacks.get(key, 0) + 1
+
+    def read_timeout(self, default: float, has_fallback: bool) -> float:
+        """Read timeout for a call: the SLO when another model can take over, else the default"""
+        return min(default, self.latency_slo) if has_fallback else default
+
+    def stats(self) -> Dict[str, Any]:
+        """Live per-model outcome counts, latency percentiles and health, plus failover counts"""
+        with self._lock:
+            now = time.monotonic()
+            models = {}
+            for model in self.available_models:
+                recent = self._recent.get(model, ())
+                latencies = [latency for ok, latency in recent if ok and latency is not None]
+                p50 = _percentile(latencies, 0.5)
+                p95 = _percentile(latencies, 0.95)
+                models[model] = {
+                    **self._totals.get(model, dict.fromkeys(OUTCOMES, 0)),
+                    "error_rate": round(sum(1 for ok, _ in recent if not ok) / len(recent), 3) if recent else 0.0,
+                    "p50_seconds": round(p50, 3) if p50 is not None else None,
+                    "p95_seconds": round(p95, 3) if p95 is not None else None,
+                    "healthy": self._is_healthy(model, now),
+                    "cooldown_seconds": round(max(0.0, self._cooldown_until.get(model, 0.0) - now), 1)
+                }
+            return {"models": models, "fallbacks": dict(self._fallbacks)}
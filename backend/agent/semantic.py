@@ -0,0 +1,317 @@
+# backend/agent/semantic.py
+import math
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import (
+    SEMANTIC_CACHE_DIM,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_AGE_HOURS
+)
+from .context import tokenize_terms
+from .history import history_store
+
+_NUMBER = re.compile(r"\d+")
+
+TRIGRAM_WEIGHT = 0.25  # Character trigrams catch near-spellings without outweighing whole words
+BIGRAM_WEIGHT = 0.4  # Adjacent word pairs make word order count without sinking reordered paraphrases
+
+# Abbreviations and the forms they stand for; every form is indexed as the abbreviation
+ABBREVIATIONS = {
+    "ai": ("artificial intelligence",),
+    "ar": ("augmented reality",),
+    "eu": ("european union",),
+    "ev": ("electric vehicle", "evs"),
+    "gdp": ("gross domestic product",),
+    "llm": ("large language model",),
+    "ml": ("machine learning",),
+    "uk": ("united kingdom",),
+    "us": ("united states", "usa"),
+    "vr": ("virtual reality",)
+}
+
+# Words that relate the terms on either side ("impact of AI on jobs"), so swapping those terms changes the question
+RELATION_WORDS = {
+    "against", "by", "for", "from", "in", "into", "of", "on", "over", "than", "to", "versus", "vs", "with"
+}
+
+
+def _bucket(feature: str, dim: int) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+def _stem(word: str) -> str:
+    """Fold simple plurals (vehicles -> vehicle, trends -> trend)"""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _phrase(text: str) -> tuple:
+    return tuple(map(_stem, tokenize_terms(text)))
+
+
+_PHRASES = {
+    _phrase(form): abbreviation for abbreviation, forms in ABBREVIATIONS.items() for form in forms
+}
+_LONGEST_PHRASE = max(map(len, _PHRASES))
+
+
+def query_words(query: str) -> List[str]:
+    """
+    Content words of a query in order, with plurals folded and the forms in
+    ABBREVIATIONS replaced by their abbreviation ("electric vehicles" -> "ev")
+    """
+    words = [_stem(word) for word in tokenize_terms(query)]
+    canonical = []
+    i = 0
+    while i < len(words):
+        for size in range(min(_LONGEST_PHRASE, len(words) - i), 0, -1):
+            abbreviation = _PHRASES.get(tuple(words[i:i + size]))
+            if abbreviation is not None:
+                canonical.append(abbreviation)
+                i += size
+                break
+        else:
+            canonical.append(words[i])
+            i += 1
+    return canonical
+
+
+def query_relations(query: str) -> frozenset:
+    """
+    Ordered word pairs that a relation word separates
+
+    "impact of AI on jobs" yields (impact, ai), (impact, job) and (ai, job);
+    a query holding one of these pairs reversed asks something else.
+    """
+    segments = [query_words(segment) for segment in re.split(
+        r"\b(?:%s)\b" % "|".join(sorted(RELATION_WORDS)), query.lower()
+    )]
+    return frozenset(
+        (first, second)
+        for i, before in enumerate(segments)
+        for after in segments[i + 1:]
+        for first in before
+        for second in after
+        if first != second
+    )
+
+
+def _conflicting(relations: frozenset, other: frozenset) -> bool:
+    return any((second, first) in other for first, second in relations)
+
+
+def query_features(query: str, dim: int = SEMANTIC_CACHE_DIM) -> np.ndarray:
+    """
+    Hashed term-frequency vector of a query
+
+    Content words (with plurals folded and abbreviations unified), the
+    character trigrams of each word and each pair of adjacent words are
+    hashed into `dim` buckets. Stopwords and case are ignored.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    words = query_words(query)
+    for word in words:
+        vector[_bucket(word, dim)] += 1.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            vector[_bucket(padded[i:i + 3], dim)] += TRIGRAM_WEIGHT
+    for first, second in zip(words, words[1:]):
+        vector[_bucket(f"{first} {second}", dim)] += BIGRAM_WEIGHT
+    return vector
+
+
+class SemanticCache:
+    """
+    Similarity index over completed research, for answering paraphrased queries
+
+    Each query is stored as a hashed term-frequency vector; lookups weight
+    both sides by inverse document frequency over the indexed queries and
+    compare them by cosine similarity. A match must use the same model and
+    mode, be younger than `max_age` seconds, mention the same numbers (so
+    "trends 2025" never answers "trends 2026") and not swap the terms around
+    a relation word (so "impact of jobs on AI" never answers "impact of AI on
+    jobs"). The index is a ring buffer: once full, each insert replaces the
+    oldest entry. Its vectors are allocated on the first insert. Results
+    whose history entries are removed are discarded, leaving their slots free.
+    """
+
+    def __init__(self, dim: int = SEMANTIC_CACHE_DIM, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, max_age: float = SEMANTIC_CACHE_MAX_AGE_HOURS * 3600):
+        """
+        Args:
+            dim: Number of hash buckets per vector
+            max_entries: Maximum number of indexed queries
+            threshold: Minimum cosine similarity (0-1) for a match
+            max_age: Seconds after which an indexed result is too stale to reuse
+        """
+        self.dim = dim
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_age = max_age
+        self._vectors: Optional[np.ndarray] = None
+        self._document_frequency = np.zeros(dim, dtype=np.float32)
+        self._timestamps = np.full(max_entries, -math.inf)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def add(self, query: str, model: str, mode: str, result: Dict[str, Any],
+            timestamp: Optional[float] = None, history_id: Optional[str] = None) -> None:
+        """
+        Index a completed research result
+
+        Args:
+            query: Research query
+            model: Model the research was run with
+            mode: Pipeline mode the research was run with
+            result: Research result; stored by reference, not copied
+            timestamp: When the research finished (defaults to now)
+            history_id: History entry the result was saved under
+        """
+        vector = query_features(query, self.dim)
+        if not vector.any():
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, self.dim), dtype=np.float32)
+            slot = self._next
+            if self._entries[slot] is not None:
+                self._document_frequency -= self._vectors[slot] > 0
+            else:
+                self._count += 1
+            self._vectors[slot] = vector
+            self._document_frequency += vector > 0
+            self._timestamps[slot] = timestamp if timestamp is not None else time.time()
+            self._entries[slot] = {
+                "query": query,
+                "model": model,
+                "mode": mode,
+                "numbers": frozenset(_NUMBER.findall(query)),
+                "relations": query_relations(query),
+                "history_id": history_id,
+                "result": result
+            }
+            self._next = (slot + 1) % self.max_entries
+
+    def discard(self, history_ids: List[str]) -> int:
+        """
+        Remove the results saved under these history entries
+
+        Called when the entries are cleared or expire from history, so a
+        deleted result is not served to anyone afterwards.
+
+        Returns:
+            Number of indexed results removed
+        """
+        history_ids = set(history_ids)
+        removed = 0
+        with self._lock:
+            for slot, entry in enumerate(self._entries):
+                if entry is None or entry["history_id"] not in history_ids:
+                    continue
+                self._document_frequency -= self._vectors[slot] > 0
+                self._vectors[slot] = 0
+                self._timestamps[slot] = -math.inf
+                self._entries[slot] = None
+                self._count -= 1
+                removed += 1
+        return removed
+
+    def lookup(self, query: str, model: str, mode: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the most similar fresh result for a query
+
+        Returns:
+            Dictionary with the matched query, similarity, age_seconds,
+            history_id and result, or None if nothing clears the threshold
+        """
+        vector = query_features(query, self.dim)
+        numbers = frozenset(_NUMBER.findall(query))
+        relations = query_relations(query)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            if not vector.any() or not self._count:
+                return None
+            candidates = np.flatnonzero(self._timestamps >= now - self.max_age)
+            candidates = [
+                i for i in candidates
+                if self._entries[i]["model"] == model
+                and self._entries[i]["mode"] == mode
+                and self._entries[i]["numbers"] == numbers
+                and not _conflicting(relations, self._entries[i]["relations"])
+            ]
+            if not candidates:
+                return None
+
+            idf = np.log((1.0 + self._count) / (1.0 + self._document_frequency)) + 1.0
+            weighted_query = vector * idf
+            weighted = self._vectors[candidates] * idf
+            similarities = weighted @ weighted_query / (
+                np.linalg.norm(weighted, axis=1) * np.linalg.norm(weighted_query) + 1e-12
+            )
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None
+
+            self.hits += 1
+            slot = candidates[best]
+            entry = self._entries[slot]
+            return {
+                "query": entry["query"],
+                "similarity": round(similarity, 4),
+                "age_seconds": round(float(now - self._timestamps[slot]), 1),
+                "history_id": entry["history_id"],
+                "result": entry["result"]
+            }
+
+    def load_from_history(self) -> int:
+        """Index the newest completed research in the history store; returns how many were added"""
+        since = time.time() - self.max_age
+        added = 0
+        # Oldest first, so the ring buffer keeps the newest when history holds more than max_entries
+        for entry in reversed(history_store.list_recent(self.max_entries, since=since)):
+            results = entry["results"]
+            if results.get("status") != "completed":
+                continue
+            metadata = results.get("metadata") or {}
+            self.add(
+                entry["query"],
+                results.get("model"),
+                metadata.get("mode"),
+                results,
+                timestamp=entry["timestamp"],
+                history_id=entry["id"]
+            )
+            added += 1
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "threshold": self.threshold
+            }
+
+
+# Shared semantic cache, seeded from the research already in history and pruned along with it
+semantic_cache = SemanticCache()
+semantic_cache.load_from_history()
+history_store.on_remove = semantic_cache.discard
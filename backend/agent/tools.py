@@ -1,88 +1,502 @@
 # backend/agent/tools.py
 import json
+import asyncio
+import atexit
+import hashlib
+import threading
+import httpx
 import requests
-from typing import List, Dict, Any, Optional
-from config import SERPER_API_KEY, GROQ_API_KEY, AVAILABLE_MODELS, DEFAULT_MODEL, GROQ_API_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Callable, Tuple, AsyncIterator
+from config import (
+    SERPER_API_KEY, GROQ_API_KEY, AVAILABLE_MODELS, DEFAULT_MODEL, GROQ_API_URL,
+    MODEL_RATE_LIMITS, DEFAULT_RATE_LIMITS, LLM_COMPLETION_TOKENS_ESTIMATE,
+    SERPER_API_URL, SEARCH_TIMEOUT, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL, SEARCH_CACHE_DB,
+    LLM_CACHE_MAX_BYTES, LLM_CACHE_DB, LLM_CACHE_DISK_MAX_BYTES,
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF,
+    ASYNC_HTTP_MAX_CONNECTIONS, STAGE_MODELS, MODEL_FALLBACK_CHAIN, MODEL_MAX_FALLBACKS, LLM_LATENCY_SLO,
+    MODEL_COOLDOWN_SECONDS, MODEL_STATS_WINDOW, MODEL_ERROR_RATE_THRESHOLD,
+    EXTRACTION_CHUNK_TOKENS, EXTRACTION_MAX_CHUNKS, EXTRACTION_MAX_WORKERS, EXTRACTION_MAX_REASKS,
+    EXTRACTION_CACHE_SIZE, EXTRACTION_CACHE_TTL, EXTRACTION_CACHE_DB
+)
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from .cache import LRUCache, SQLiteCache, TieredCache, MISSING
+from .extraction import normalize_schema, chunk_text, repair_json, conform, merge_extractions
+from .prompts import EXTRACTION_PROMPT, EXTRACTION_CORRECTION_PROMPT
+from .ratelimit import ModelRateLimiter, parse_duration
+from .routing import ModelRouter
+from .metrics import UPSTREAM_SECONDS, LLM_TOKENS
 
-# Rate limiting variables
-LAST_REQUEST_TIME = 0
-RATE_LIMIT_DELAY = 1.0  # Minimum seconds between requests
+# Rate limiting: per-model request and token buckets shared by every thread
+rate_limiter = ModelRateLimiter(MODEL_RATE_LIMITS, DEFAULT_RATE_LIMITS)
+# Model routing: preferred model per stage and failover order, fed by live call stats
+model_router = ModelRouter(
+    AVAILABLE_MODELS, DEFAULT_MODEL, STAGE_MODELS, MODEL_FALLBACK_CHAIN, MODEL_MAX_FALLBACKS,
+    LLM_LATENCY_SLO, MODEL_COOLDOWN_SECONDS, MODEL_STATS_WINDOW, MODEL_ERROR_RATE_THRESHOLD
+)
 MAX_RETRIES = 3
-RETRY_DELAY = 5.0  # Seconds to wait after rate limit error
+RETRY_DELAY = 5.0  # Seconds to wait after a rate limit error without Retry-After
 
+# Shared HTTP sessions, one keep-alive connection pool per upstream host and retry policy
+_http_sessions: Dict[Tuple[str, bool], requests.Session] = {}
+_http_sessions_lock = threading.Lock()
 
-def search_web(query: str, num_results: int = 5) -> List[Dict[str, Any]]:
+
+def get_http_session(url: str, retry: bool = True) -> requests.Session:
+    """
+    Get the shared pooled session for the host serving a URL
+    
+    Sessions are created lazily and reused by every thread, so consecutive
+    calls to the same upstream reuse an open TCP/TLS connection.
+    
+    Args:
+        url: Any URL on the upstream host
+        retry: Retry connection errors and 5xx in the transport; calls that
+            can fail over to another model pass False and fail over instead
+        
+    Returns:
+        requests.Session with a keep-alive pool and retry policy mounted
+    """
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    
+    session = _http_sessions.get((host, retry))
+    if session is not None:
+        return session
+    
+    with _http_sessions_lock:
+        session = _http_sessions.get((host, retry))
+        if session is None:
+            # 429 is deliberately left out of the retry statuses (and
+            # Retry-After is not honoured here): query_llm handles rate
+            # limiting itself so it can honour Retry-After or fail over.
+            retry_policy = Retry(
+                total=HTTP_MAX_RETRIES if retry else 0,
+                backoff_factor=HTTP_RETRY_BACKOFF,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=None,
+                respect_retry_after_header=False,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry_policy)
+            session = requests.Session()
+            session.mount(host, adapter)
+            _http_sessions[(host, retry)] = session
+    return session
+
+
+def get_http_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get connection reuse counters for every upstream host
+    
+    Returns:
+        Dictionary keyed by host with requests sent, connections opened and
+        the number of requests that reused an existing connection
+    """
+    stats = {}
+    for (host, _), session in list(_http_sessions.items()):
+        adapter = session.get_adapter(host)
+        pools = adapter.poolmanager.pools
+        requests_sent = 0
+        connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections += pool.num_connections
+        host_stats = stats.setdefault(host, {"requests": 0, "connections": 0, "reused": 0})
+        host_stats["requests"] += requests_sent
+        host_stats["connections"] += connections
+        host_stats["reused"] += max(0, requests_sent - connections)
+    return stats
+
+
+def close_http_sessions() -> None:
+    """Close every pooled session (registered to run at interpreter shutdown)"""
+    with _http_sessions_lock:
+        for session in _http_sessions.values():
+            session.close()
+        _http_sessions.clear()
+
+
+atexit.register(close_http_sessions)
+
+# Async HTTP clients, one pool per event loop (httpx clients cannot be shared across loops)
+_async_pools: Dict[asyncio.AbstractEventLoop, "AsyncClientPool"] = {}
+_RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class AsyncClientPool:
+    """
+    Keep-alive httpx clients for one event loop
+    
+    ASYNC_HTTP_MAX_CONNECTIONS is split across clients of HTTP_POOL_SIZE
+    connections each, and a request first takes a free connection slot from
+    a shared queue. httpcore rescans all of a client's connections and its
+    wait queue whenever a request starts or finishes, so one client with
+    hundreds of connections and queued requests stalls the event loop; small
+    clients that never queue internally keep those scans short.
+    """
+    
+    def __init__(self, max_connections: int = ASYNC_HTTP_MAX_CONNECTIONS, client_size: int = HTTP_POOL_SIZE):
+        client_size = max(1, min(client_size, max_connections))
+        ssl_context = httpx.create_ssl_context()  # Loading the CA bundle is slow and large, so share one
+        self.clients = [
+            httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=client_size, max_keepalive_connections=client_size),
+                timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                # Transport retries only cover connection errors; 5xx is retried in _async_request
+                transport=httpx.AsyncHTTPTransport(verify=ssl_context, retries=HTTP_MAX_RETRIES)
+            )
+            for _ in range(max(1, max_connections // client_size))
+        ]
+        # One slot per connection, interleaved so consecutive requests spread across clients
+        self._slots: asyncio.Queue = asyncio.Queue()
+        for _ in range(client_size):
+            for client in self.clients:
+                self._slots.put_nowait(client)
+    
+    @property
+    def is_closed(self) -> bool:
+        return self.clients[0].is_closed
+    
+    async def acquire(self) -> httpx.AsyncClient:
+        """Wait for a free connection slot and return the client it belongs to"""
+        return await self._slots.get()
+    
+    def release(self, client: httpx.AsyncClient) -> None:
+        self._slots.put_nowait(client)
+    
+    async def aclose(self) -> None:
+        for client in self.clients:
+            await client.aclose()
+
+
+def get_async_client_pool() -> AsyncClientPool:
+    """
+    Get the async client pool for the running event loop, creating it on first use
+    
+    Returns:
+        AsyncClientPool shared by every research task on the loop
+    """
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None or pool.is_closed:
+        pool = AsyncClientPool()
+        _async_pools[loop] = pool
+    return pool
+
+
+async def close_async_http_client() -> None:
+    """Close the running loop's async clients (call before the loop shuts down)"""
+    pool = _async_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
+
+
+@asynccontextmanager
+async def _async_request(method: str, url: str, stream: bool = False, retry: bool = True,
+                         **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    Send a request on the loop's pool and close the response on exit
+    
+    The connection slot is held until the response is closed. 5xx responses
+    are retried with the same backoff as the sync sessions unless retry is False.
+    """
+    pool = get_async_client_pool()
+    client = await pool.acquire()
+    try:
+        request = client.build_request(method, url, **kwargs)
+        retries = HTTP_MAX_RETRIES if retry else 0
+        for attempt in range(retries + 1):
+            response = await client.send(request, stream=stream)
+            if response.status_code not in _RETRY_STATUSES or attempt == retries:
+                break
+            await response.aclose()
+            await asyncio.sleep(HTTP_RETRY_BACKOFF * (2 ** attempt))
+        try:
+            yield response
+        finally:
+            await response.aclose()
+    finally:
+        pool.release(client)
+
+# Search results keyed on the normalized query and result count
+search_cache = TieredCache(
+    LRUCache(max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL),
+    SQLiteCache(SEARCH_CACHE_DB, table="search_cache", ttl=SEARCH_CACHE_TTL) if SEARCH_CACHE_DB else None
+)
+
+
+def _search_cache_key(query: str, num_results: int) -> str:
+    normalized = " ".join(query.lower().split())
+    return f"{normalized}|{num_results}"
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss/eviction counters for the search result cache"""
+    return search_cache.stats()
+
+
+def purge_search_cache() -> int:
+    """Drop every cached search result and return how many entries were removed"""
+    return search_cache.clear()
+
+# Prefixes of the error strings query_llm returns instead of raising
+LLM_ERROR_PREFIXES = ("Error:", "HTTP Error:", "Request Error:")
+
+# Successful LLM completions keyed on a hash of the full request payload
+llm_cache = TieredCache(
+    LRUCache(max_entries=100000, max_bytes=LLM_CACHE_MAX_BYTES),
+    SQLiteCache(LLM_CACHE_DB, table="llm_cache", max_bytes=LLM_CACHE_DISK_MAX_BYTES) if LLM_CACHE_DB else None
+)
+
+# A fallback model's answers keyed on the preferred model's request, in memory only and for
+# about as long as the preferred model cools down, so repeated calls during an outage skip the
+# failover. They never enter llm_cache, which holds each model's own answers.
+fallback_answers = LRUCache(max_entries=10000, ttl=MODEL_COOLDOWN_SECONDS, max_bytes=LLM_CACHE_MAX_BYTES // 8)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate (roughly four characters per token for English)
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated token count
+    """
+    return len(text) // 4 + 1 if text else 0
+
+
+def is_llm_error(text: str) -> bool:
+    """Whether a query_llm result is one of its error strings (or empty) rather than a completion"""
+    return not text or text.strip().startswith(LLM_ERROR_PREFIXES)
+
+
+def _llm_cache_key(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss/eviction counters for the LLM response cache"""
+    return llm_cache.stats()
+
+
+def purge_llm_cache() -> int:
+    """Drop every cached LLM response and return how many entries were removed"""
+    fallback_answers.clear()
+    return llm_cache.clear()
+
+
+def _search_request(query: str, num_results: int) -> Tuple[Dict[str, str], str]:
+    """Headers and JSON body of a Serper search request"""
+    payload = json.dumps({
+        "q": query,
+        "num": num_results
+    })
+    headers = {
+        'Content-Type': 'application/json'
+    }
+    # httpx rejects None header values (requests silently drops them)
+    if SERPER_API_KEY:
+        headers['X-API-KEY'] = SERPER_API_KEY
+    return headers, payload
+
+
+def _search_outcome(error: Exception) -> str:
+    """Outcome label of a failed Serper call for the upstream latency histogram"""
+    if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
+        return "timeout"
+    response = getattr(error, "response", None)
+    if response is not None and response.status_code == 429:
+        return "rate_limited"
+    return "error"
+
+
+def _format_search_results(search_results: Dict[str, Any], num_results: int) -> List[Dict[str, Any]]:
+    """Extract and format the organic results of a Serper response"""
+    formatted_results = []
+    if "organic" in search_results:
+        for result in search_results["organic"][:num_results]:
+            formatted_results.append({
+                "title": result.get("title", ""),
+                "link": result.get("link", ""),
+                "snippet": result.get("snippet", ""),
+                "source": "google"
+            })
+    return formatted_results
+
+
+def search_web(query: str, num_results: int = 5, timeout: float = SEARCH_TIMEOUT,
+               use_cache: bool = True) -> List[Dict[str, Any]]:
     """
     Search the web using Serper API
     
     Args:
         query: Search query string
         num_results: Number of results to return
+        timeout: Seconds to wait for Serper before giving up
+        use_cache: Serve and store results through the search cache
         
     Returns:
         List of search result dictionaries
     """
+    cache_key = _search_cache_key(query, num_results)
+    if use_cache:
+        cached = search_cache.get(cache_key)
+        if cached is not MISSING:
+            return [dict(result) for result in cached]
+    
+    started = time.monotonic()
     try:
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({
-            "q": query,
-            "num": num_results
-        })
-        headers = {
-            'X-API-KEY': SERPER_API_KEY,
-            'Content-Type': 'application/json'
-        }
+        url = SERPER_API_URL
+        headers, payload = _search_request(query, num_results)
         
-        response = requests.request("POST", url, headers=headers, data=payload)
+        response = get_http_session(url).post(
+            url,
+            headers=headers,
+            data=payload,
+            timeout=(HTTP_CONNECT_TIMEOUT, timeout)
+        )
         response.raise_for_status()
+        UPSTREAM_SECONDS.observe(time.monotonic() - started, "serper", "", "ok")
         
-        search_results = response.json()
+        formatted_results = _format_search_results(response.json(), num_results)
         
-        # Extract and format the search results
-        formatted_results = []
-        if "organic" in search_results:
-            for result in search_results["organic"][:num_results]:
-                formatted_results.append({
-                    "title": result.get("title", ""),
-                    "link": result.get("link", ""),
-                    "snippet": result.get("snippet", ""),
-                    "source": "google"
-                })
+        # Empty results usually mean an upstream problem, so they are not cached
+        if use_cache and formatted_results:
+            search_cache.set(cache_key, formatted_results)
                 
-        return formatted_results
+        return [dict(result) for result in formatted_results]
     
     except Exception as e:
+        UPSTREAM_SECONDS.observe(time.monotonic() - started, "serper", "", _search_outcome(e))
         print(f"Error in search_web: {str(e)}")
         return []
 
 
+async def async_search_web(query: str, num_results: int = 5, timeout: float = SEARCH_TIMEOUT,
+                           use_cache: bool = True) -> List[Dict[str, Any]]:
+    """
+    Search the web using Serper API without blocking the event loop
+    
+    Same arguments, caching and error handling as search_web.
+    """
+    cache_key = _search_cache_key(query, num_results)
+    if use_cache:
+        cached = search_cache.get(cache_key)
+        if cached is not MISSING:
+            return [dict(result) for result in cached]
+    
+    started = time.monotonic()
+    try:
+        headers, payload = _search_request(query, num_results)
+        async with _async_request(
+            "POST",
+            SERPER_API_URL,
+            headers=headers,
+            content=payload,
+            timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT)
+        ) as response:
+            response.raise_for_status()
+            data = response.json()
+        UPSTREAM_SECONDS.observe(time.monotonic() - started, "serper", "", "ok")
+        
+        formatted_results = _format_search_results(data, num_results)
+        
+        if use_cache and formatted_results:
+            search_cache.set(cache_key, formatted_results)
+        
+        return [dict(result) for result in formatted_results]
+    
+    except Exception as e:
+        UPSTREAM_SECONDS.observe(time.monotonic() - started, "serper", "", _search_outcome(e))
+        print(f"Error in async_search_web: {str(e)}")
+        return []
 
 
-
-def query_llm(prompt: str, system_prompt: str = None, model: str = None) -> str:
+def _read_llm_stream(response: requests.Response, on_token: Callable[[str], None]) -> Tuple[str, Dict[str, int]]:
     """
-    Query an LLM using Groq API with rate limiting and retry logic
+    Consume an OpenAI-compatible server-sent event stream
     
     Args:
-        prompt: User prompt
-        system_prompt: Optional system prompt
-        model: LLM model to use (from available models in config)
+        response: Streaming HTTP response from the chat completions endpoint
+        on_token: Called with each piece of generated text as it arrives
         
     Returns:
-        Model response as string or error message
+        Tuple of the full completion text and the token usage reported, if any
     """
-    global LAST_REQUEST_TIME
+    parts = []
+    reported_usage = {}
+    done = False
+    # Read past [DONE] to the end of the body so the connection returns to the pool
+    for line in response.iter_lines(decode_unicode=True):
+        if not done:
+            done = _consume_sse_line(line, parts, reported_usage, on_token)
+    return "".join(parts), reported_usage
+
+
+async def _aread_llm_stream(response: httpx.Response, on_token: Callable[[str], None]) -> Tuple[str, Dict[str, int]]:
+    """Async counterpart of _read_llm_stream for httpx streaming responses"""
+    parts = []
+    reported_usage = {}
+    done = False
+    async for line in response.aiter_lines():
+        if not done:
+            done = _consume_sse_line(line, parts, reported_usage, on_token)
+    return "".join(parts), reported_usage
+
+
+def _consume_sse_line(line: str, parts: List[str], reported_usage: Dict[str, int],
+                      on_token: Callable[[str], None]) -> bool:
+    """
+    Handle one line of a chat completions event stream
     
+    Returns:
+        True once the stream's [DONE] marker has been read
+    """
+    if not line or not line.startswith("data:"):
+        return False
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return True
+    chunk = json.loads(data)
+    # Groq reports usage on the last chunk under x_groq; OpenAI uses a top-level field
+    usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+    if usage:
+        reported_usage.clear()
+        reported_usage.update(usage)
+    for choice in chunk.get("choices", []):
+        text = choice.get("delta", {}).get("content")
+        if text:
+            parts.append(text)
+            on_token(text)
+    return False
+
+
+def _add_usage(usage: Optional[Dict[str, int]], reported: Dict[str, int], cached: bool = False) -> None:
+    """Accumulate one call's token usage into a caller-supplied counter dictionary"""
+    if usage is None:
+        return
+    usage["llm_calls"] = usage.get("llm_calls", 0) + 1
+    if cached:
+        usage["cached_calls"] = usage.get("cached_calls", 0) + 1
+    for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        usage[key] = usage.get(key, 0) + int(reported.get(key) or 0)
+
+
+def _llm_request(prompt: str, system_prompt: Optional[str], model: Optional[str]) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """Resolve the model and build the headers and payload of a chat completions request"""
     if not model or model not in AVAILABLE_MODELS:
         model = DEFAULT_MODEL
     
-    # Rate limiting
-    elapsed = time.time() - LAST_REQUEST_TIME
-    if elapsed < RATE_LIMIT_DELAY:
-        time.sleep(RATE_LIMIT_DELAY - elapsed)
-    
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -103,31 +517,200 @@ def query_llm(prompt: str, system_prompt: str = None, model: str = None) -> str:
         "role": "user",
         "content": prompt
     })
+    return model, headers, payload
+
+
+def _cached_completion(key: str, usage: Optional[Dict[str, int]],
+                       on_token: Optional[Callable[[str], None]]) -> Any:
+    """Answer a request from the LLM cache, then from recent fallback answers, or return MISSING"""
+    cached = llm_cache.get(key)
+    if cached is MISSING:
+        cached = fallback_answers.get(key)
+    if cached is not MISSING:
+        _add_usage(usage, {}, cached=True)
+        if on_token:
+            on_token(cached)
+    return cached
+
+
+class _StreamGuard:
+    """Forwards streamed text and remembers when it started; failing over after that would repeat text"""
+    
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+        self.first_token_at: Optional[float] = None
+    
+    @property
+    def started(self) -> bool:
+        return self.first_token_at is not None
+    
+    def __call__(self, text: str) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.on_token(text)
+
+
+def _call_latency(started: float, stream: Optional[_StreamGuard]) -> float:
+    """Seconds until the reply (or, when streaming, its first token) arrived"""
+    if stream and stream.started:
+        return stream.first_token_at - started
+    return time.monotonic() - started
+
+
+def _record_call(model: str, outcome: str, started: float, stream: Optional[_StreamGuard] = None,
+                 cooldown: Optional[float] = None) -> None:
+    """Feed one Groq call's outcome to the model router and the upstream latency histogram"""
+    UPSTREAM_SECONDS.observe(time.monotonic() - started, "groq", model, outcome)
+    latency = _call_latency(started, stream) if outcome == "ok" else None
+    model_router.record(model, outcome, latency=latency, cooldown=cooldown)
+
+
+def _count_tokens(model: str, reported: Dict[str, int]) -> None:
+    for kind in ("prompt", "completion"):
+        tokens = int(reported.get(f"{kind}_tokens") or 0)
+        if tokens:
+            LLM_TOKENS.inc(model, kind, amount=tokens)
+
+
+def _record_fallback(usage: Optional[Dict[str, int]], from_model: str, to_model: str) -> None:
+    print(f"Falling back from {from_model} to {to_model}")
+    model_router.record_fallback(from_model, to_model)
+    if usage is not None:
+        usage["fallbacks"] = usage.get("fallbacks", 0) + 1
+
+
+def query_llm(prompt: str, system_prompt: str = None, model: str = None, use_cache: bool = True,
+              on_token: Optional[Callable[[str], None]] = None, usage: Optional[Dict[str, int]] = None,
+              stage: Optional[str] = None) -> str:
+    """
+    Query an LLM using Groq API with rate limiting, retry and failover logic
+    
+    The model router picks the model for the stage and the models to fall
+    back to. A 429, 5xx, connection error or a reply slower than
+    LLM_LATENCY_SLO moves the call to the next model; the last model keeps
+    retrying 429s up to MAX_RETRIES. Identical payloads are answered from the
+    LLM response cache. Only successful completions are cached, never the
+    error strings below.
+    
+    Args:
+        prompt: User prompt
+        system_prompt: Optional system prompt
+        model: LLM model chosen for the run (from available models in config)
+        use_cache: Serve and store the response through the LLM cache
+        on_token: If given, stream the completion and call this with each
+            piece of text as it arrives (a cached reply arrives as one piece)
+        usage: Optional dictionary that call counts and the token usage
+            reported by the API are added to
+        stage: Pipeline stage making the call, for per-stage model preferences
+        
+    Returns:
+        Model response as string or error message
+    """
+    routes = [_llm_request(prompt, system_prompt, candidate) for candidate in model_router.candidates(stage, model)]
+    # The candidates put healthy models first, so while the preferred model cools down
+    # routes[0] is a fallback; lookups still use the preferred model's request
+    preferred = model_router.preferred(stage, model)
+    preferred_key = _llm_cache_key(_llm_request(prompt, system_prompt, preferred)[2])
+    
+    if use_cache:
+        cached = _cached_completion(preferred_key, usage, on_token)
+        if cached is not MISSING:
+            return cached
+    
+    estimated_tokens = (
+        estimate_tokens(system_prompt or "") + estimate_tokens(prompt) + LLM_COMPLETION_TOKENS_ESTIMATE
+    )
+    stream = _StreamGuard(on_token) if on_token else None
+    
+    for index, (model, headers, payload) in enumerate(routes):
+        if index:
+            _record_fallback(usage, routes[index - 1][0], model)
+        content = _query_model(model, headers, payload, estimated_tokens, use_cache,
+                               preferred_key if model != preferred else None, stream, usage,
+                               has_fallback=index < len(routes) - 1)
+        if content is not None:
+            return content
+    
+    return "Error: Max retries reached. Please try again later."
+
+
+def _query_model(model: str, headers: Dict[str, str], payload: Dict[str, Any], estimated_tokens: int,
+                 use_cache: bool, fallback_for: Optional[str], stream: Optional[_StreamGuard],
+                 usage: Optional[Dict[str, int]], has_fallback: bool) -> Optional[str]:
+    """
+    Call one model for query_llm
+    
+    A completion is cached under this model's own request; when the model
+    stands in for the preferred one, it is also kept in fallback_answers
+    under fallback_for, the preferred model's cache key.
+    
+    Returns:
+        The completion or an error string, or None to fail over to the next model
+    """
+    # The model may have started cooling down since the candidates were ranked;
+    # skip it rather than wait out its Retry-After in the rate limiter
+    if has_fallback and not model_router.is_healthy(model):
+        return None
+    # Streaming only changes the transport, so it is left out of the cache key
+    request_payload = dict(payload, stream=True) if stream else payload
+    read_timeout = model_router.read_timeout(HTTP_READ_TIMEOUT, has_fallback)
     
     for attempt in range(MAX_RETRIES):
         try:
-            LAST_REQUEST_TIME = time.time()
-            response = requests.post(
+            # Rate limiting (waits for this model's request and token budget)
+            rate_limiter.acquire(model, estimated_tokens)
+            started = time.monotonic()
+            response = get_http_session(GROQ_API_URL, retry=not has_fallback).post(
                 GROQ_API_URL,
                 headers=headers,
-                json=payload,
-                timeout=30  # 30-second timeout
+                json=request_payload,
+                timeout=(HTTP_CONNECT_TIMEOUT, read_timeout),
+                stream=bool(stream)
             )
+            rate_limiter.update_from_headers(model, response.headers)
             response.raise_for_status()
             
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+            if stream:
+                with response:
+                    content, reported_usage = _read_llm_stream(response, stream)
+            else:
+                result = response.json()
+                reported_usage = result.get("usage") or {}
+                content = result["choices"][0]["message"]["content"]
+            _record_call(model, "ok", started, stream)
+            _count_tokens(model, reported_usage)
+            if reported_usage.get("total_tokens") is not None:
+                rate_limiter.record_usage(model, estimated_tokens, reported_usage["total_tokens"])
+            _add_usage(usage, reported_usage)
+            if use_cache and content:
+                llm_cache.set(_llm_cache_key(payload), content)
+                if fallback_for is not None:
+                    fallback_answers.set(fallback_for, content)
+            return content
             
         except requests.exceptions.HTTPError as e:
+            response.close()
             if response.status_code == 429:  # Rate limited
-                retry_after = float(response.headers.get('Retry-After', RETRY_DELAY))
-                print(f"Rate limited. Waiting {retry_after} seconds (attempt {attempt + 1}/{MAX_RETRIES})")
-                time.sleep(retry_after)
+                # The limiter already honoured Retry-After; the next acquire() waits it out
+                if "Retry-After" not in response.headers:
+                    rate_limiter.block(model, RETRY_DELAY)
+                _record_call(model, "rate_limited", started, cooldown=parse_duration(response.headers.get("Retry-After")))
+                print(f"Rate limited on {model} (attempt {attempt + 1}/{MAX_RETRIES})")
+                if has_fallback:
+                    return None
                 continue
+            if response.status_code >= 500:
+                _record_call(model, "error", started)
+                if has_fallback and not (stream and stream.started):
+                    return None
             print(f"HTTP Error in query_llm: {str(e)}")
             return f"HTTP Error: {str(e)}"
             
         except requests.exceptions.RequestException as e:
+            timed_out = isinstance(e, requests.exceptions.Timeout)
+            _record_call(model, "timeout" if timed_out else "error", started)
+            if has_fallback and not (stream and stream.started):
+                return None
             print(f"Request failed: {str(e)}")
             return f"Request Error: {str(e)}"
             
@@ -138,38 +721,303 @@ def query_llm(prompt: str, system_prompt: str = None, model: str = None) -> str:
     return "Error: Max retries reached. Please try again later."
 
 
-def extract_information(text: str, schema: Dict[str, Any], model: str = None) -> Dict[str, Any]:
+async def async_query_llm(prompt: str, system_prompt: str = None, model: str = None, use_cache: bool = True,
+                          on_token: Optional[Callable[[str], None]] = None,
+                          usage: Optional[Dict[str, int]] = None, stage: Optional[str] = None) -> str:
+    """
+    Query an LLM using Groq API without blocking the event loop
+    
+    Same arguments, caching, rate limiting, retries, failover and error
+    strings as query_llm; waits for the rate limiter are spent in asyncio.sleep.
+    """
+    routes = [_llm_request(prompt, system_prompt, candidate) for candidate in model_router.candidates(stage, model)]
+    # The candidates put healthy models first, so while the preferred model cools down
+    # routes[0] is a fallback; lookups still use the preferred model's request
+    preferred = model_router.preferred(stage, model)
+    preferred_key = _llm_cache_key(_llm_request(prompt, system_prompt, preferred)[2])
+    
+    if use_cache:
+        cached = _cached_completion(preferred_key, usage, on_token)
+        if cached is not MISSING:
+            return cached
+    
+    estimated_tokens = (
+        estimate_tokens(system_prompt or "") + estimate_tokens(prompt) + LLM_COMPLETION_TOKENS_ESTIMATE
+    )
+    stream = _StreamGuard(on_token) if on_token else None
+    
+    for index, (model, headers, payload) in enumerate(routes):
+        if index:
+            _record_fallback(usage, routes[index - 1][0], model)
+        content = await _async_query_model(model, headers, payload, estimated_tokens, use_cache,
+                                           preferred_key if model != preferred else None, stream, usage,
+                                           has_fallback=index < len(routes) - 1)
+        if content is not None:
+            return content
+    
+    return "Error: Max retries reached. Please try again later."
+
+
+async def _async_query_model(model: str, headers: Dict[str, str], payload: Dict[str, Any], estimated_tokens: int,
+                             use_cache: bool, fallback_for: Optional[str], stream: Optional[_StreamGuard],
+                             usage: Optional[Dict[str, int]], has_fallback: bool) -> Optional[str]:
+    """Call one model for async_query_llm (same results as _query_model)"""
+    if has_fallback and not model_router.is_healthy(model):
+        return None
+    request_payload = dict(payload, stream=True) if stream else payload
+    timeout = httpx.Timeout(model_router.read_timeout(HTTP_READ_TIMEOUT, has_fallback), connect=HTTP_CONNECT_TIMEOUT)
+    
+    for attempt in range(MAX_RETRIES):
+        try:
+            wait = rate_limiter.reserve(model, estimated_tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            started = time.monotonic()
+            async with _async_request(
+                "POST", GROQ_API_URL, stream=bool(stream), retry=not has_fallback, headers=headers,
+                json=request_payload, timeout=timeout
+            ) as response:
+                rate_limiter.update_from_headers(model, response.headers)
+                if response.status_code == 429:  # Rate limited
+                    if "Retry-After" not in response.headers:
+                        rate_limiter.block(model, RETRY_DELAY)
+                    _record_call(model, "rate_limited", started, cooldown=parse_duration(response.headers.get("Retry-After")))
+                    print(f"Rate limited on {model} (attempt {attempt + 1}/{MAX_RETRIES})")
+                    if has_fallback:
+                        return None
+                    continue
+                response.raise_for_status()
+                
+                if stream:
+                    content, reported_usage = await _aread_llm_stream(response, stream)
+                else:
+                    result = response.json()
+                    reported_usage = result.get("usage") or {}
+                    content = result["choices"][0]["message"]["content"]
+            _record_call(model, "ok", started, stream)
+            _count_tokens(model, reported_usage)
+            if reported_usage.get("total_tokens") is not None:
+                rate_limiter.record_usage(model, estimated_tokens, reported_usage["total_tokens"])
+            _add_usage(usage, reported_usage)
+            if use_cache and content:
+                llm_cache.set(_llm_cache_key(payload), content)
+                if fallback_for is not None:
+                    fallback_answers.set(fallback_for, content)
+            return content
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                _record_call(model, "error", started)
+                if has_fallback and not (stream and stream.started):
+                    return None
+            print(f"HTTP Error in async_query_llm: {str(e)}")
+            return f"HTTP Error: {str(e)}"
+            
+        except httpx.RequestError as e:
+            _record_call(model, "timeout" if isinstance(e, httpx.TimeoutException) else "error", started)
+            if has_fallback and not (stream and stream.started):
+                return None
+            print(f"Request failed: {str(e)}")
+            return f"Request Error: {str(e)}"
+            
+        except Exception as e:
+            print(f"Unexpected error: {str(e)}")
+            return f"Error: {str(e)}"
+    
+    return "Error: Max retries reached. Please try again later."
+
+
+# Structured extractions keyed on the schema, the model and a hash of the text
+extraction_cache = TieredCache(
+    LRUCache(max_entries=EXTRACTION_CACHE_SIZE, ttl=EXTRACTION_CACHE_TTL),
+    SQLiteCache(EXTRACTION_CACHE_DB, table="extraction_cache", ttl=EXTRACTION_CACHE_TTL) if EXTRACTION_CACHE_DB else None
+)
+
+
+def _extraction_cache_key(schema: Dict[str, Any], text: str, model: str) -> str:
+    schema_hash = hashlib.sha256(json.dumps([schema, model], sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{schema_hash}|{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+def _extraction_prompts(text: str, schema: Dict[str, Any]) -> List[str]:
+    """One extraction prompt per chunk of the text"""
+    schema_str = json.dumps(schema, indent=2)
+    chunks = chunk_text(text, EXTRACTION_CHUNK_TOKENS * 4)
+    if len(chunks) > EXTRACTION_MAX_CHUNKS:
+        print(f"Extraction text has {len(chunks)} chunks, reading the first {EXTRACTION_MAX_CHUNKS}")
+        chunks = chunks[:EXTRACTION_MAX_CHUNKS]
+    return [
+        EXTRACTION_PROMPT.format(
+            schema=schema_str,
+            part=f" (part {i} of {len(chunks)})" if len(chunks) > 1 else "",
+            text=chunk
+        )
+        for i, chunk in enumerate(chunks, 1)
+    ]
+
+
+def _parse_extraction(response: str, schema: Dict[str, Any], usage: Dict[str, int]) -> Tuple[Any, Optional[str]]:
+    """
+    Parse and conform one chunk's reply
+
+    Returns:
+        Tuple of the conformed value (None if unusable) and, when unusable,
+        the problem to put in a correction request (None for an LLM error,
+        which a correction cannot fix)
+    """
+    if is_llm_error(response):
+        return None, None
+    try:
+        value, repaired = repair_json(response)
+    except ValueError as e:
+        return None, str(e)
+    if schema.get("type") == "object" and not isinstance(value, dict):
+        return None, "The answer must be a JSON object"
+    if repaired:
+        usage["extraction_repaired"] = usage.get("extraction_repaired", 0) + 1
+    return conform(value, schema), None
+
+
+def _correction_prompt(response: str, problem: str, schema: Dict[str, Any]) -> str:
+    return EXTRACTION_CORRECTION_PROMPT.format(problem=problem, response=response, schema=json.dumps(schema, indent=2))
+
+
+def _extract_chunk(prompt: str, schema: Dict[str, Any], model: Optional[str], use_cache: bool) -> Tuple[Any, str, Dict[str, int]]:
+    """Extract one chunk, repairing its reply locally and asking for corrections when that fails"""
+    usage: Dict[str, int] = {}
+    response = query_llm(prompt, model=model, use_cache=use_cache, usage=usage, stage="extracting")
+    value, problem = _parse_extraction(response, schema, usage)
+    for _ in range(EXTRACTION_MAX_REASKS):
+        if problem is None:
+            break
+        usage["extraction_reasks"] = usage.get("extraction_reasks", 0) + 1
+        response = query_llm(_correction_prompt(response, problem, schema), model=model, use_cache=use_cache,
+                             usage=usage, stage="extracting")
+        value, problem = _parse_extraction(response, schema, usage)
+    return value, response, usage
+
+
+async def _async_extract_chunk(prompt: str, schema: Dict[str, Any], model: Optional[str],
+                               use_cache: bool) -> Tuple[Any, str, Dict[str, int]]:
+    usage: Dict[str, int] = {}
+    response = await async_query_llm(prompt, model=model, use_cache=use_cache, usage=usage, stage="extracting")
+    value, problem = _parse_extraction(response, schema, usage)
+    for _ in range(EXTRACTION_MAX_REASKS):
+        if problem is None:
+            break
+        usage["extraction_reasks"] = usage.get("extraction_reasks", 0) + 1
+        response = await async_query_llm(_correction_prompt(response, problem, schema), model=model,
+                                         use_cache=use_cache, usage=usage, stage="extracting")
+        value, problem = _parse_extraction(response, schema, usage)
+    return value, response, usage
+
+
+def _merge_chunk_results(results: List[Tuple[Any, str, Dict[str, int]]], schema: Dict[str, Any],
+                         usage: Optional[Dict[str, int]]) -> Tuple[Dict[str, Any], bool]:
+    """Merge the chunks' values; returns the result and whether every chunk succeeded"""
+    values = [value for value, _, _ in results if value is not None]
+    failed = len(results) - len(values)
+    if usage is not None:
+        for _, _, chunk_usage in results:
+            for key, count in chunk_usage.items():
+                usage[key] = usage.get(key, 0) + count
+        usage["extraction_chunks"] = usage.get("extraction_chunks", 0) + len(results)
+        if failed:
+            usage["extraction_failed_chunks"] = usage.get("extraction_failed_chunks", 0) + failed
+    if not results:
+        return merge_extractions([], schema), True
+    if not values:
+        return {"error": "Failed to extract structured information", "raw_text": results[-1][1]}, False
+    return merge_extractions(values, schema), not failed
+
+
+def _cached_extraction(key: str, use_cache: bool, usage: Optional[Dict[str, int]]) -> Any:
+    if not use_cache:
+        return MISSING
+    cached = extraction_cache.get(key)
+    if cached is not MISSING and usage is not None:
+        usage["extraction_cached"] = usage.get("extraction_cached", 0) + 1
+    return cached
+
+
+def extract_information(text: str, schema: Dict[str, Any], model: str = None, use_cache: bool = True,
+                        usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
     """
     Extract structured information from text based on a schema
     
+    Text longer than EXTRACTION_CHUNK_TOKENS is split into chunks that are
+    extracted in parallel (EXTRACTION_MAX_WORKERS at once) and merged
+    against the schema: lists are concatenated without repeats and other
+    fields take the first value found. Replies wrapped in code fences, with
+    trailing commas or cut off mid-object are repaired locally; only a reply
+    that cannot be repaired costs a correction request. Results are cached
+    on the schema, model and a hash of the text.
+    
     Args:
         text: Text to extract information from
-        schema: Dictionary defining the expected structure
-        model: LLM model to use
+        schema: JSON Schema, or shorthand like {"name": "string", "tags": ["string"]}
+        model: LLM model to use (EXTRACTION_MODEL takes precedence when set)
+        use_cache: Serve and store the result through the extraction and LLM caches
+        usage: Optional dictionary that LLM call and token counts and the
+            extraction counters (chunks, repaired, reasks, failed chunks,
+            cache hits) are added to
         
     Returns:
-        Dictionary of extracted information
+        Dictionary following the schema, with null or an empty list for
+        anything not found; {"error": ..., "raw_text": ...} when no chunk
+        could be extracted
     """
-    # For simplicity, we'll use the LLM to extract information
-    schema_str = json.dumps(schema, indent=2)
+    schema = normalize_schema(schema)
+    key = _extraction_cache_key(schema, text, model_router.preferred("extracting", model))
+    cached = _cached_extraction(key, use_cache, usage)
+    if cached is not MISSING:
+        return cached
     
-    prompt = f"""
-    Extract information from the following text according to this JSON schema:
+    prompts = _extraction_prompts(text, schema)
+    with ThreadPoolExecutor(max_workers=max(1, min(EXTRACTION_MAX_WORKERS, len(prompts))),
+                            thread_name_prefix="extract") as executor:
+        results = list(executor.map(lambda prompt: _extract_chunk(prompt, schema, model, use_cache), prompts))
     
-    {schema_str}
-    
-    Text:
-    {text}
+    extracted, complete = _merge_chunk_results(results, schema, usage)
+    # A result missing chunks is returned but not cached, so the next call retries them
+    if use_cache and complete:
+        extraction_cache.set(key, extracted)
+    return extracted
+
+
+async def async_extract_information(text: str, schema: Dict[str, Any], model: str = None, use_cache: bool = True,
+                                    usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Extract structured information without blocking the event loop
     
-    Return only a valid JSON object that follows the schema exactly.
+    Same arguments, chunking, repair, caching and result as extract_information.
     """
+    schema = normalize_schema(schema)
+    key = _extraction_cache_key(schema, text, model_router.preferred("extracting", model))
+    cached = _cached_extraction(key, use_cache, usage)
+    if cached is not MISSING:
+        return cached
     
-    response = query_llm(prompt, model=model)
+    prompts = _extraction_prompts(text, schema)
+    semaphore = asyncio.Semaphore(max(1, EXTRACTION_MAX_WORKERS))
     
-    try:
-        # Try to parse the response as JSON
-        extracted_info = json.loads(response)
-        return extracted_info
-    except json.JSONDecodeError:
-        # If parsing fails, return a simple error structure
-        return {"error": "Failed to extract structured information", "raw_text": response}
+    async def extract(prompt: str) -> Tuple[Any, str, Dict[str, int]]:
+        async with semaphore:
+            return await _async_extract_chunk(prompt, schema, model, use_cache)
+    
+    results = await asyncio.gather(*(extract(prompt) for prompt in prompts))
+    
+    extracted, complete = _merge_chunk_results(list(results), schema, usage)
+    if use_cache and complete:
+        extraction_cache.set(key, extracted)
+    return extracted
+
+
+def get_extraction_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss/eviction counters for the structured extraction cache"""
+    return extraction_cache.stats()
+
+
+def purge_extraction_cache() -> int:
+    """Drop every cached extraction and return how many entries were removed"""
+    return extraction_cache.clear()
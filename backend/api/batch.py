@@ -0,0 +1,150 @@
+# backend/api/batch.py
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+from agent.tools import model_router, rate_limiter
+from config import BATCH_MAX_IN_FLIGHT, BATCH_MIN_HEADROOM
+from .scheduler import scheduler, QueueFullError
+from .tasks import task_store
+from .websocket import register_task, progress_callback_factory
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+class ResearchBatch:
+    """
+    A list of research items fed to the shared scheduler a few at a time
+
+    Every item gets its own task (and history entry) up front. At most
+    `max_in_flight` items are queued or running at once, and an item is only
+    submitted while the rate limiter has at least `min_headroom` of the
+    quota left for the models it uses, so a large batch leaves room for
+    interactive requests. Items asking the same question with another model
+    or mode wait for the first such item to finish and then get its
+    planning and searches from the LLM and search caches. Identical items
+    are submitted together and share one run.
+    """
+
+    def __init__(self, user_id: str, items: List[Dict[str, Any]], submit: Callable[[Dict[str, Any]], None],
+                 max_in_flight: int = BATCH_MAX_IN_FLIGHT, min_headroom: float = BATCH_MIN_HEADROOM):
+        """
+        Args:
+            user_id: Owner of the batch and of every item's task
+            items: Validated items with query, model, mode, priority and force_refresh
+            submit: Starts one item (its task_id is set); raises QueueFullError when the queue is full
+            max_in_flight: Items queued or running at once
+            min_headroom: Share of a model's rate limit that must be left to submit an item using it
+        """
+        self.batch_id = f"batch_{uuid.uuid4()}"
+        self.user_id = user_id
+        self.submit = submit
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_headroom = min_headroom
+        self.started_at = time.time()
+        self.rate_limited_polls = 0  # Polls where an item was held back for rate-limit headroom
+        self.items: List[Dict[str, Any]] = []
+        first_by_query: Dict[str, Dict[str, Any]] = {}
+        for index, item in enumerate(items):
+            entry = {**item, "index": index, "task_id": register_task(user_id, item["query"]),
+                     "state": "waiting", "status": None, "after": None}
+            first = first_by_query.setdefault(_normalize(item["query"]), entry)
+            if first is not entry and any(first[key] != entry[key] for key in ("model", "mode", "force_refresh")):
+                entry["after"] = first
+            self.items.append(entry)
+            progress_callback_factory(entry["task_id"])({"step": "queued", "message": f"Waiting in batch {self.batch_id}", "percent": 0})
+
+    @property
+    def done(self) -> bool:
+        return all(item["state"] == "finished" for item in self.items)
+
+    def _headroom(self, item: Dict[str, Any]) -> float:
+        stages = ["planning", "synthesizing"] + (["summarizing"] if item["mode"] == "mapreduce" else [])
+        return min(rate_limiter.headroom(model_router.preferred(stage, item["model"])) for stage in stages)
+
+    def admit(self) -> int:
+        """
+        Submit waiting items while the batch has room and rate limits have headroom
+
+        Returns:
+            Number of items submitted
+        """
+        in_flight = sum(1 for item in self.items if item["state"] == "submitted")
+        admitted = 0
+        held_back = False
+        for item in self.items:
+            if in_flight >= self.max_in_flight:
+                break
+            if item["state"] != "waiting" or (item["after"] is not None and item["after"]["state"] != "finished"):
+                continue
+            if self._headroom(item) < self.min_headroom:
+                held_back = True
+                continue
+            try:
+                self.submit(item)
+            except QueueFullError:
+                break  # The next poll tries again
+            item["state"] = "submitted"
+            in_flight += 1
+            admitted += 1
+        if held_back:
+            self.rate_limited_polls += 1
+        return admitted
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Result lines for the items that finished since the last call"""
+        results = []
+        for item in self.items:
+            if item["state"] != "submitted":
+                continue
+            task = task_store.get(item["task_id"])
+            if task is None:
+                task = {"status": "error", "message": "Task state expired before the batch read it"}
+            elif task["finished_at"] is None:
+                continue
+            item["state"] = "finished"
+            item["status"] = task["status"]
+            results.append({
+                "type": "result",
+                "index": item["index"],
+                "task_id": item["task_id"],
+                "query": item["query"],
+                "model": item["model"],
+                "mode": item["mode"],
+                "status": task["status"],
+                "message": task.get("message", ""),
+                "history_id": task.get("history_id"),
+                "result": task.get("result")
+            })
+        return results
+
+    def progress(self) -> Dict[str, Any]:
+        """Counts for the whole batch, as sent in progress lines and batch_progress events"""
+        finished = [item for item in self.items if item["state"] == "finished"]
+        completed = sum(1 for item in finished if item["status"] == "completed")
+        return {
+            "batch_id": self.batch_id,
+            "total": len(self.items),
+            "completed": completed,
+            "failed": len(finished) - completed,
+            "in_flight": sum(1 for item in self.items if item["state"] == "submitted"),
+            "waiting": sum(1 for item in self.items if item["state"] == "waiting"),
+            "percent": round(100 * len(finished) / len(self.items)),
+            "elapsed_seconds": round(time.time() - self.started_at, 2)
+        }
+
+    def cancel_remaining(self) -> int:
+        """Cancel every item not finished yet (the client went away); returns how many"""
+        cancelled = 0
+        for item in self.items:
+            if item["state"] == "finished":
+                continue
+            if item["state"] == "submitted":
+                scheduler.cancel(item["task_id"])
+            progress_callback_factory(item["task_id"])({"step": "cancelled", "message": "Batch cancelled", "percent": 0})
+            task_store.finish(item["task_id"], "cancelled")
+            item["state"] = "finished"
+            item["status"] = "cancelled"
+            cancelled += 1
+        return cancelled
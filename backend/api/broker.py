@@ -0,0 +1,382 @@
+# backend/api/broker.py
+import argparse
+import json
+import logging
+import queue
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+from urllib.parse import urlparse
+from socketio import PubSubManager
+from config import MESSAGE_BROKER, MESSAGE_BROKER_URL, MESSAGE_BROKER_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, Any]
+
+
+class MessageBroker:
+    """
+    Publish/subscribe on named channels
+
+    Every subscriber of a channel receives every message published on it,
+    including messages published by its own process. Messages are JSON
+    objects. Callbacks run on the broker's delivery thread and must not block.
+    """
+
+    distributed = False  # True when other processes can see what is published
+
+    def publish(self, channel: str, message: Message) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str, callback: Callable[[Message], None]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "none"}
+
+    def close(self) -> None:
+        pass
+
+
+def _deliver(channel: str, callbacks: List[Callable[[Message], None]], message: Message) -> None:
+    for callback in callbacks:
+        try:
+            callback(message)
+        except Exception as e:
+            logger.error(f"Subscriber of channel {channel} failed: {str(e)}")
+
+
+class InProcessBroker(MessageBroker):
+    """Delivers messages to subscribers in this process, synchronously in the publishing thread"""
+
+    def __init__(self):
+        self._subscriptions: Dict[str, List[Callable[[Message], None]]] = {}
+        self._lock = threading.Lock()
+        self._published = 0
+
+    def publish(self, channel: str, message: Message) -> None:
+        with self._lock:
+            callbacks = list(self._subscriptions.get(channel, ()))
+            self._published += 1
+        _deliver(channel, callbacks, message)
+
+    def subscribe(self, channel: str, callback: Callable[[Message], None]) -> None:
+        with self._lock:
+            self._subscriptions.setdefault(channel, []).append(callback)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "inprocess", "published": self._published}
+
+
+def _parse_url(url: str) -> Tuple[str, int]:
+    parsed = urlparse(url)
+    if parsed.scheme != "tcp" or not parsed.hostname or not parsed.port:
+        raise ValueError(f"Broker URL must look like tcp://host:port, got {url}")
+    return parsed.hostname, parsed.port
+
+
+def _encode(frame: Message) -> bytes:
+    return (json.dumps(frame, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+class TcpBroker(MessageBroker):
+    """
+    Client of a broker server (BrokerServer, `python -m api.broker`)
+
+    Frames are newline-delimited JSON over one TCP connection per process. A
+    reader thread delivers incoming messages and reconnects with a fixed
+    delay when the connection drops, re-subscribing to every channel.
+    Messages published while disconnected are dropped and counted.
+    """
+
+    distributed = True
+
+    def __init__(self, url: str = MESSAGE_BROKER_URL, connect_timeout: float = 2.0, reconnect_delay: float = 1.0):
+        """
+        Args:
+            url: Broker address, tcp://host:port
+            connect_timeout: Seconds the first publish or subscribe waits for the connection
+            reconnect_delay: Seconds between connection attempts
+        """
+        self.address = _parse_url(url)
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self._subscriptions: Dict[str, List[Callable[[Message], None]]] = {}
+        self._sock = None
+        self._reader = None
+        self._closed = False
+        self._connected = threading.Event()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._published = 0
+        self._received = 0
+        self._dropped = 0
+        self._connects = 0
+
+    def _start(self) -> None:
+        """Start the reader thread on first use and wait briefly for the connection"""
+        with self._lock:
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._run, name="message-broker", daemon=True)
+                self._reader.start()
+        self._connected.wait(self.connect_timeout)
+
+    def _send(self, frame: bytes) -> bool:
+        with self._send_lock:
+            if self._sock is None:
+                return False
+            try:
+                self._sock.sendall(frame)
+                return True
+            except OSError:
+                return False
+
+    def publish(self, channel: str, message: Message) -> None:
+        self._start()
+        sent = self._send(_encode({"op": "pub", "channel": channel, "message": message}))
+        with self._lock:
+            if sent:
+                self._published += 1
+            else:
+                self._dropped += 1
+        if not sent:
+            logger.warning(f"Message broker unavailable, dropped a message on channel {channel}")
+
+    def subscribe(self, channel: str, callback: Callable[[Message], None]) -> None:
+        with self._lock:
+            self._subscriptions.setdefault(channel, []).append(callback)
+        self._start()
+        # Subscribing twice is harmless; the reader also subscribes on every (re)connect
+        self._send(_encode({"op": "sub", "channel": channel}))
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            channels = list(self._subscriptions)
+        with self._send_lock:
+            for channel in channels:
+                sock.sendall(_encode({"op": "sub", "channel": channel}))
+            self._sock = sock
+        return sock
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._closed:
+            try:
+                sock = self._connect()
+            except OSError as e:
+                if failures == 0:
+                    logger.warning(f"Cannot reach message broker at {self.address[0]}:{self.address[1]}: {str(e)}")
+                failures += 1
+                time.sleep(self.reconnect_delay)
+                continue
+            failures = 0
+            with self._lock:
+                self._connects += 1
+            self._connected.set()
+            try:
+                for line in sock.makefile("rb"):
+                    try:
+                        frame = json.loads(line)
+                    except ValueError:
+                        continue
+                    channel = frame.get("channel")
+                    with self._lock:
+                        callbacks = list(self._subscriptions.get(channel, ()))
+                        self._received += 1
+                    _deliver(channel, callbacks, frame.get("message"))
+            except OSError:
+                pass
+            finally:
+                self._connected.clear()
+                with self._send_lock:
+                    self._sock = None
+                sock.close()
+            if not self._closed:
+                logger.warning("Lost connection to the message broker, reconnecting")
+                time.sleep(self.reconnect_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "tcp",
+                "connected": self._connected.is_set(),
+                "connects": self._connects,
+                "published": self._published,
+                "received": self._received,
+                "dropped": self._dropped
+            }
+
+    def close(self) -> None:
+        self._closed = True
+        with self._send_lock:
+            if self._sock is not None:
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class _BrokerConnection(socketserver.StreamRequestHandler):
+    """One client connection; outgoing frames are queued and written by their own thread"""
+
+    def setup(self):
+        super().setup()
+        self.outbox: "queue.Queue[bytes]" = queue.Queue(self.server.queue_size)
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                frame = json.loads(line)
+            except ValueError:
+                continue
+            if frame.get("op") == "sub":
+                self.server.subscribe(self, frame.get("channel"))
+            elif frame.get("op") == "pub":
+                # A publish frame carries the channel and message subscribers expect, so it is relayed as is
+                self.server.relay(frame.get("channel"), line)
+
+    def finish(self):
+        self.server.unsubscribe(self)
+        self.outbox.put(b"")
+        super().finish()
+
+    def send(self, frame: bytes) -> None:
+        try:
+            self.outbox.put_nowait(frame)
+        except queue.Full:
+            # A peer that stopped reading must not hold up everyone else; it reconnects
+            logger.warning(f"Dropping broker client {self.client_address}: {self.server.queue_size} frames unread")
+            self.server.unsubscribe(self)
+            try:
+                self.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _write(self):
+        while True:
+            frame = self.outbox.get()
+            if not frame:
+                return
+            try:
+                self.request.sendall(frame)
+            except OSError:
+                return
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal broker for local multi-process runs and tests
+
+    Relays every published frame to each connection subscribed to its
+    channel, the publisher included. Nothing is persisted: subscribers only
+    get messages published while they are connected.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int], queue_size: int = MESSAGE_BROKER_QUEUE_SIZE):
+        """
+        Args:
+            address: (host, port) to listen on; port 0 picks a free port
+            queue_size: Frames buffered per connection before a slow client is disconnected
+        """
+        self.queue_size = queue_size
+        self._channels: Dict[str, Set[_BrokerConnection]] = {}
+        self._channels_lock = threading.Lock()
+        self.relayed = 0
+        super().__init__(address, _BrokerConnection)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def subscribe(self, connection: _BrokerConnection, channel: str) -> None:
+        with self._channels_lock:
+            self._channels.setdefault(channel, set()).add(connection)
+
+    def unsubscribe(self, connection: _BrokerConnection) -> None:
+        with self._channels_lock:
+            for connections in self._channels.values():
+                connections.discard(connection)
+
+    def relay(self, channel: str, frame: bytes) -> None:
+        with self._channels_lock:
+            connections = list(self._channels.get(channel, ()))
+            self.relayed += 1
+        for connection in connections:
+            connection.send(frame)
+
+    def start(self) -> threading.Thread:
+        """Serve from a daemon thread (for tests and benchmarks); stop with shutdown()"""
+        thread = threading.Thread(target=self.serve_forever, name="broker-server", daemon=True)
+        thread.start()
+        return thread
+
+
+class BrokerManager(PubSubManager):
+    """
+    Socket.IO client manager that shares emits and room changes through a MessageBroker
+
+    Passed to Flask-SocketIO as client_manager, so an emit to a room on one
+    process reaches the room's clients on every process. Incoming messages
+    are buffered by the broker's thread and picked up by the Socket.IO
+    background task, which polls so that it never blocks an eventlet hub.
+    """
+
+    name = "broker"
+
+    def __init__(self, broker: MessageBroker, channel: str = "socketio", write_only: bool = False,
+                 poll_interval: float = 0.01):
+        super().__init__(channel=channel, write_only=write_only)
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self._inbox: "queue.Queue[Message]" = queue.Queue()
+
+    def initialize(self):
+        if not self.write_only:
+            self.broker.subscribe(self.channel, self._inbox.put)
+        super().initialize()
+
+    def _publish(self, data: Message) -> None:
+        self.broker.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            try:
+                yield self._inbox.get_nowait()
+            except queue.Empty:
+                self.server.sleep(self.poll_interval)
+
+
+def create_broker(backend: str = MESSAGE_BROKER, url: str = MESSAGE_BROKER_URL) -> MessageBroker:
+    """Create the broker selected by MESSAGE_BROKER ("inprocess" or "tcp")"""
+    if backend == "tcp":
+        return TcpBroker(url)
+    if backend == "inprocess":
+        return InProcessBroker()
+    raise ValueError(f"Unknown message broker: {backend}")
+
+
+# Shared broker used by the task store, the websocket layer and cancellations
+broker = create_broker()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local message broker for several backend processes")
+    parser.add_argument("--url", default=MESSAGE_BROKER_URL, help="Address to listen on, tcp://host:port")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = BrokerServer(_parse_url(args.url))
+    logger.info(f"Message broker listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,92 @@
+# backend/api/metrics.py
+from flask import Blueprint, Response
+from typing import Dict
+from agent.metrics import registry, LabelValues
+from agent.semantic import semantic_cache
+from agent.tools import model_router, get_search_cache_stats, get_llm_cache_stats, get_extraction_cache_stats
+from agent.fetch import get_page_cache_stats
+from .scheduler import scheduler
+from .tasks import task_store
+from .websocket import progress_coalescer
+
+metrics_bp = Blueprint('metrics', __name__)
+
+SCHEDULER_OUTCOMES = ("submitted", "coalesced", "rejected", "completed", "failed", "cancelled")
+
+
+def _cache_stats() -> Dict[str, Dict[str, float]]:
+    semantic = semantic_cache.stats()
+    return {
+        "search": get_search_cache_stats(),
+        "llm": get_llm_cache_stats(),
+        "page": get_page_cache_stats(),
+        "extraction": get_extraction_cache_stats(),
+        "semantic": {"hits": semantic["hits"], "misses": semantic["lookups"] - semantic["hits"]}
+    }
+
+
+def _cache_lookups() -> Dict[LabelValues, float]:
+    return {
+        (cache, result): stats[key]
+        for cache, stats in _cache_stats().items()
+        for result, key in (("hit", "hits"), ("miss", "misses"))
+    }
+
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    ratios = {}
+    for cache, stats in _cache_stats().items():
+        lookups = stats["hits"] + stats["misses"]
+        ratios[(cache,)] = stats["hits"] / lookups if lookups else 0.0
+    return ratios
+
+
+def _scheduler_gauges() -> Dict[LabelValues, float]:
+    stats = scheduler.stats()
+    return {
+        ("queued",): stats["queue_depth"],
+        ("running",): stats["running"],
+        ("active_tasks",): task_store.stats()["active"]
+    }
+
+
+def _model_healthy() -> Dict[LabelValues, float]:
+    return {(model,): float(stats["healthy"]) for model, stats in model_router.stats()["models"].items()}
+
+
+def _fallbacks() -> Dict[LabelValues, float]:
+    fallbacks = {}
+    for route, count in model_router.stats()["fallbacks"].items():
+        from_model, to_model = route.split("->", 1)
+        fallbacks[(from_model, to_model)] = count
+    return fallbacks
+
+
+# Queue, task and cache state is already tracked by its owners, so it is read at scrape time
+registry.gauge("research_jobs", "Research jobs queued and running, and tasks not yet finished", ("state",),
+               collector=_scheduler_gauges)
+registry.counter("research_scheduler_jobs_total", "Research submissions by scheduler outcome", ("outcome",),
+                 collector=lambda: {(outcome,): scheduler.stats()[outcome] for outcome in SCHEDULER_OUTCOMES})
+registry.gauge("research_queue_wait_seconds", "Average, longest and current oldest queue wait", ("stat",),
+               collector=lambda: {
+                   (stat,): scheduler.stats()[f"{stat}_wait_seconds"] for stat in ("avg", "max", "oldest")
+               })
+registry.counter("cache_lookups_total", "Search, LLM and semantic cache lookups", ("cache", "result"),
+                 collector=_cache_lookups)
+registry.gauge("cache_hit_ratio", "Share of cache lookups answered from the cache", ("cache",),
+               collector=_cache_hit_ratio)
+registry.gauge("llm_model_healthy", "1 when the model router considers the model healthy", ("model",),
+               collector=_model_healthy)
+registry.counter("research_progress_events_total", "research_progress events emitted to task rooms, or dropped as superseded",
+                 ("outcome",), collector=lambda: {
+                     ("emitted",): progress_coalescer.stats()["emitted"],
+                     ("coalesced",): progress_coalescer.stats()["coalesced"]
+                 })
+registry.counter("llm_fallbacks_total", "LLM calls moved from one model to another", ("from_model", "to_model"),
+                 collector=_fallbacks)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -1,15 +1,105 @@
 # backend/api/routes.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
 import uuid
-import threading
-from agent.researcher import run_research_agent
-from agent.history import save_research_query, get_user_history, clear_user_history
-from .websocket import register_task, progress_callback_factory
-from config import AVAILABLE_MODELS, DEFAULT_MODEL
+from agent.researcher import (
+    run_research_agent, arun_research_agent, resume_research_agent, aresume_research_agent, resume_point, get_checkpoint_stats
+)
+from agent.semantic import semantic_cache
+from agent.tools import model_router
+from agent.history import (
+    save_research_query,
+    get_user_history,
+    get_history_entry,
+    clear_user_history,
+    history_cursor,
+    parse_history_cursor
+)
+from .websocket import socketio, register_task, progress_callback_factory, chunk_callback_factory, ChunkBatcher, progress_coalescer
+from .broker import broker
+from .scheduler import scheduler, ResearchJob, QueueFullError, JobCancelled
+from .tasks import task_store
+from .batch import ResearchBatch
+from config import (
+    AVAILABLE_MODELS,
+    DEFAULT_MODEL,
+    PIPELINE_MODES,
+    DEFAULT_PIPELINE_MODE,
+    HISTORY_PAGE_SIZE,
+    HISTORY_MAX_PAGE_SIZE,
+    TASK_WAIT_MAX_SECONDS,
+    TASK_WAIT_POLL_INTERVAL,
+    SEMANTIC_CACHE_ENABLED,
+    BATCH_MAX_ITEMS,
+    BATCH_PRIORITY,
+    BATCH_POLL_INTERVAL
+)
 
 api_bp = Blueprint('api', __name__)
 
+# Broker channel for cancel requests received by a process that is not running the job
+CANCEL_CHANNEL = "research.cancel"
+
+def cancel_forwarded(message: Dict[str, Any]) -> None:
+    """Cancel a task's job if it is queued or running in this process"""
+    scheduler.cancel(message["task_id"])
+
+if broker.distributed:
+    broker.subscribe(CANCEL_CHANNEL, cancel_forwarded)
+
+def coalesce_key(query: str, model: str, mode: str, force_refresh: bool = False) -> tuple:
+    """Identity of a research submission; in-flight submissions with equal keys share one run"""
+    return (" ".join(query.split()).casefold(), model, mode, force_refresh)
+
+def job_callbacks(job: ResearchJob) -> Tuple[Callable[[Dict[str, Any]], None], ChunkBatcher]:
+    """
+    Progress and chunk callbacks for a research job
+
+    The job may be shared by identical submissions, so everything it reports
+    goes to each subscribed task.
+    """
+    subscriber_ids = lambda: list(job.subscribers())
+    chunk_callback = chunk_callback_factory(job.task_id, task_ids=subscriber_ids)
+    
+    def job_progress_callback(progress_data):
+        # Progress reports double as cancellation checkpoints
+        job.raise_if_cancelled()
+        # Deliver streamed text before the progress event that follows it
+        chunk_callback.flush()
+        for subscriber_id in subscriber_ids():
+            progress_callback_factory(subscriber_id)(progress_data)
+    
+    return job_progress_callback, chunk_callback
+
+def fail_research_job(job: ResearchJob, error: Exception) -> None:
+    """Finish every task subscribed to a job that was cancelled or raised"""
+    if isinstance(error, JobCancelled):
+        for subscriber_id in job.seal():
+            task_store.finish(subscriber_id, "cancelled")
+        return
+    for subscriber_id in job.seal():
+        progress_callback_factory(subscriber_id)({"step": "error", "message": f"Research failed: {str(error)}", "percent": 0})
+        task_store.finish(subscriber_id, "error", message=f"Research failed: {str(error)}")
+
+def finish_research_job(job: ResearchJob, query: str, model: str, mode: str, result: Dict[str, Any]) -> None:
+    """Save a finished job's result for every subscribed task and index it for the semantic cache"""
+    subscribers = job.seal()
+    if not subscribers:
+        # The last subscriber cancelled after the final checkpoint; nobody is left to receive the result
+        return
+    # Every subscriber gets its own history entry; all of them share the same result object
+    history_ids = []
+    for subscriber_id, subscriber_user_id in subscribers.items():
+        entry = save_research_query(subscriber_user_id, query, result)
+        history_ids.append(entry["id"])
+        task_store.finish(subscriber_id, result.get("status", "completed"), result=entry["results"], history_id=entry["id"])
+    if SEMANTIC_CACHE_ENABLED and result.get("status") == "completed":
+        # The cache points at the entry of the job's first subscriber
+        semantic_cache.add(query, model, mode, result, history_id=history_ids[0])
+
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -21,7 +111,7 @@ def require_api_key(f):
             return jsonify({"error": "Server configuration error"}), 500
             
         if incoming_key != valid_key:
-            current_app.logger.warning(f"Invalid API key received: {incoming_key}")
+            current_app.logger.warning(f"Invalid API key received on {request.path}")  # The key itself is never logged
             return jsonify({"error": "Unauthorized"}), 401
             
         current_app.logger.debug("API key validation successful")
@@ -35,12 +125,127 @@ def get_models():
     try:
         return jsonify({
             "models": list(AVAILABLE_MODELS.keys()),
-            "default": DEFAULT_MODEL
+            "default": DEFAULT_MODEL,
+            "modes": list(PIPELINE_MODES),
+            "default_mode": DEFAULT_PIPELINE_MODE
         })
     except Exception as e:
         current_app.logger.error(f"Error getting models: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+def parse_research_options(data: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Validated model, mode, priority and force_refresh of a research submission
+
+    Args:
+        data: Request body (or one batch item)
+        defaults: Values for fields missing from data (batch-level options)
+
+    Raises:
+        ValueError: With a message for the 400 response
+    """
+    defaults = defaults or {}
+    model = data.get('model', defaults.get('model', DEFAULT_MODEL))
+    if model not in AVAILABLE_MODELS:
+        raise ValueError(f"Invalid model. Available models: {', '.join(AVAILABLE_MODELS.keys())}")
+    
+    mode = data.get('mode', defaults.get('mode', DEFAULT_PIPELINE_MODE))
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Invalid mode. Available modes: {', '.join(PIPELINE_MODES)}")
+    
+    try:
+        priority = int(data.get('priority', defaults.get('priority', 0)))
+    except (TypeError, ValueError):
+        raise ValueError("'priority' must be an integer")
+    
+    force_refresh = bool(data.get('force_refresh', defaults.get('force_refresh', False)))
+    return {"model": model, "mode": mode, "priority": priority, "force_refresh": force_refresh}
+
+def answer_from_semantic_cache(task_id: str, user_id: str, query: str, model: str, mode: str) -> Optional[Dict[str, Any]]:
+    """Finish a task with a recent result for a paraphrase of its query; returns the match, or None"""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    match = semantic_cache.lookup(query, model, mode)
+    if match:
+        entry = save_research_query(user_id, query, match["result"])
+        progress_callback_factory(task_id)({"step": "completed", "message": f"Answered from earlier research on \"{match['query']}\"", "percent": 100})
+        task_store.finish(task_id, "completed", result=entry["results"], history_id=entry["id"])
+    return match
+
+def build_research_job(task_id: str, user_id: str, query: str, model: str, mode: str, priority: int = 0,
+                       force_refresh: bool = False, resume: bool = False) -> ResearchJob:
+    """
+    A scheduler job that runs the research agent for a task and finishes it with the result
+    
+    The run is checkpointed under the task ID. With resume=True the job
+    continues the task's earlier run from its last successful node instead
+    of starting over; such jobs are never coalesced with new submissions.
+    """
+    if resume:
+        run = lambda **callbacks: resume_research_agent(task_id, use_cache=not force_refresh, **callbacks)
+        arun = lambda **callbacks: aresume_research_agent(task_id, use_cache=not force_refresh, **callbacks)
+    else:
+        run_kwargs = {"model": model, "mode": mode, "use_cache": not force_refresh, "thread_id": task_id}
+        run = lambda **callbacks: run_research_agent(query, **callbacks, **run_kwargs)
+        arun = lambda **callbacks: arun_research_agent(query, **callbacks, **run_kwargs)
+    
+    def run_research_task(job: ResearchJob):
+        progress, chunks = job_callbacks(job)
+        try:
+            try:
+                result = run(progress_callback=progress, chunk_callback=chunks)
+            finally:
+                chunks.flush()
+            job.raise_if_cancelled()
+        except Exception as e:
+            fail_research_job(job, e)
+            raise
+        finish_research_job(job, query, model, mode, result)
+    
+    async def run_research_task_async(job: ResearchJob):
+        progress, chunks = job_callbacks(job)
+        try:
+            try:
+                result = await arun(progress_callback=progress, chunk_callback=chunks)
+            finally:
+                chunks.flush()
+            job.raise_if_cancelled()
+        except Exception as e:
+            fail_research_job(job, e)
+            raise
+        finish_research_job(job, query, model, mode, result)
+    
+    target = run_research_task_async if scheduler.is_async else run_research_task
+    key = None if resume else coalesce_key(query, model, mode, force_refresh)
+    return ResearchJob(task_id, user_id, target, priority=priority, key=key)
+
+def report_submitted(task_id: str, job: ResearchJob, position: int) -> None:
+    """First progress event of a submitted task: its queue position, or where the run it joined already is"""
+    progress_callback = progress_callback_factory(task_id)
+    if job.coalesced_into is not None:
+        # Start from where the shared run already is; later events arrive through this task's room
+        leader = task_store.get(job.coalesced_into.task_id) or {}
+        progress_callback({
+            "step": leader.get("status", "queued"),
+            "message": leader.get("message") or "Joined an identical research task already in progress",
+            "percent": leader.get("progress", 0)
+        })
+    else:
+        progress_callback({"step": "queued", "message": f"Queued at position {position}", "percent": 0})
+
+def queue_full_response(task_id: str, error: QueueFullError):
+    """Fail a task the scheduler had no room for and build the 429 response"""
+    progress_callback_factory(task_id)({"step": "error", "message": str(error), "percent": 0})
+    task_store.finish(task_id, "error")
+    stats = scheduler.stats()
+    response = jsonify({
+        "error": "Too many research tasks queued. Please retry later.",
+        "task_id": task_id,
+        "queue_depth": stats["queue_depth"]
+    })
+    response.headers['Retry-After'] = str(max(1, int(stats["avg_wait_seconds"]) or 30))
+    return response, 429
+
 @api_bp.route('/research', methods=['POST'])
 @require_api_key
 def research():
@@ -50,49 +255,326 @@ def research():
         return jsonify({"error": "Missing 'query' field in request"}), 400
     
     query = data['query']
-    model = data.get('model', DEFAULT_MODEL)
-    
-    if model not in AVAILABLE_MODELS:
-        return jsonify({"error": f"Invalid model. Available models: {', '.join(AVAILABLE_MODELS.keys())}"}), 400
+    try:
+        options = parse_research_options(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    model, mode = options["model"], options["mode"]
     
     user_id = request.headers.get('X-User-ID') or str(uuid.uuid4())
     task_id = register_task(user_id, query)
-    progress_callback = progress_callback_factory(task_id)
     
-    def run_research_task():
-        try:
-            result = run_research_agent(query, model=model, progress_callback=progress_callback)
-            save_research_query(user_id, query, result)
-        except Exception as e:
-            current_app.logger.error(f"Research task failed: {str(e)}")
+    # A recent result for a paraphrase of this query answers it without a new run
+    match = answer_from_semantic_cache(task_id, user_id, query, model, mode) if not options["force_refresh"] else None
+    if match:
+        return jsonify({
+            "task_id": task_id,
+            "query": query,
+            "model": model,
+            "mode": mode,
+            "user_id": user_id,
+            "status": "completed",
+            "queue_position": 0,
+            "coalesced": False,
+            "semantic_match": {
+                "query": match["query"],
+                "similarity": match["similarity"],
+                "age_seconds": match["age_seconds"]
+            }
+        })
+    
+    job = build_research_job(task_id, user_id, query, **options)
+    try:
+        position = scheduler.submit(job)
+    except QueueFullError as e:
+        return queue_full_response(task_id, e)
     
-    thread = threading.Thread(target=run_research_task)
-    thread.daemon = True
-    thread.start()
+    report_submitted(task_id, job, position)
     
     return jsonify({
         "task_id": task_id,
         "query": query,
         "model": model,
+        "mode": mode,
         "user_id": user_id,
-        "status": "started"
+        "status": "queued" if position else "running",
+        "queue_position": position,
+        "coalesced": job.coalesced_into is not None,
+        "semantic_match": None
+    })
+
+def submit_batch_item(user_id: str, item: Dict[str, Any]) -> None:
+    """Start one batch item: answer it from the semantic cache or submit it (raises QueueFullError)"""
+    task_id, query = item["task_id"], item["query"]
+    if not item["force_refresh"] and answer_from_semantic_cache(task_id, user_id, query, item["model"], item["mode"]):
+        return
+    job = build_research_job(task_id, user_id, query, item["model"], item["mode"], item["priority"], item["force_refresh"])
+    report_submitted(task_id, job, scheduler.submit(job))
+
+def ndjson(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=str) + "\n"
+
+@api_bp.route('/research/batch', methods=['POST'])
+@require_api_key
+def research_batch():
+    """
+    Run a list of research items and stream each result back as NDJSON as soon as it finishes
+
+    The first line ("type": "batch") lists every item's task ID. Each
+    finished item adds a "result" line, and every poll that finished items
+    adds a "progress" line for the whole batch (also emitted as
+    batch_progress to the batch's room). A "done" line ends the stream. Unfinished items are cancelled if the
+    client disconnects.
+    """
+    data = request.json
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing 'items' list in request"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"A batch takes at most {BATCH_MAX_ITEMS} items"}), 400
+    
+    try:
+        defaults = parse_research_options(data, {"priority": BATCH_PRIORITY})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    parsed = []
+    for index, item in enumerate(items):
+        # An item is a query string or an object with the same fields as POST /research
+        item = {"query": item} if isinstance(item, str) else item
+        if not isinstance(item, dict) or not isinstance(item.get('query'), str) or not item['query'].strip():
+            return jsonify({"error": f"Item {index}: missing 'query'"}), 400
+        try:
+            parsed.append({"query": item['query'], **parse_research_options(item, defaults)})
+        except ValueError as e:
+            return jsonify({"error": f"Item {index}: {str(e)}"}), 400
+    
+    user_id = request.headers.get('X-User-ID') or str(uuid.uuid4())
+    batch = ResearchBatch(user_id, parsed, submit=lambda item: submit_batch_item(user_id, item))
+    
+    def stream():
+        try:
+            yield ndjson({
+                "type": "batch",
+                "batch_id": batch.batch_id,
+                "user_id": user_id,
+                "total": len(batch.items),
+                "items": [
+                    {key: item[key] for key in ("index", "task_id", "query", "model", "mode")} for item in batch.items
+                ]
+            })
+            while not batch.done:
+                batch.admit()
+                results = batch.collect()
+                for result in results:
+                    yield ndjson(result)
+                if results:
+                    progress = batch.progress()
+                    socketio.emit('batch_progress', progress, room=batch.batch_id)
+                    yield ndjson({"type": "progress", **progress})
+                if not batch.done:
+                    # socketio.sleep yields to other clients when running under eventlet
+                    socketio.sleep(BATCH_POLL_INTERVAL)
+            yield ndjson({"type": "done", **batch.progress(), "rate_limited_polls": batch.rate_limited_polls})
+        finally:
+            batch.cancel_remaining()
+    
+    return Response(stream(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+@api_bp.route('/research/<task_id>/cancel', methods=['POST'])
+@require_api_key
+def cancel_research(task_id):
+    """Cancel a queued or running research task (a shared run continues for its other subscribers)"""
+    task = task_store.get(task_id)
+    user_id = request.headers.get('X-User-ID')
+    if task is None or (user_id and task["user_id"] != user_id):
+        return jsonify({"error": "Task not found or already finished"}), 404
+    
+    if not scheduler.cancel(task_id):
+        if not broker.distributed or task["finished_at"] is not None:
+            return jsonify({"error": "Task not found or already finished"}), 404
+        # The job is queued or running in another backend process
+        broker.publish(CANCEL_CHANNEL, {"task_id": task_id})
+    
+    progress_callback_factory(task_id)({"step": "cancelled", "message": "Research cancelled", "percent": 0})
+    task_store.finish(task_id, "cancelled")
+    return jsonify({"task_id": task_id, "status": "cancelled"})
+
+@api_bp.route('/research/<task_id>/resume', methods=['POST'])
+@require_api_key
+def resume_research(task_id):
+    """
+    Continue a failed or cancelled research task from its last successful node
+    
+    The task keeps its ID, so clients already in its room receive the
+    resumed run's progress. Nodes that finished before the failure are not
+    run again. Checkpoints last CHECKPOINT_TTL seconds; a task that joined
+    another task's run resumes through that task.
+    """
+    task = task_store.get(task_id)
+    user_id = request.headers.get('X-User-ID')
+    if task is None or (user_id and task["user_id"] != user_id):
+        return jsonify({"error": "Task not found or expired"}), 404
+    if task["finished_at"] is None:
+        return jsonify({"error": "Task is still queued or running"}), 409
+    if task["status"] == "completed":
+        return jsonify({"error": "Task already completed"}), 409
+    if scheduler.run_in_progress(task_id):
+        # A cancelled run keeps writing checkpoints to this thread until it stops
+        return jsonify({"error": "Task's cancelled run is still stopping"}), 409
+    
+    snapshot = resume_point(task_id)
+    if snapshot is None:
+        return jsonify({"error": "No checkpoint to resume this task from"}), 404
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'priority' must be an integer"}), 400
+    force_refresh = bool(data.get('force_refresh', False))
+    
+    query, model, mode = task["query"], snapshot.values.get("model"), snapshot.values.get("mode")
+    # Back to a fresh unfinished state under the same ID
+    task_store.register(task_id, task["user_id"], query)
+    job = build_research_job(task_id, task["user_id"], query, model, mode, priority, force_refresh, resume=True)
+    try:
+        position = scheduler.submit(job)
+    except QueueFullError as e:
+        return queue_full_response(task_id, e)
+    
+    report_submitted(task_id, job, position)
+    
+    return jsonify({
+        "task_id": task_id,
+        "query": query,
+        "model": model,
+        "mode": mode,
+        "user_id": task["user_id"],
+        "status": "queued" if position else "running",
+        "queue_position": position,
+        "resumed_from": list(dict.fromkeys(snapshot.next))
+    })
+
+@api_bp.route('/research/<task_id>', methods=['GET'])
+@require_api_key
+def get_research_task(task_id):
+    """
+    Get the state of a research task, including its result once finished
+
+    With ?wait=<seconds> the request is held until the task finishes or the
+    wait (capped at TASK_WAIT_MAX_SECONDS) runs out, for clients that cannot
+    keep a socket open.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), TASK_WAIT_MAX_SECONDS)
+    except ValueError:
+        return jsonify({"error": "'wait' must be a number of seconds"}), 400
+    
+    task = task_store.get(task_id)
+    user_id = request.headers.get('X-User-ID')
+    if task is None or (user_id and task["user_id"] != user_id):
+        return jsonify({"error": "Task not found or expired"}), 404
+    
+    if wait > 0 and task["finished_at"] is None:
+        # socketio.sleep yields to other clients when running under eventlet
+        task = task_store.wait(task_id, wait, TASK_WAIT_POLL_INTERVAL, sleep=socketio.sleep)
+        if task is None:
+            return jsonify({"error": "Task not found or expired"}), 404
+    
+    task["done"] = task["finished_at"] is not None
+    if task["status"] == "queued":
+        task["queue_position"] = scheduler.position(task_id)
+    return jsonify(task)
+
+@api_bp.route('/research/queue', methods=['GET'])
+@require_api_key
+def research_queue():
+    """Get research queue depth, running jobs, wait-time metrics, live per-model stats, progress fan-out and checkpoint counts"""
+    return jsonify({
+        **scheduler.stats(),
+        "tasks": task_store.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "routing": model_router.stats(),
+        "progress_events": progress_coalescer.stats(),
+        "broker": broker.stats(),
+        "checkpoints": get_checkpoint_stats()
     })
 
 @api_bp.route('/history', methods=['GET'])
 @require_api_key
 def get_history():
-    """Get research history for a user"""
+    """
+    Get a page of research history for a user, newest first
+
+    Query parameters: limit (page size), before (the "<timestamp>:<id>"
+    cursor from next_before of the previous page) and view ("summary", the default, or
+    "full" to include each entry's results). Responses carry an ETag so an
+    unchanged page can be revalidated with If-None-Match.
+    """
     user_id = request.headers.get('X-User-ID')
     if not user_id:
         return jsonify({"error": "Missing X-User-ID header"}), 400
     
     try:
-        history = get_user_history(user_id)
-        return jsonify({"history": history})
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        before = request.args.get('before')
+        before, before_id = parse_history_cursor(before) if before else (None, None)
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer and 'before' a history cursor"}), 400
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    
+    view = request.args.get('view', 'summary')
+    if view not in ('summary', 'full'):
+        return jsonify({"error": "Invalid view. Available views: summary, full"}), 400
+    
+    try:
+        # Fetch one extra entry to know whether another page follows
+        history = get_user_history(user_id, limit=limit + 1, before=before, before_id=before_id,
+                                   summary=(view == 'summary'))
+        next_before = history_cursor(history[limit - 1]) if len(history) > limit else None
+        history = history[:limit]
+        
+        # Entries never change once written, so their ids identify the page contents
+        etag = hashlib.sha1(
+            json.dumps([view, next_before] + [entry["id"] for entry in history]).encode("utf-8")
+        ).hexdigest()
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        response = jsonify({"history": history, "next_before": next_before})
+        response.set_etag(etag)
+        return response
     except Exception as e:
         current_app.logger.error(f"Error getting history: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@api_bp.route('/history/<entry_id>', methods=['GET'])
+@require_api_key
+def get_history_item(entry_id):
+    """Get a single history entry with its full results"""
+    user_id = request.headers.get('X-User-ID')
+    if not user_id:
+        return jsonify({"error": "Missing X-User-ID header"}), 400
+    
+    try:
+        # Look the entry up first, so a deleted entry or another user's id never gets a 304
+        entry = get_history_entry(user_id, entry_id)
+        if entry is None:
+            return jsonify({"error": "History entry not found"}), 404
+        # Entry ids are unique and entries are immutable, so the id is a stable ETag
+        if entry_id in request.if_none_match:
+            response = current_app.response_class(status=304)
+            response.set_etag(entry_id)
+            return response
+        response = jsonify(entry)
+        response.set_etag(entry_id)
+        return response
+    except Exception as e:
+        current_app.logger.error(f"Error getting history entry: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
 @api_bp.route('/history', methods=['DELETE'])
 @require_api_key
 def clear_history():
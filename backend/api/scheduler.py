@@ -0,0 +1,389 @@
+# backend/api/scheduler.py
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from agent.researcher import ResearchCancelled
+from config import (
+    RESEARCH_WORKERS,
+    RESEARCH_QUEUE_SIZE,
+    RESEARCH_MAX_PER_USER,
+    RESEARCH_COALESCE,
+    RESEARCH_EXECUTOR,
+    ASYNC_MAX_CONCURRENT_TASKS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the research queue is saturated"""
+
+
+class JobCancelled(ResearchCancelled):
+    """Raised inside a running job once it has been cancelled"""
+
+
+class ResearchJob:
+    """
+    A queued or running research task
+
+    Identical submissions can be coalesced into one job: every task attached
+    to it is a subscriber that receives the job's progress and result. The
+    task that created the job is its first subscriber.
+    """
+
+    def __init__(self, task_id: str, user_id: str, target: Callable[["ResearchJob"], Any], priority: int = 0,
+                 key: Optional[Hashable] = None):
+        """
+        Args:
+            task_id: Task ID registered with the websocket layer
+            user_id: Owner of the job, used for per-user concurrency caps
+            target: Callable run by a worker with the job as its only argument
+            priority: Lower values run first; ties run in submission order
+            key: Identity of the work; in-flight jobs with the same key are shared
+        """
+        self.task_id = task_id
+        self.user_id = user_id
+        self.target = target
+        self.priority = priority
+        self.key = key
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.coalesced_into: Optional["ResearchJob"] = None  # Set when this submission joined another job
+        self._subscribers: Dict[str, str] = {task_id: user_id}
+        self._sealed = False
+        self._subscriber_lock = threading.Lock()
+
+    def add_subscriber(self, task_id: str, user_id: str) -> bool:
+        """Attach another task to this job; False once the job has stopped accepting subscribers"""
+        with self._subscriber_lock:
+            if self._sealed:
+                return False
+            self._subscribers[task_id] = user_id
+            return True
+
+    def remove_subscriber(self, task_id: str) -> int:
+        """Detach a task from this job and return how many subscribers remain"""
+        with self._subscriber_lock:
+            self._subscribers.pop(task_id, None)
+            return len(self._subscribers)
+
+    def subscribers(self) -> Dict[str, str]:
+        """Current subscribers as {task_id: user_id}"""
+        with self._subscriber_lock:
+            return dict(self._subscribers)
+
+    def seal(self) -> Dict[str, str]:
+        """Stop accepting subscribers and return the final set, so none can miss the result"""
+        with self._subscriber_lock:
+            self._sealed = True
+            return dict(self._subscribers)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Abort the running job at the next checkpoint (e.g. a progress report)"""
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.task_id)
+
+
+class ResearchScheduler:
+    """
+    Fixed-size worker pool fed by a bounded priority queue
+
+    Workers pick the highest-priority queued job whose owner is below the
+    per-user concurrency cap, so one user submitting a burst cannot occupy
+    every worker. A job submitted with the same key as one still queued or
+    running is attached to that job instead of being queued (single-flight).
+    """
+
+    is_async = False  # Whether job targets are coroutine functions
+
+    def __init__(self, num_workers: int = RESEARCH_WORKERS, max_queue_size: int = RESEARCH_QUEUE_SIZE,
+                 max_per_user: int = RESEARCH_MAX_PER_USER, coalesce: bool = RESEARCH_COALESCE,
+                 clock: Callable[[], float] = time.time):
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.max_per_user = max_per_user
+        self.coalesce = coalesce
+        self._clock = clock  # Source of submit, start and finish times (replaced in tests)
+        self._queue: List[tuple] = []  # (priority, sequence, job), kept sorted
+        self._jobs: Dict[str, ResearchJob] = {}  # Every subscribed task ID -> its job
+        self._inflight: Dict[Hashable, ResearchJob] = {}  # Coalescing key -> queued or running job
+        self._runs: Dict[str, ResearchJob] = {}  # Task ID a job was created for -> that job, until it finishes
+        self._running_per_user: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._metrics = {
+            "submitted": 0,
+            "coalesced": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "started": 0
+        }
+
+    def _ensure_workers(self) -> None:
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"research-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, job: ResearchJob) -> int:
+        """
+        Queue a job, or attach it to an in-flight job with the same key
+
+        A coalesced job is never run; its coalesced_into attribute points at
+        the job it joined, which delivers progress and results to it.
+
+        Returns:
+            1-based position of the job (or the job it joined) in the queue,
+            or 0 if it joined a job that is already running
+
+        Raises:
+            QueueFullError: If the queue already holds max_queue_size jobs
+        """
+        with self._condition:
+            existing = self._inflight.get(job.key) if self.coalesce and job.key is not None else None
+            if existing is not None and not existing.cancelled and existing.add_subscriber(job.task_id, job.user_id):
+                job.coalesced_into = existing
+                self._jobs[job.task_id] = existing
+                self._metrics["coalesced"] += 1
+                return self._position(existing) or 0
+            if len(self._queue) >= self.max_queue_size:
+                self._metrics["rejected"] += 1
+                raise QueueFullError(f"Research queue is full ({self.max_queue_size} jobs waiting)")
+            self._ensure_workers()
+            job.submitted_at = self._clock()
+            entry = (job.priority, next(self._sequence), job)
+            self._queue.append(entry)
+            self._queue.sort(key=lambda item: item[:2])
+            self._jobs[job.task_id] = job
+            self._runs[job.task_id] = job
+            if job.key is not None:
+                self._inflight[job.key] = job
+            self._metrics["submitted"] += 1
+            self._condition.notify()
+            return self._queue.index(entry) + 1
+
+    def get_job(self, task_id: str) -> Optional[ResearchJob]:
+        """The job delivering results to a task (shared by coalesced tasks)"""
+        return self._jobs.get(task_id)
+
+    def run_in_progress(self, task_id: str) -> bool:
+        """
+        Whether the job created for a task is still queued or running
+
+        Unlike get_job, this stays true after every subscriber has cancelled,
+        until the job's target has actually returned.
+        """
+        with self._condition:
+            return task_id in self._runs
+
+    def _position(self, job: ResearchJob) -> Optional[int]:
+        for i, (_, _, queued) in enumerate(self._queue):
+            if queued is job:
+                return i + 1
+        return None
+
+    def position(self, task_id: str) -> Optional[int]:
+        """1-based queue position of a waiting job, or None if it is not queued"""
+        with self._condition:
+            job = self._jobs.get(task_id)
+            return self._position(job) if job is not None else None
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        Cancel a task's interest in its queued or running job
+
+        The task is detached from its job. Only when no subscribers are left
+        is the job itself cancelled: queued jobs are removed immediately and
+        running jobs are flagged and stop at their next progress report.
+
+        Returns:
+            True if the job was found and was not already finished
+        """
+        with self._condition:
+            job = self._jobs.get(task_id)
+            if job is None or job.status not in ("queued", "running"):
+                return False
+            self._jobs.pop(task_id, None)
+            if job.remove_subscriber(task_id):
+                return True
+            job.cancel_event.set()
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            if job.status == "queued":
+                self._queue = [entry for entry in self._queue if entry[2] is not job]
+                self._finish(job, "cancelled")
+            return True
+
+    def _next_job(self) -> Optional[ResearchJob]:
+        """Pop the first queued job whose owner is below the per-user cap (lock held)"""
+        for i, (_, _, job) in enumerate(self._queue):
+            if self._running_per_user.get(job.user_id, 0) < self.max_per_user:
+                del self._queue[i]
+                return job
+        return None
+
+    def _finish(self, job: ResearchJob, status: str) -> None:
+        """Record a job's final status (lock held)"""
+        job.status = status
+        job.finished_at = self._clock()
+        self._metrics[{"completed": "completed", "error": "failed", "cancelled": "cancelled"}[status]] += 1
+        # Finished jobs are only kept for lookups by in-flight requests
+        for task_id in job.subscribers():
+            self._jobs.pop(task_id, None)
+        self._jobs.pop(job.task_id, None)
+        if self._runs.get(job.task_id) is job:
+            del self._runs[job.task_id]
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+    def _start(self, job: ResearchJob) -> None:
+        """Mark a dequeued job as running (lock held)"""
+        job.status = "running"
+        job.started_at = self._clock()
+        wait_time = job.started_at - job.submitted_at
+        self._metrics["started"] += 1
+        self._metrics["wait_time_total"] += wait_time
+        self._metrics["wait_time_max"] = max(self._metrics["wait_time_max"], wait_time)
+        self._running_per_user[job.user_id] = self._running_per_user.get(job.user_id, 0) + 1
+
+    def _complete(self, job: ResearchJob, status: str) -> None:
+        """Release a finished job's slot and record its outcome"""
+        if job.cancelled:
+            status = "cancelled"
+        with self._condition:
+            self._running_per_user[job.user_id] -= 1
+            if not self._running_per_user[job.user_id]:
+                del self._running_per_user[job.user_id]
+            self._finish(job, status)
+            # A slot for this user opened up, so a skipped job may now be eligible
+            self._condition.notify_all()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                self._start(job)
+            self._execute(job)
+
+    def _execute(self, job: ResearchJob) -> None:
+        """Run a started job on the calling thread and record how it ended"""
+        status = "completed"
+        try:
+            job.raise_if_cancelled()
+            job.target(job)
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            status = "error"
+            logger.error(f"Research task {job.task_id} failed: {str(e)}")
+        self._complete(job, status)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and wait-time metrics"""
+        with self._condition:
+            started = self._metrics["started"]
+            return {
+                "executor": "async" if self.is_async else "threads",
+                "workers": self.num_workers,
+                "queue_depth": len(self._queue),
+                "max_queue_size": self.max_queue_size,
+                "running": sum(self._running_per_user.values()),
+                "max_per_user": self.max_per_user,
+                "submitted": self._metrics["submitted"],
+                "coalesced": self._metrics["coalesced"],
+                "rejected": self._metrics["rejected"],
+                "completed": self._metrics["completed"],
+                "failed": self._metrics["failed"],
+                "cancelled": self._metrics["cancelled"],
+                "avg_wait_seconds": self._metrics["wait_time_total"] / started if started else 0.0,
+                "max_wait_seconds": self._metrics["wait_time_max"],
+                "oldest_wait_seconds": (
+                    self._clock() - min(job.submitted_at for _, _, job in self._queue) if self._queue else 0.0
+                )
+            }
+
+
+class AsyncResearchScheduler(ResearchScheduler):
+    """
+    Scheduler that runs jobs as coroutines on one asyncio event loop
+
+    Queueing, priorities, per-user caps, coalescing and cancellation work as
+    in ResearchScheduler, but job targets are coroutine functions and up to
+    num_workers of them run concurrently on a single loop thread. A second
+    thread feeds the loop from the queue, so the OS thread count stays fixed
+    however many tasks are in flight.
+    """
+
+    is_async = True
+
+    def __init__(self, num_workers: int = ASYNC_MAX_CONCURRENT_TASKS, **kwargs):
+        super().__init__(num_workers=num_workers, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_workers(self) -> None:
+        if self._workers:
+            return
+        self._loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=self._loop.run_forever, name="research-loop", daemon=True)
+        dispatcher = threading.Thread(target=self._dispatch_loop, name="research-dispatcher", daemon=True)
+        loop_thread.start()
+        dispatcher.start()
+        self._workers = [loop_thread, dispatcher]
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._condition:
+                job = None
+                while job is None:
+                    if sum(self._running_per_user.values()) < self.num_workers:
+                        job = self._next_job()
+                    if job is None:
+                        self._condition.wait()
+                self._start(job)
+            asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+
+    async def _run(self, job: ResearchJob) -> None:
+        status = "completed"
+        try:
+            job.raise_if_cancelled()
+            await job.target(job)
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            status = "error"
+            logger.error(f"Research task {job.task_id} failed: {str(e)}")
+        self._complete(job, status)
+
+
+def create_scheduler(executor: str = RESEARCH_EXECUTOR) -> ResearchScheduler:
+    """Create the scheduler selected by RESEARCH_EXECUTOR ("threads" or "async")"""
+    if executor == "async":
+        return AsyncResearchScheduler()
+    if executor == "threads":
+        return ResearchScheduler()
+    raise ValueError(f"Unknown research executor: {executor}")
+
+
+# Shared scheduler used by the API routes
+scheduler = create_scheduler()
@@ -0,0 +1,224 @@
+# backend/api/tasks.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from config import TASK_TTL_SECONDS, TASK_STORE_MAX_ENTRIES, TASK_SWEEP_INTERVAL
+from .broker import MessageBroker, Message, broker
+
+# Statuses after which a task no longer changes
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+
+
+class TaskStore:
+    """
+    State of research tasks, from submission until shortly after they finish
+
+    Finished tasks are kept for `ttl` seconds so their result can be fetched
+    directly, and the store never holds more than `max_entries` tasks: when
+    full, the oldest finished task is evicted first. A task's result is the
+    same object that was saved to history, not a copy.
+
+    Finished tasks are also tracked in the order they finished, so expiry
+    and eviction pop from the front of that order instead of scanning the
+    store; a submission costs O(1) however many tasks are kept.
+
+    With a distributed broker every change is published on `channel` and
+    changes from other processes are applied locally, so any backend
+    process can answer for a task another one is running.
+    """
+
+    def __init__(self, ttl: float = TASK_TTL_SECONDS, max_entries: int = TASK_STORE_MAX_ENTRIES,
+                 broker: Optional[MessageBroker] = None, channel: str = "tasks",
+                 sweep_interval: float = TASK_SWEEP_INTERVAL, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            ttl: Seconds a finished task stays in the store
+            max_entries: Maximum number of tasks kept (0 for unbounded)
+            broker: Broker to share task changes through; ignored unless distributed
+            channel: Broker channel for task changes
+            sweep_interval: Minimum seconds between sweeps for expired tasks
+            clock: Source of the current time (replaced in tests)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Finished task IDs in the order they finished, oldest first
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+        self._expired = 0
+        self._evicted = 0
+        self.node_id = uuid.uuid4().hex
+        self.channel = channel
+        self.broker = broker if broker is not None and broker.distributed else None
+        if self.broker is not None:
+            self.broker.subscribe(channel, self._apply_remote)
+
+    def _publish(self, op: str, **fields: Any) -> None:
+        if self.broker is not None:
+            self.broker.publish(self.channel, {"op": op, "origin": self.node_id, **fields})
+
+    def _apply_remote(self, message: Message) -> None:
+        """Apply a change published by another process (this process's own are already applied)"""
+        if message.get("origin") == self.node_id:
+            return
+        if message["op"] == "register":
+            self._register(message["task"])
+        elif message["op"] == "update":
+            self._update(message["task_id"], message["fields"])
+        elif message["op"] == "finish":
+            self._finish(message["task_id"], message["fields"])
+
+    def _is_expired(self, task: Dict[str, Any], now: float) -> bool:
+        return task["finished_at"] is not None and now - task["finished_at"] > self.ttl
+
+    def _drop(self, task_id: str) -> None:
+        del self._tasks[task_id]
+        self._finished.pop(task_id, None)
+
+    def _sweep(self, now: float) -> None:
+        """Drop expired tasks, then evict finished ones beyond the cap (lock held)"""
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            # Stop at the first task that has not expired; every later one finished after it
+            while self._finished:
+                task_id = next(iter(self._finished))
+                if not self._is_expired(self._tasks[task_id], now):
+                    break
+                self._drop(task_id)
+                self._expired += 1
+        if not self.max_entries:
+            return
+        while len(self._tasks) > self.max_entries:
+            if self._finished:
+                self._drop(next(iter(self._finished)))
+            else:
+                # Only unfinished tasks are left; drop the oldest rather than grow without bound
+                self._tasks.popitem(last=False)
+            self._evicted += 1
+
+    def register(self, task_id: str, user_id: str, query: str) -> None:
+        """Add a new task in the "starting" state"""
+        task = {
+            "task_id": task_id,
+            "user_id": user_id,
+            "query": query,
+            "status": "starting",
+            "message": "",
+            "progress": 0,
+            "created_at": self._clock(),
+            "finished_at": None,
+            "history_id": None,
+            "result": None
+        }
+        self._register(dict(task))
+        self._publish("register", task=task)
+
+    def _register(self, task: Dict[str, Any]) -> None:
+        with self._lock:
+            # A resumed task is registered again under its ID and is unfinished once more
+            self._finished.pop(task["task_id"], None)
+            self._tasks[task["task_id"]] = task
+            self._sweep(self._clock())
+
+    def update(self, task_id: str, **fields: Any) -> bool:
+        """
+        Update the status, message or progress of an unfinished task
+
+        Returns:
+            False if the task is unknown or already finished
+        """
+        if not self._update(task_id, fields):
+            return False
+        self._publish("update", task_id=task_id, fields=fields)
+        return True
+
+    def _update(self, task_id: str, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task["finished_at"] is not None:
+                return False
+            task.update(fields)
+            return True
+
+    def finish(self, task_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               history_id: Optional[str] = None, message: Optional[str] = None) -> None:
+        """
+        Mark a task as finished and attach its result
+
+        Args:
+            task_id: Task to finish
+            status: One of FINISHED_STATUSES
+            result: Research result, shared with the history entry
+            history_id: ID of the history entry the result was saved under
+            message: Final status message
+        """
+        fields = {
+            "status": status,
+            "finished_at": self._clock(),
+            "result": result,
+            "history_id": history_id
+        }
+        if status == "completed":
+            fields["progress"] = 100
+        if message is not None:
+            fields["message"] = message
+        if self._finish(task_id, fields):
+            self._publish("finish", task_id=task_id, fields=fields)
+
+    def _finish(self, task_id: str, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task["finished_at"] is not None:
+                return False
+            task.update(fields)
+            self._finished[task_id] = None
+            return True
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """A snapshot of the task's state, or None if it is unknown or expired"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            if self._is_expired(task, self._clock()):
+                self._drop(task_id)
+                self._expired += 1
+                return None
+            return dict(task)
+
+    def wait(self, task_id: str, timeout: float, interval: float, sleep: Callable[[float], Any] = time.sleep) -> Optional[Dict[str, Any]]:
+        """
+        Wait until a task finishes or the timeout passes
+
+        Polls instead of blocking on a condition so that the caller can pass a
+        cooperative sleep (e.g. socketio.sleep) and not stall an event loop.
+
+        Returns:
+            The latest snapshot of the task, or None if it is unknown
+        """
+        deadline = time.monotonic() + timeout
+        task = self.get(task_id)
+        while task is not None and task["finished_at"] is None and time.monotonic() < deadline:
+            sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            task = self.get(task_id)
+        return task
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            finished = len(self._finished)
+            return {
+                "tasks": len(self._tasks),
+                "active": len(self._tasks) - finished,
+                "finished": finished,
+                "expired": self._expired,
+                "evicted": self._evicted
+            }
+
+
+# Shared task store used by the API and the websocket layer
+task_store = TaskStore(broker=broker)
@@ -2,15 +2,16 @@
 from flask_socketio import SocketIO
 from flask import request
 import threading
+import time
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Optional
+from config import STREAM_BATCH_CHARS, STREAM_BATCH_INTERVAL, PROGRESS_COALESCE_INTERVAL
+from .broker import BrokerManager, broker
+from .tasks import task_store, FINISHED_STATUSES
 
 # Create SocketIO instance
 socketio = SocketIO(cors_allowed_origins="*")
 
-# Dictionary to hold active research tasks
-active_tasks = {}
-
 def get_task_id(user_id: str, query: str) -> str:
     """Generate a unique task ID for a research query"""
     return f"{user_id}_{uuid.uuid4()}"
@@ -18,42 +19,206 @@ def get_task_id(user_id: str, query: str) -> str:
 def register_task(user_id: str, query: str) -> str:
     """Register a new research task and return its ID"""
     task_id = get_task_id(user_id, query)
-    active_tasks[task_id] = {
-        "user_id": user_id,
-        "query": query,
-        "status": "starting",
-        "progress": 0
-    }
+    task_store.register(task_id, user_id, query)
     return task_id
 
+class ProgressCoalescer:
+    """
+    Per-room throttle for research_progress events
+
+    Within a stage, a task room gets at most one event per `interval`
+    seconds. Events arriving in between replace the pending one, which a
+    flusher thread sends when the interval is up, so subscribers always end
+    on the latest state. The first event of a stage and finished statuses
+    are sent at once. The task store still records every event.
+    """
+
+    def __init__(self, interval: float = PROGRESS_COALESCE_INTERVAL,
+                 emit: Optional[Callable[[str, Dict[str, Any]], None]] = None, idle_ttl: float = 600.0):
+        """
+        Args:
+            interval: Minimum seconds between a room's events within a stage (0 sends every event)
+            emit: Sends one event to a room; defaults to socketio.emit
+            idle_ttl: Seconds after which a room that went quiet without finishing is forgotten
+        """
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self._emit = emit or (lambda room, payload: socketio.emit('research_progress', payload, room=room))
+        # room -> {"status", "last_emit", "pending"}; rooms are dropped once their task finishes
+        self._rooms: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._last_sweep = time.monotonic()
+        self._emitted = 0
+        self._coalesced = 0
+
+    def publish(self, room: str, payload: Dict[str, Any]) -> None:
+        """Send a progress event to a room now, or hold it until the room's interval is up"""
+        with self._cond:
+            # Emits happen under the lock so a room's events never overtake each other
+            now = time.monotonic()
+            state = self._rooms.get(room)
+            finished = payload["status"] in FINISHED_STATUSES
+            if (self.interval <= 0 or state is None or finished or payload["status"] != state["status"]
+                    or now - state["last_emit"] >= self.interval):
+                if state is not None and state["pending"] is not None:
+                    self._coalesced += 1  # Superseded before it was sent
+                self._send(room, payload)
+                if finished:
+                    self._rooms.pop(room, None)
+                else:
+                    if state is None:
+                        self._sweep(now)
+                    self._rooms[room] = {"status": payload["status"], "last_emit": now, "pending": None}
+                return
+            if state["pending"] is not None:
+                self._coalesced += 1
+            state["pending"] = payload
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="progress-coalescer", daemon=True)
+                self._flusher.start()
+            self._cond.notify()
+
+    def _send(self, room: str, payload: Dict[str, Any]) -> None:
+        self._emitted += 1
+        try:
+            self._emit(room, payload)
+        except Exception as e:
+            print(f"Error emitting progress for {room}: {str(e)}")
+
+    def _sweep(self, now: float) -> None:
+        """Forget rooms whose task went quiet without a finished status (lock held)"""
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        for room in [room for room, state in self._rooms.items()
+                     if state["pending"] is None and now - state["last_emit"] > self.idle_ttl]:
+            del self._rooms[room]
+
+    def _run(self) -> None:
+        with self._cond:
+            while True:
+                due = [(state["last_emit"] + self.interval, room)
+                       for room, state in self._rooms.items() if state["pending"] is not None]
+                if not due:
+                    self._cond.wait()
+                    continue
+                next_due, room = min(due)
+                now = time.monotonic()
+                if next_due > now:
+                    self._cond.wait(next_due - now)
+                    continue
+                state = self._rooms[room]
+                self._send(room, state["pending"])
+                state["pending"] = None
+                state["last_emit"] = now
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "emitted": self._emitted,
+                "coalesced": self._coalesced,
+                "pending": sum(1 for state in self._rooms.values() if state["pending"] is not None)
+            }
+
+
+# Shared by every task's progress callback
+progress_coalescer = ProgressCoalescer()
+
 def progress_callback_factory(task_id: str):
     """Create a progress callback function for a specific task"""
     def progress_callback(progress_data: Dict[str, Any]):
         # Update task state
-        if task_id in active_tasks:
-            active_tasks[task_id].update({
-                "status": progress_data.get("step", "unknown"),
-                "message": progress_data.get("message", ""),
-                "progress": progress_data.get("percent", 0)
-            })
-            
-            # Emit progress update via socket
-            socketio.emit(
-                'research_progress', 
+        if task_store.update(
+            task_id,
+            status=progress_data.get("step", "unknown"),
+            message=progress_data.get("message", ""),
+            progress=progress_data.get("percent", 0)
+        ):
+            # Emit progress update via socket, throttled per task room
+            progress_coalescer.publish(
+                task_id,
                 {
                     "task_id": task_id,
                     "status": progress_data.get("step", "unknown"),
                     "message": progress_data.get("message", ""),
                     "progress": progress_data.get("percent", 0)
-                },
-                room=task_id
+                }
             )
     
     return progress_callback
 
+class ChunkBatcher:
+    """
+    Buffer streamed research text and emit it as research_chunk events
+
+    Text is flushed when enough has accumulated, when enough time has passed
+    since the last emit, or when the stage changes, so token-by-token output
+    does not turn into one socket message per token.
+    """
+
+    def __init__(self, task_id: str, min_chars: int = STREAM_BATCH_CHARS, interval: float = STREAM_BATCH_INTERVAL,
+                 task_ids: Optional[Callable[[], Iterable[str]]] = None):
+        """
+        Args:
+            task_id: Task whose room receives the text
+            min_chars: Buffered characters that trigger an emit
+            interval: Seconds since the last emit that trigger an emit
+            task_ids: Returns every task to deliver to, for runs shared by coalesced tasks
+        """
+        self.task_id = task_id
+        self.task_ids = task_ids or (lambda: (task_id,))
+        self.min_chars = min_chars
+        self.interval = interval
+        self._stage = None
+        self._buffer = []
+        self._buffered_chars = 0
+        self._last_emit = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str, text: str) -> None:
+        with self._lock:
+            if stage != self._stage:
+                self._flush()
+                self._stage = stage
+            self._buffer.append(text)
+            self._buffered_chars += len(text)
+            if self._buffered_chars >= self.min_chars or time.monotonic() - self._last_emit >= self.interval:
+                self._flush()
+
+    def flush(self) -> None:
+        """Emit whatever text is still buffered"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            text = "".join(self._buffer)
+            for task_id in self.task_ids():
+                socketio.emit(
+                    'research_chunk',
+                    {
+                        "task_id": task_id,
+                        "stage": self._stage,
+                        "text": text
+                    },
+                    room=task_id
+                )
+            self._buffer = []
+            self._buffered_chars = 0
+        self._last_emit = time.monotonic()
+
+def chunk_callback_factory(task_id: str, task_ids: Optional[Callable[[], Iterable[str]]] = None) -> ChunkBatcher:
+    """Create a batching (stage, text) callback that streams research text for a specific task"""
+    return ChunkBatcher(task_id, task_ids=task_ids)
+
 def init_socketio(app):
     """Initialize SocketIO with Flask app"""
-    socketio.init_app(app)
+    if broker.distributed:
+        # Emits and room changes go through the broker, so a client joined on any process gets them
+        socketio.init_app(app, client_manager=BrokerManager(broker))
+    else:
+        socketio.init_app(app)
     
     @socketio.on('connect')
     def handle_connect():
@@ -74,8 +239,8 @@ def init_socketio(app):
             print(f"Client {request.sid} joined room {task_id}")
             
             # Send initial status if task exists
-            if task_id in active_tasks:
-                task_data = active_tasks[task_id]
+            task_data = task_store.get(task_id)
+            if task_data:
                 socketio.emit(
                     'research_progress', 
                     {
@@ -1,32 +1,21 @@
-from flask import Flask, request
+from flask import Flask
 from flask_cors import CORS
 import secrets
 import logging
 from api.routes import api_bp
+from api.metrics import metrics_bp
 from api.websocket import init_socketio
-from config import DEBUG, PORT, HOST, API_KEY
-
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('app.log')
-    ]
-)
+from logging_setup import setup_logging, install_request_logging
+from config import DEBUG, PORT, HOST, API_KEY, METRICS_ENABLED
 
 
 def create_app():
+    # Configure logging (queued, written by a background thread)
+    setup_logging()
+    
     app = Flask(__name__)
-    app.logger.info("Initializing application...")
-
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG if DEBUG else logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
     app.logger = logging.getLogger(__name__)
+    app.logger.info("Initializing application...")
     
     # Security headers and CORS
     CORS(app, supports_credentials=True, resources={
@@ -42,20 +31,13 @@ def create_app():
     app.config['SESSION_TYPE'] = 'filesystem'
     app.config['API_KEY'] = API_KEY
     
-    # Request logging middleware
-    @app.before_request
-    def log_request_info():
-        if request.path != '/health':
-            app.logger.info(f"Request: {request.method} {request.path} | Headers: {dict(request.headers)}")
-    
-    @app.after_request
-    def log_response_info(response):
-        if request.path != '/health':
-            app.logger.info(f"Response: {response.status} {request.path}")
-        return response
+    # Request logging: one line per request, allow-listed headers only
+    install_request_logging(app)
     
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/api')
+    if METRICS_ENABLED:
+        app.register_blueprint(metrics_bp)
     
     # Initialize SocketIO
     socketio = init_socketio(app)
@@ -0,0 +1,2 @@
+# backend/benchmarks/__init__.py
+# This file is intentionally left empty to make the directory a Python package
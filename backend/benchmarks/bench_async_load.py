@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_async_load.py
+"""
+Load benchmark of the threaded and asyncio research executors.
+
+Runs TASKS research requests, CONCURRENCY at a time, through
+run_research_agent on a thread pool (one OS thread per running job, as the
+"threads" executor does) and through arun_research_agent on one event loop
+(the "async" executor). Each executor runs in its own child process and the
+fake upstream in another, so memory and thread counts cover only the research
+side. Caches are bypassed and the rate limiter is lifted, so every run makes
+its full set of upstream calls. Reports tasks/sec, peak resident memory above
+the post-import baseline and peak thread count. Run from the backend
+directory (Unix only, for the resource module):
+
+    python -m benchmarks.bench_async_load
+"""
+import asyncio
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TASKS = 400
+CONCURRENCY = 200
+SEARCH_LATENCY = 0.2
+LLM_LATENCY = 0.2
+
+
+def serve_upstream(connection):
+    from benchmarks.fake_upstream import FakeUpstream
+
+    with FakeUpstream(default_search_latency=SEARCH_LATENCY, llm_latency=LLM_LATENCY) as upstream:
+        connection.send((upstream.search_url, upstream.llm_url))
+        connection.recv()  # block until the parent is done
+
+
+class ThreadSampler:
+    """Records the highest thread count seen while running"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self) -> "ThreadSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_threads(query_for):
+    from agent.researcher import run_research_agent
+
+    def run(index):
+        return run_research_agent(query_for(index), mode="fast", use_cache=False)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        return list(executor.map(run, range(TASKS)))
+
+
+def run_async(query_for):
+    from agent.researcher import arun_research_agent
+    from agent.tools import close_async_http_client
+
+    async def main():
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def run(index):
+            async with semaphore:
+                return await arun_research_agent(query_for(index), mode="fast", use_cache=False)
+
+        try:
+            return await asyncio.gather(*(run(index) for index in range(TASKS)))
+        finally:
+            await close_async_http_client()
+
+    return asyncio.run(main())
+
+
+def measure(runner, connection):
+    import agent.researcher  # noqa: F401 - imported before the memory baseline
+    from agent.tools import rate_limiter
+
+    rate_limiter.default_limits = {"rpm": 10 ** 6, "tpm": 10 ** 12}
+    rate_limiter.limits = {}
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        results = runner(lambda index: f"{runner.__name__} load topic {index}")
+        wall = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    failed = sum(1 for result in results if result.get("status") != "completed")
+    connection.send((wall, failed, (peak - baseline) / 1024, sampler.peak))
+
+
+def main():
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_upstream, args=(child,), daemon=True)
+    server.start()
+    search_url, llm_url = parent.recv()
+    os.environ["SERPER_API_URL"] = search_url
+    os.environ["GROQ_API_URL"] = llm_url
+
+    try:
+        for label, runner in (("threads (thread per job)", run_threads), ("async (one event loop)", run_async)):
+            receiver, sender = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=measure, args=(runner, sender))
+            worker.start()
+            wall, failed, memory, threads = receiver.recv()
+            worker.join()
+            print(label)
+            print(f"  {TASKS} tasks x {CONCURRENCY} concurrent: {wall:.2f}s ({TASKS / wall:.1f} tasks/s), {failed} failed")
+            print(f"  peak RSS growth {memory:7.1f} MiB  peak threads {threads}")
+    finally:
+        parent.send("stop")
+        server.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
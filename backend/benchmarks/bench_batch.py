@@ -0,0 +1,121 @@
+# backend/benchmarks/bench_batch.py
+"""
+A nightly-report style workload through POST /api/research and through
+POST /api/research/batch.
+
+TOPICS topics are each researched with two models (2 x TOPICS items) against
+the fake upstream, in-process through the Flask test client:
+
+- individual: one POST /api/research per item, all sent at once; 429s are
+  retried after Retry-After, then every task is polled until it finishes
+- batch: one POST /api/research/batch, reading the NDJSON stream to the end
+
+While each workload runs, another user submits one interactive request
+after PROBE_DELAY seconds. Reports wall-clock time, items completed, 429s,
+Serper and Groq requests made and whether the interactive request was
+accepted, with its time to completion. Caches are cleared between variants
+and the semantic cache is off. Run from the backend directory:
+
+    python -m benchmarks.bench_batch
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict
+
+from benchmarks.fake_upstream import FakeUpstream
+
+TOPICS = 40
+MODELS = ("llama3-70b-8192", "gemma2-9b-it")
+PROBE_DELAY = 0.5
+HEADERS = {"X-Api-Key": "benchmark-key", "X-User-ID": "nightly-report"}
+PROBE_HEADERS = {"X-Api-Key": "benchmark-key", "X-User-ID": "analyst"}
+
+
+def items():
+    return [{"query": f"market outlook for sector {topic}", "model": model} for topic in range(TOPICS) for model in MODELS]
+
+
+def probe(client, result: Dict):
+    time.sleep(PROBE_DELAY)
+    start = time.perf_counter()
+    response = client.post("/api/research", json={"query": "interactive question", "force_refresh": True},
+                           headers=PROBE_HEADERS)
+    result["accepted"] = response.status_code == 200
+    if result["accepted"]:
+        client.get(f"/api/research/{response.json['task_id']}?wait=60", headers=PROBE_HEADERS)
+        result["seconds"] = time.perf_counter() - start
+
+
+def run_individual(client) -> Dict:
+    rejected, task_ids = 0, []
+    for item in items():
+        while True:
+            response = client.post("/api/research", json=item, headers=HEADERS)
+            if response.status_code != 429:
+                task_ids.append(response.json["task_id"])
+                break
+            rejected += 1
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+    completed = 0
+    for task_id in task_ids:
+        task = client.get(f"/api/research/{task_id}?wait=60", headers=HEADERS).json
+        completed += task["status"] == "completed"
+    return {"completed": completed, "rejected": rejected}
+
+
+def run_batch(client) -> Dict:
+    response = client.post("/api/research/batch", json={"items": items()}, headers=HEADERS, buffered=False)
+    completed = 0
+    for line in response.response:
+        record = json.loads(line)
+        if record["type"] == "result":
+            completed += record["status"] == "completed"
+    return {"completed": completed, "rejected": 0}
+
+
+def main():
+    with FakeUpstream(default_search_latency=0.05, llm_latency=0.05) as upstream:
+        os.environ.update(SERPER_API_URL=upstream.search_url, GROQ_API_URL=upstream.llm_url,
+                          API_KEY=HEADERS["X-Api-Key"], SEMANTIC_CACHE_ENABLED="False", LOG_FILE="")
+        from app import create_app
+        from agent import tools
+        from logging_setup import setup_logging
+
+        setup_logging(level="WARNING", log_file=None)
+        tools.rate_limiter.default_limits = {"rpm": 10 ** 6, "tpm": 10 ** 12}
+        tools.rate_limiter.limits = {}
+        app, _ = create_app()
+        setup_logging(level="WARNING", log_file=None)
+        client = app.test_client()
+
+        results = {}
+        for name, run in (("individual", run_individual), ("batch", run_batch)):
+            tools.purge_search_cache()
+            tools.purge_llm_cache()
+            before = dict(upstream.request_counts)
+            probe_result: Dict = {}
+            prober = threading.Thread(target=probe, args=(app.test_client(), probe_result))
+            prober.start()
+            start = time.perf_counter()
+            result = run(client)
+            result["seconds"] = time.perf_counter() - start
+            prober.join()
+            result["search"] = upstream.request_counts["search"] - before["search"]
+            result["llm"] = upstream.request_counts["llm"] - before["llm"]
+            result["probe"] = probe_result
+            results[name] = result
+
+    print(f"{TOPICS} topics x {len(MODELS)} models = {TOPICS * len(MODELS)} items; "
+          f"interactive request from another user after {PROBE_DELAY}s")
+    print(f"{'variant':<11} {'seconds':>8} {'completed':>10} {'429s':>5} {'serper':>7} {'groq':>5}  interactive request")
+    for name, result in results.items():
+        probe_result = result["probe"]
+        interactive = f"done in {probe_result['seconds']:.2f}s" if probe_result.get("accepted") else "rejected (429)"
+        print(f"{name:<11} {result['seconds']:8.1f} {result['completed']:10d} {result['rejected']:5d} "
+              f"{result['search']:7d} {result['llm']:5d}  {interactive}")
+
+
+if __name__ == "__main__":
+    main()
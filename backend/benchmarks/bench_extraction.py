@@ -0,0 +1,172 @@
+# backend/benchmarks/bench_extraction.py
+"""
+Structured extraction (extract_information) against the fake upstream.
+
+1. DOCUMENTS short documents whose replies are damaged like real model
+   output (code fences, trailing commas, truncation, prose without JSON):
+   the previous single prompt with json.loads against the extraction engine.
+   Reports documents extracted, LLM calls, local repairs and re-asks.
+2. A long document naming COMPANIES companies, longer than the fake model's
+   context window: the single prompt, then the engine reading the chunks one
+   at a time and in parallel. Reports companies recovered, calls and seconds.
+3. The same long document extracted twice with caching on; the second call
+   is served from the extraction cache.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_extraction
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Tuple
+
+from benchmarks.fake_upstream import FakeUpstream
+
+DOCUMENTS = 40
+COMPANIES = 60
+LLM_LATENCY = 0.3
+CONTEXT_CHARS = 24000
+FAULTS = {"fenced": 0.25, "trailing_comma": 0.15, "truncated": 0.15, "prose": 0.1}
+SCHEMA = {"companies": [{"name": "string", "country": "string"}], "count": "integer"}
+NAMES = ["Alder", "Birch", "Cedar", "Dogwood", "Elm", "Fir", "Ginkgo", "Hazel", "Juniper", "Larch",
+         "Maple", "Oak", "Pine", "Rowan", "Spruce"]
+FILLER = (
+    "Analysts noted that quarterly revenue was broadly in line with expectations while operating "
+    "costs rose modestly across the sector, and most firms kept their guidance for the coming year. "
+)
+
+
+def company(i: int) -> str:
+    return f"Company {NAMES[i % len(NAMES)]} {NAMES[(i // len(NAMES)) % len(NAMES)]}"
+
+
+def document(first: int, count: int, filler: int) -> str:
+    paragraphs = []
+    for i in range(first, first + count):
+        paragraphs.append(f"{FILLER * filler}{company(i)} reported its results for the period.")
+    return "\n\n".join(paragraphs)
+
+
+def single_prompt_extract(text: str) -> Dict[str, Any]:
+    """The previous extract_information: one prompt, json.loads, give up on failure"""
+    from agent.tools import query_llm
+
+    prompt = f"""
+    Extract information from the following text according to this JSON schema:
+
+    {json.dumps(SCHEMA, indent=2)}
+
+    Text:
+    {text}
+
+    Return only a valid JSON object that follows the schema exactly.
+    """
+    response = query_llm(prompt, use_cache=False)
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        return {"error": "Failed to extract structured information", "raw_text": response}
+
+
+def found(result: Dict[str, Any]) -> int:
+    return 0 if "error" in result else len(result.get("companies") or [])
+
+
+def run_faults(upstream: FakeUpstream) -> Dict[str, Dict[str, int]]:
+    from agent.tools import extract_information
+
+    documents = [document(i * 3, 3, 1) for i in range(DOCUMENTS)]
+    upstream.extraction_faults = FAULTS
+    results = {}
+    for name in ("single prompt", "engine"):
+        upstream.request_counts["llm"] = 0
+        upstream.fault_counts = {}
+        usage: Dict[str, int] = {}
+        if name == "single prompt":
+            extracted = [single_prompt_extract(text) for text in documents]
+        else:
+            extracted = [extract_information(text, SCHEMA, use_cache=False, usage=usage) for text in documents]
+        results[name] = {
+            "ok": sum(1 for result in extracted if "error" not in result),
+            "companies": sum(found(result) for result in extracted),
+            "calls": upstream.request_counts["llm"],
+            "faults": sum(upstream.fault_counts.values()),
+            "repaired": usage.get("extraction_repaired", 0),
+            "reasks": usage.get("extraction_reasks", 0)
+        }
+    upstream.extraction_faults = {}
+    return results
+
+
+def run_long(upstream: FakeUpstream) -> Tuple[Dict[str, Dict[str, float]], int]:
+    from agent import tools
+
+    text = document(0, COMPANIES, 12)
+    upstream.context_chars = CONTEXT_CHARS
+    variants = {
+        "single prompt": (lambda: single_prompt_extract(text), None),
+        "engine, 1 worker": (lambda: tools.extract_information(text, SCHEMA, use_cache=False), 1),
+        "engine, 4 workers": (lambda: tools.extract_information(text, SCHEMA, use_cache=False), 4)
+    }
+    results = {}
+    for name, (run, workers) in variants.items():
+        if workers is not None:
+            tools.EXTRACTION_MAX_WORKERS = workers
+        upstream.request_counts["llm"] = 0
+        start = time.perf_counter()
+        result = run()
+        results[name] = {"seconds": time.perf_counter() - start, "companies": found(result),
+                         "calls": upstream.request_counts["llm"]}
+    upstream.context_chars = None
+    return results, len(text)
+
+
+def run_cache(upstream: FakeUpstream) -> Dict[str, Dict[str, float]]:
+    from agent import tools
+
+    text = document(0, COMPANIES, 12)
+    tools.purge_extraction_cache()
+    tools.purge_llm_cache()
+    results = {}
+    for name in ("first call", "second call"):
+        upstream.request_counts["llm"] = 0
+        usage: Dict[str, int] = {}
+        start = time.perf_counter()
+        result = tools.extract_information(text, SCHEMA, usage=usage)
+        results[name] = {"seconds": time.perf_counter() - start, "companies": found(result),
+                         "calls": upstream.request_counts["llm"], "cached": usage.get("extraction_cached", 0)}
+    return results
+
+
+def main():
+    with FakeUpstream(llm_latency=LLM_LATENCY) as upstream:
+        # config is read at import, so the environment must be set first
+        os.environ.update(GROQ_API_URL=upstream.llm_url, SERPER_API_URL=upstream.search_url, LOG_FILE="")
+        from agent import tools
+
+        tools.rate_limiter.default_limits = {"rpm": 10 ** 6, "tpm": 10 ** 12}
+        tools.rate_limiter.limits = {}
+        faults = run_faults(upstream)
+        long, chars = run_long(upstream)
+        cache = run_cache(upstream)
+
+    print(f"{DOCUMENTS} short documents, {sum(FAULTS.values()):.0%} of extraction replies damaged")
+    print(f"{'variant':<14} {'extracted':>10} {'companies':>10} {'calls':>6} {'damaged':>8} {'repaired':>9}  re-asks")
+    for name, row in faults.items():
+        print(f"{name:<14} {row['ok']:>7}/{DOCUMENTS} {row['companies']:10d} {row['calls']:6d} {row['faults']:8d} "
+              f"{row['repaired']:9d}  {row['reasks']}")
+    print()
+    print(f"{chars} char document naming {COMPANIES} companies, {CONTEXT_CHARS} char context, "
+          f"{LLM_LATENCY}s per call")
+    print(f"{'variant':<18} {'companies':>10} {'calls':>6}  seconds")
+    for name, row in long.items():
+        print(f"{name:<18} {row['companies']:10d} {row['calls']:6d}  {row['seconds']:.2f}")
+    print()
+    print(f"{'cached run':<12} {'companies':>10} {'calls':>6} {'cache hits':>11}  seconds")
+    for name, row in cache.items():
+        print(f"{name:<12} {row['companies']:10d} {row['calls']:6d} {row['cached']:11d}  {row['seconds']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# backend/benchmarks/bench_graph_setup.py
+"""
+Micro-benchmark of per-request graph setup under concurrent submissions.
+
+"before" compiles a fresh StateGraph for every request (the old
+create_research_agent-per-run behaviour); "after" reuses the graph compiled
+once at import. Upstream calls go to a local fake server and the search and
+LLM caches are warmed first, so the numbers isolate graph overhead. Run from
+the backend directory:
+
+    python -m benchmarks.bench_graph_setup
+"""
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_upstream import FakeUpstream
+
+SUBMISSIONS = 200
+CONCURRENCY = 32
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    with FakeUpstream(default_search_latency=0.0, llm_latency=0.0) as upstream:
+        os.environ["SERPER_API_URL"] = upstream.search_url
+        os.environ["GROQ_API_URL"] = upstream.llm_url
+
+        from agent.researcher import create_research_agent, research_agent
+
+        initial_state = {"query": "benchmark topic", "mode": "thorough", "status": "planning"}
+        config = {"configurable": {"progress_callback": lambda data: None}}
+        research_agent.invoke(dict(initial_state), config=config)  # warm the caches
+
+        def run(shared):
+            start = time.perf_counter()
+            agent = research_agent if shared else create_research_agent()
+            setup = time.perf_counter() - start
+            agent.invoke(dict(initial_state), config=config)
+            return setup, time.perf_counter() - start
+
+        for label, shared in (("before (compile per request)", False), ("after (shared compiled graph)", True)):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+                timings = list(executor.map(lambda _: run(shared), range(SUBMISSIONS)))
+            wall = time.perf_counter() - start
+            setups = [setup * 1000 for setup, _ in timings]
+            totals = [total * 1000 for _, total in timings]
+            print(label)
+            print(f"  setup ms   mean {statistics.mean(setups):8.3f}  p95 {percentile(setups, 0.95):8.3f}")
+            print(f"  request ms mean {statistics.mean(totals):8.3f}  p95 {percentile(totals, 0.95):8.3f}")
+            print(f"  {SUBMISSIONS} submissions x {CONCURRENCY} threads: {wall:.2f}s ({SUBMISSIONS / wall:.0f} runs/s)")
+
+
+if __name__ == "__main__":
+    main()
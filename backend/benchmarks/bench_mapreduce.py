@@ -0,0 +1,56 @@
+# backend/benchmarks/bench_mapreduce.py
+"""
+Wall-clock comparison of the mapreduce pipeline mode with the others.
+
+The fake upstream charges generation time per word, so a full-length
+synthesis or rewrite costs more than a short sub-topic summary, as it would
+on Groq. Each mode runs RUNS times with the caches bypassed and the rate
+limiter lifted; the table shows mean wall-clock time, LLM calls per model
+and whether the quality gate asked for reflection. Run from the backend
+directory:
+
+    python -m benchmarks.bench_mapreduce
+"""
+import os
+import statistics
+import time
+
+from benchmarks.fake_upstream import FakeUpstream
+
+RUNS = 3
+MODES = ("fast", "standard", "thorough", "mapreduce")
+COMPLETION_WORDS = {"research": 700, "reflection": 250, "summary": 150}
+
+
+def main():
+    with FakeUpstream(default_search_latency=0.2, llm_latency=0.3, completion_words=COMPLETION_WORDS,
+                      word_latency=0.004) as upstream:
+        os.environ["SERPER_API_URL"] = upstream.search_url
+        os.environ["GROQ_API_URL"] = upstream.llm_url
+
+        from agent.researcher import run_research_agent
+        from agent.tools import rate_limiter
+
+        rate_limiter.default_limits = {"rpm": 10 ** 6, "tpm": 10 ** 12}
+        rate_limiter.limits = {}
+
+        print(f"{'mode':<10} {'mean s':>7} {'llm calls by model':<48} reflected")
+        for mode in MODES:
+            before = dict(upstream.model_counts)
+            timings = []
+            for run in range(RUNS):
+                start = time.perf_counter()
+                result = run_research_agent(f"{mode} benchmark topic {run}", mode=mode, use_cache=False)
+                timings.append(time.perf_counter() - start)
+            calls = {
+                model: (count - before.get(model, 0)) // RUNS
+                for model, count in upstream.model_counts.items()
+                if count > before.get(model, 0)
+            }
+            calls_text = ", ".join(f"{model} x{count}" for model, count in sorted(calls.items()))
+            reflected = result["metadata"]["quality"].get("reflected")
+            print(f"{mode:<10} {statistics.mean(timings):7.2f} {calls_text:<48} {reflected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# backend/benchmarks/bench_page_fetch.py
+"""
+Page fetching stage against local fixture pages (benchmarks.fixture_pages).
+
+1. PAGES article pages on two host names, each answering after LATENCY:
+   naive sequential download (requests.get, whole body, then extraction)
+   against fetch_pages cold, warm (cache hits) and stale (revalidated with
+   ETag, answered 304). Reports seconds, body bytes the server sent and the
+   most requests one host served at once.
+2. Limits: an 8 MB article (text cap), an 8 MB page of inline script (byte
+   cap), a page dripping one paragraph per second (timeout) and a PDF
+   (skipped). Reports outcome, bytes read and peak Python memory, against a
+   naive whole-body download of the same page.
+3. One research run without and with the fetching stage through the fake
+   upstream, whose result links point at the fixture pages; reports run time,
+   pages read and the size of the synthesis prompt.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_page_fetch
+"""
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+import requests
+
+from benchmarks.fake_upstream import FakeUpstream
+from benchmarks.fixture_pages import FixturePages
+
+PAGES = 10
+LATENCY = 0.3
+SLOW_TIMEOUT = 3.0
+
+
+def measure(func: Callable) -> Tuple[object, float, int]:
+    """Run func, returning its result, seconds taken and peak traced memory in bytes"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def naive_fetch(url: str) -> str:
+    from agent.fetch import MainTextExtractor
+
+    extractor = MainTextExtractor()
+    extractor.feed(requests.get(url, timeout=30).text)
+    extractor.close()
+    return extractor.text()
+
+
+def run_concurrency(pages: FixturePages) -> Dict[str, Dict[str, float]]:
+    from agent import fetch
+
+    urls = [f"{(pages.base_url, pages.alt_base_url)[i % 2]}/article/{i}" for i in range(PAGES)]
+    variants = {
+        "naive": lambda: [naive_fetch(url) for url in urls],
+        "cold": lambda: fetch.fetch_pages(urls),
+        "warm": lambda: fetch.fetch_pages(urls),
+        "stale": lambda: fetch.fetch_pages(urls)
+    }
+    results = {}
+    for name, run in variants.items():
+        if name == "stale":
+            fetch.PAGE_CACHE_FRESH_SECONDS = 0
+        pages.reset()
+        start = time.perf_counter()
+        run()
+        results[name] = {
+            "seconds": time.perf_counter() - start,
+            "requests": sum(pages.request_counts.values()),
+            "not_modified": pages.not_modified,
+            "bytes_sent": pages.bytes_sent,
+            "max_per_host": max(pages.max_active.values(), default=0)
+        }
+    fetch.PAGE_CACHE_FRESH_SECONDS = 3600
+    return results
+
+
+def run_limits(pages: FixturePages) -> Dict[str, Dict[str, object]]:
+    from agent import fetch
+
+    results = {}
+    for kind in ("long", "huge", "slow", "file"):
+        url = f"{pages.base_url}/{kind}/limits"
+        page, seconds, peak = measure(lambda: fetch.fetch_page(url, use_cache=False, timeout=SLOW_TIMEOUT))
+        row = {"outcome": page["outcome"], "bytes": page["bytes"], "chars": len(page["text"]),
+               "seconds": seconds, "peak": peak, "naive_peak": None}
+        if kind in ("long", "huge"):
+            row["naive_peak"] = measure(lambda: naive_fetch(url))[2]
+        results[kind] = row
+        time.sleep(1.1)  # Let the slow page's server thread notice the hang-up
+    return results
+
+
+def run_research(pages: FixturePages, upstream: FakeUpstream) -> Dict[str, Dict[str, float]]:
+    from agent import tools
+    from agent.researcher import run_research_agent
+
+    tools.rate_limiter.default_limits = {"rpm": 10 ** 6, "tpm": 10 ** 12}
+    tools.rate_limiter.limits = {}
+    results = {}
+    for fetch_pages in (False, True):
+        pages.reset()
+        start = time.perf_counter()
+        result = run_research_agent("coastal monitoring readings", mode="fast", use_cache=False,
+                                    fetch_pages=fetch_pages)
+        results["with pages" if fetch_pages else "snippets only"] = {
+            "seconds": time.perf_counter() - start,
+            "status": result["status"],
+            "pages": result["metadata"]["pages"].get("pages_with_text", 0),
+            "fetch_seconds": result["metadata"]["timings"].get("fetching", 0.0),
+            "prompt_chars": len(upstream.last_prompts.get("research", ""))
+        }
+    return results
+
+
+def main():
+    with FixturePages(latency=LATENCY) as pages, FakeUpstream(
+        default_search_latency=0.05, llm_latency=0.05, result_base_url=f"{pages.base_url}/article"
+    ) as upstream:
+        # The fetcher refuses loopback hosts unless told otherwise; config is read at import
+        os.environ.update(SERPER_API_URL=upstream.search_url, GROQ_API_URL=upstream.llm_url,
+                          PAGE_FETCH_ALLOW_PRIVATE="True", LOG_FILE="")
+        from agent.fetch import host_limiter
+
+        concurrency = run_concurrency(pages)
+        limits = run_limits(pages)
+        research = run_research(pages, upstream)
+
+    print(f"{PAGES} article pages on 2 hosts, {LATENCY}s to first byte, at most {host_limiter.per_host} per host")
+    print(f"{'variant':<8} {'seconds':>8} {'requests':>9} {'304s':>5} {'KB sent':>8}  max per host")
+    for name, row in concurrency.items():
+        print(f"{name:<8} {row['seconds']:8.2f} {row['requests']:9d} {row['not_modified']:5d} "
+              f"{row['bytes_sent'] / 1024:8.0f}  {row['max_per_host']}")
+    print()
+    print(f"{'page':<6} {'outcome':<10} {'KB read':>8} {'chars':>6} {'seconds':>8} {'peak KB':>8}  naive peak KB")
+    for name, row in limits.items():
+        naive = f"{row['naive_peak'] / 1024:.0f}" if row["naive_peak"] is not None else "-"
+        print(f"{name:<6} {row['outcome']:<10} {row['bytes'] / 1024:8.0f} {row['chars']:6d} {row['seconds']:8.2f} "
+              f"{row['peak'] / 1024:8.0f}  {naive}")
+    print()
+    print(f"{'research run':<14} {'status':<10} {'seconds':>8} {'fetching':>9} {'pages':>6}  synthesis prompt chars")
+    for name, row in research.items():
+        print(f"{name:<14} {row['status']:<10} {row['seconds']:8.2f} {row['fetch_seconds']:9.2f} {row['pages']:6d}  "
+              f"{row['prompt_chars']}")
+
+
+if __name__ == "__main__":
+    main()
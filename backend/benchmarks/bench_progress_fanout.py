@@ -0,0 +1,158 @@
+# backend/benchmarks/bench_progress_fanout.py
+"""
+Progress fan-out across two backend processes sharing the local broker.
+
+Starts a BrokerServer and the fake upstream in this process, then two
+backend processes (`python app.py`) with MESSAGE_BROKER=tcp: research is
+submitted to worker A while CLIENTS Socket.IO clients join the task's room
+on worker B. Checks that every client on B sees the run through to
+"completed", that GET /api/research/<task_id>?wait= on B returns the result
+and that a cancel sent to B stops a run queued on A. Runs once with progress
+coalescing off (PROGRESS_COALESCE_INTERVAL=0) and once with the default, and
+reports research_progress events per client and in total. Run from the
+backend directory:
+
+    python -m benchmarks.bench_progress_fanout
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import requests
+import socketio
+
+from api.broker import BrokerServer
+from benchmarks.fake_upstream import FakeUpstream
+
+CLIENTS = 20
+RUNS = 3
+LLM_LATENCY = 0.3
+SEARCH_LATENCY = 0.3
+HEADERS = {"X-Api-Key": "benchmark-key", "X-User-ID": "benchmark-user"}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_worker(port: int, broker_url: str, upstream: FakeUpstream, interval: float) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        API_KEY=HEADERS["X-Api-Key"],
+        GROQ_API_KEY="benchmark",
+        SERPER_API_KEY="benchmark",
+        SERPER_API_URL=upstream.search_url,
+        GROQ_API_URL=upstream.llm_url,
+        MESSAGE_BROKER="tcp",
+        MESSAGE_BROKER_URL=broker_url,
+        PROGRESS_COALESCE_INTERVAL=str(interval),
+        SEMANTIC_CACHE_ENABLED="False",
+        RESEARCH_WORKERS="1",
+        LOG_FILE=""
+    )
+    process = subprocess.Popen([sys.executable, "app.py"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Backend on port {port} did not start")
+
+
+def connect_clients(url: str) -> List[socketio.Client]:
+    clients = []
+    for _ in range(CLIENTS):
+        client = socketio.Client()
+        client.events: Dict[str, List[dict]] = {}
+        client.on("research_progress",
+                  lambda data, client=client: client.events.setdefault(data["task_id"], []).append(data))
+        client.connect(url, transports=["polling"])
+        clients.append(client)
+    return clients
+
+
+def submit(url: str, query: str) -> str:
+    response = requests.post(f"{url}/api/research", json={"query": query, "force_refresh": True},
+                             headers=HEADERS, timeout=10)
+    response.raise_for_status()
+    return response.json()["task_id"]
+
+
+def run_variant(interval: float, broker_url: str, upstream: FakeUpstream) -> Dict[str, float]:
+    port_a, port_b = free_port(), free_port()
+    worker_a = start_worker(port_a, broker_url, upstream, interval)
+    worker_b = start_worker(port_b, broker_url, upstream, interval)
+    url_a, url_b = f"http://127.0.0.1:{port_a}", f"http://127.0.0.1:{port_b}"
+    clients = []
+    try:
+        clients = connect_clients(url_b)
+        events, completed, fetched = 0, 0, 0
+        for run in range(RUNS):
+            task_id = submit(url_a, f"progress fan-out benchmark {interval} {run}")
+            for client in clients:
+                client.emit("join_task", {"task_id": task_id})
+            # The task is running on A; B answers from the replicated task state
+            task = requests.get(f"{url_b}/api/research/{task_id}", params={"wait": 60},
+                                headers=HEADERS, timeout=70).json()
+            fetched += task.get("status") == "completed" and bool(task.get("result"))
+            time.sleep(max(interval, 0.2) + 0.3)  # Let trailing events arrive
+            for client in clients:
+                received = client.events.get(task_id, [])
+                events += len(received)
+                completed += bool(received) and received[-1]["status"] == "completed"
+
+        # A cancel sent to B reaches the job queued behind a running one on A
+        running_id = submit(url_a, f"progress fan-out benchmark {interval} running")
+        queued_id = submit(url_a, f"progress fan-out benchmark {interval} queued")
+        cancel = requests.post(f"{url_b}/api/research/{queued_id}/cancel", headers=HEADERS, timeout=10)
+        requests.get(f"{url_a}/api/research/{running_id}", params={"wait": 60}, headers=HEADERS, timeout=70)
+        time.sleep(0.5)
+        queued = requests.get(f"{url_a}/api/research/{queued_id}", headers=HEADERS, timeout=10).json()
+        cancelled = cancel.status_code == 200 and queued["status"] == "cancelled"
+        ran = requests.get(f"{url_a}/api/research/queue", headers=HEADERS, timeout=10).json()["completed"]
+        return {
+            "events_per_client": events / (RUNS * CLIENTS),
+            "events_total": events,
+            "completed": completed / (RUNS * CLIENTS),
+            "fetched": fetched / RUNS,
+            "cancelled": cancelled and ran == RUNS + 1
+        }
+    finally:
+        for client in clients:
+            client.disconnect()
+        for worker in (worker_a, worker_b):
+            worker.terminate()
+            worker.wait()
+
+
+def main():
+    broker = BrokerServer(("127.0.0.1", 0))
+    broker.start()
+    with FakeUpstream(default_search_latency=SEARCH_LATENCY, llm_latency=LLM_LATENCY) as upstream:
+        results = {}
+        for interval in (0.0, 0.5):
+            results[interval] = run_variant(interval, broker.url, upstream)
+    broker.shutdown()
+
+    print(f"{RUNS} runs on worker A, {CLIENTS} Socket.IO clients on worker B, one broker")
+    print(f"{'coalesce interval':<18} {'events/client':>14} {'events total':>13} {'saw completed':>14} "
+          f"{'GET on B':>9}  cancel via B")
+    for interval, result in results.items():
+        print(f"{interval:<18} {result['events_per_client']:14.1f} {result['events_total']:13d} "
+              f"{result['completed']:14.0%} {result['fetched']:9.0%}  {'ok' if result['cancelled'] else 'FAILED'}")
+
+
+if __name__ == "__main__":
+    main()
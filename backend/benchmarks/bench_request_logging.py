@@ -0,0 +1,164 @@
+# backend/benchmarks/bench_request_logging.py
+"""
+Per-request overhead of request logging, before and after the queued pipeline.
+
+A minimal Flask app with one JSON route is driven through the test client
+REQUESTS times, from THREADS threads, in ROUNDS rounds, with the headers a browser and the
+frontend send (including X-Api-Key). Variants:
+
+- none: no request logging, the baseline
+- legacy: the previous app.py hooks, two synchronous lines per request
+  through a FileHandler with every header formatted in
+- queued: one JSON line per request with allow-listed headers, handed to
+  the background writer thread
+- queued, sampled: the same on a route logged at a 10% sample rate, as
+  the task polling route is
+
+Console output is disabled in every variant so only the log file is
+written. Reports wall-clock and request-thread CPU microseconds per request
+(the writer thread's work shows up in wall-clock time only, and only while
+it shares a core with the request threads), the time to drain the writer
+afterwards, log bytes per request and whether the API key reached the log. Run from the backend directory:
+
+    python -m benchmarks.bench_request_logging
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Tuple
+from logging.handlers import QueueHandler
+
+from flask import Flask, jsonify, request
+
+from logging_setup import install_request_logging, setup_logging, shutdown_logging
+
+REQUESTS = 4000
+THREADS = 4
+ROUNDS = 5  # Variants run interleaved; the best round of each is reported
+API_KEY = "benchmark-secret-key"
+HEADERS = {
+    "X-Api-Key": API_KEY,
+    "X-User-ID": "benchmark-user",
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Origin": "http://localhost:3000",
+    "Referer": "http://localhost:3000/",
+    "Cookie": "session=0123456789abcdef0123456789abcdef"
+}
+
+
+def build_app() -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/api/research/<task_id>")
+    def task(task_id):
+        return jsonify({"task_id": task_id, "status": "running", "progress": 40})
+
+    return app
+
+
+def install_legacy_logging(app: Flask, log_file: str) -> None:
+    """The request logging app.py had before the queued pipeline"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler(log_file)], force=True)
+    app.logger = logging.getLogger("legacy")
+
+    @app.before_request
+    def log_request_info():
+        app.logger.info(f"Request: {request.method} {request.path} | Headers: {dict(request.headers)}")
+
+    @app.after_request
+    def log_response_info(response):
+        app.logger.info(f"Response: {response.status} {request.path}")
+        return response
+
+
+def drive(app: Flask) -> Tuple[float, float]:
+    """Send REQUESTS requests from THREADS threads; returns wall-clock and request-thread CPU seconds"""
+    per_thread = REQUESTS // THREADS
+    cpu = []
+
+    def worker():
+        client = app.test_client()
+        start = time.thread_time()
+        for _ in range(per_thread):
+            client.get("/api/research/abc123", headers=HEADERS)
+        cpu.append(time.thread_time() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sum(cpu)
+
+
+def run_variant(name: str, directory: str):
+    log_file = os.path.join(directory, f"{name.replace(', ', '-')}.log")
+    app = build_app()
+    if name == "legacy":
+        install_legacy_logging(app, log_file)
+    elif name.startswith("queued"):
+        setup_logging(level="INFO", log_file=log_file, console=None)
+        rates = {"/api/research/<task_id>": 0.1} if name.endswith("sampled") else {}
+        install_request_logging(app, sample_rates=rates)
+    else:
+        logging.getLogger().handlers.clear()
+
+    drive(app)  # Warm up (route matching, JSON provider, file opened)
+    wait_for_writer()
+    before = log_size(log_file)
+
+    wall, cpu = drive(app)
+    drain_start = time.perf_counter()
+    wait_for_writer()
+    drain = time.perf_counter() - drain_start
+    shutdown_logging()
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    logging.getLogger().handlers.clear()
+
+    leaked = False
+    if os.path.exists(log_file):
+        with open(log_file, encoding="utf-8") as f:
+            leaked = API_KEY in f.read()
+    return wall, cpu, drain, log_size(log_file) - before, leaked
+
+
+def log_size(log_file: str) -> int:
+    return os.path.getsize(log_file) if os.path.exists(log_file) else 0
+
+
+def wait_for_writer() -> None:
+    """Block until the queued pipeline's writer thread has taken every record"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            while not handler.queue.empty():
+                time.sleep(0.001)
+
+
+def main():
+    variants = ("none", "legacy", "queued", "queued, sampled")
+    results = {}
+    for _ in range(ROUNDS):
+        for name in variants:
+            with tempfile.TemporaryDirectory() as directory:
+                result = run_variant(name, directory)
+            if name not in results or result[1] < results[name][1]:
+                results[name] = result
+
+    base_wall, base_cpu = (value / REQUESTS * 1e6 for value in results["none"][:2])
+    print(f"{REQUESTS} requests from {THREADS} threads; microseconds per request, overhead over 'none' in brackets")
+    print(f"{'variant':<16} {'wall':>16} {'request-thread CPU':>20} {'drain ms':>9} {'log bytes/req':>14}  api key in log")
+    for name, (wall, cpu, drain, size, leaked) in results.items():
+        wall, cpu = wall / REQUESTS * 1e6, cpu / REQUESTS * 1e6
+        print(f"{name:<16} {wall:7.1f} ({wall - base_wall:6.1f}) {cpu:11.1f} ({cpu - base_cpu:6.1f}) "
+              f"{drain * 1000:9.1f} {size / REQUESTS:14.1f}  {'yes' if leaked else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
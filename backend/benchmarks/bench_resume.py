@@ -0,0 +1,133 @@
+# backend/benchmarks/bench_resume.py
+"""
+Checkpointed research runs against the fake upstream.
+
+1. RUNS thorough runs whose reflection step fails (503 on every model), then
+   recovered three ways: resubmitted with the caches bypassed (a force
+   refresh, a restarted process, or entries evicted since), resubmitted
+   while the in-process caches still hold the first attempt's searches and
+   completions, and resumed from the last checkpoint with the caches
+   bypassed. Reports searches, LLM calls and seconds spent on the recovery.
+2. Checkpoint overhead: the same fast runs (caches bypassed) without and
+   with a SQLite checkpoint file, and the size of the file holding the
+   failed runs' checkpoints.
+3. Expiry: a checkpointer with a TTL of EXPIRY_TTL seconds, resumable before
+   the TTL and not after.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_resume
+"""
+import os
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.fake_upstream import FakeUpstream
+
+RUNS = 5
+OVERHEAD_RUNS = 20
+SEARCH_LATENCY = 0.2
+LLM_LATENCY = 0.3
+EXPIRY_TTL = 1.0
+
+
+def fail_runs(upstream: FakeUpstream, prefix: str) -> None:
+    from agent.researcher import run_research_agent
+
+    upstream.failing_kinds = {"reflection"}
+    for i in range(RUNS):
+        result = run_research_agent(f"offshore wind capacity {prefix} {i}", mode="thorough", thread_id=f"{prefix}-{i}")
+        assert result["status"] == "error", result["status"]
+    upstream.failing_kinds = set()
+
+
+def run_recovery(upstream: FakeUpstream) -> Dict[str, Dict[str, float]]:
+    from agent.researcher import run_research_agent, resume_research_agent
+
+    variants = {
+        "resubmit, no cache": lambda i, prefix: run_research_agent(
+            f"offshore wind capacity {prefix} {i}", mode="thorough", use_cache=False),
+        "resubmit, cached": lambda i, prefix: run_research_agent(
+            f"offshore wind capacity {prefix} {i}", mode="thorough"),
+        "resume": lambda i, prefix: resume_research_agent(f"{prefix}-{i}", use_cache=False)
+    }
+    results = {}
+    for n, (name, recover) in enumerate(variants.items()):
+        prefix = f"run{n}"
+        fail_runs(upstream, prefix)
+        upstream.request_counts = {"search": 0, "llm": 0}
+        start = time.perf_counter()
+        statuses = [recover(i, prefix)["status"] for i in range(RUNS)]
+        results[name] = {
+            "seconds": time.perf_counter() - start,
+            "completed": statuses.count("completed"),
+            "searches": upstream.request_counts["search"],
+            "llm": upstream.request_counts["llm"]
+        }
+    return results
+
+
+def run_overhead(upstream: FakeUpstream, path: str) -> Dict[str, float]:
+    from agent import researcher
+
+    results = {}
+    for name, thread in (("plain", False), ("checkpointed", True)):
+        start = time.perf_counter()
+        for i in range(OVERHEAD_RUNS):
+            researcher.run_research_agent(f"tidal energy {i}", mode="fast", use_cache=False,
+                                          thread_id=f"overhead-{i}" if thread else None)
+        results[name] = (time.perf_counter() - start) / OVERHEAD_RUNS
+    results["file_kb"] = sum(
+        os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix)
+    ) / 1024
+    results.update(researcher.get_checkpointer().stats())
+    return results
+
+
+def run_expiry(upstream: FakeUpstream) -> Dict[str, bool]:
+    from agent import researcher
+
+    researcher.get_checkpointer().ttl = EXPIRY_TTL
+    upstream.failing_kinds = {"research"}
+    researcher.run_research_agent("tidal energy expiring", mode="fast", use_cache=False, thread_id="expiring")
+    upstream.failing_kinds = set()
+    before = researcher.resume_point("expiring") is not None
+    time.sleep(EXPIRY_TTL + 0.1)
+    after = researcher.resume_point("expiring") is not None
+    purged = researcher.get_checkpointer().purge_expired()
+    return {"before": before, "after": after, "purged": purged}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory, FakeUpstream(
+        default_search_latency=SEARCH_LATENCY, llm_latency=LLM_LATENCY
+    ) as upstream:
+        path = os.path.join(directory, "checkpoints.db")
+        # config is read at import; one model and no transport retries keep the failures deterministic
+        os.environ.update(GROQ_API_URL=upstream.llm_url, SERPER_API_URL=upstream.search_url, LOG_FILE="",
+                          CHECKPOINT_DB=path, MODEL_MAX_FALLBACKS="0", HTTP_MAX_RETRIES="0")
+        from agent import tools
+
+        tools.rate_limiter.default_limits = {"rpm": 10 ** 6, "tpm": 10 ** 12}
+        tools.rate_limiter.limits = {}
+        recovery = run_recovery(upstream)
+        overhead = run_overhead(upstream, path)
+        expiry = run_expiry(upstream)
+
+    print(f"{RUNS} thorough runs failed at reflection, {SEARCH_LATENCY}s per search, {LLM_LATENCY}s per completion")
+    print(f"{'recovery':<20} {'completed':>10} {'searches':>9} {'LLM calls':>10}  seconds")
+    for name, row in recovery.items():
+        print(f"{name:<20} {row['completed']:>7}/{RUNS} {row['searches']:9d} {row['llm']:10d}  {row['seconds']:.2f}")
+    print()
+    print(f"fast run, mean of {OVERHEAD_RUNS}: plain {overhead['plain']:.3f}s, "
+          f"checkpointed {overhead['checkpointed']:.3f}s")
+    print(f"checkpoint file: {overhead['file_kb']:.0f} KB for {overhead['threads']} unresumed failed runs "
+          f"({overhead['checkpoints']} checkpoints); completed runs leave none")
+    print()
+    print(f"TTL {EXPIRY_TTL}s: resumable before {expiry['before']}, after {expiry['after']}, "
+          f"rows purged {expiry['purged']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# backend/benchmarks/bench_routing.py
+"""
+Tail latency and failures with and without model failover.
+
+The run's model (llama3-70b-8192) is made to misbehave in the fake upstream,
+first by answering half of its requests with 429 and Retry-After, then by
+answering slower than the latency SLO. Each scenario runs RUNS fast-mode
+research runs, CONCURRENCY at a time, once with failover disabled
+(MODEL_MAX_FALLBACKS=0) and once with the default chain. Run from the
+backend directory:
+
+    python -m benchmarks.bench_routing
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_upstream import FakeUpstream
+
+RUNS = 24
+CONCURRENCY = 8
+MODEL = "llama3-70b-8192"
+LATENCY_SLO = 1.0
+SCENARIOS = {
+    "429 on half the requests": {"model_failures": {MODEL: (429, 0.5)}},
+    "3s replies (SLO 1s)": {"model_latencies": {MODEL: 3.0}},
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    with FakeUpstream(default_search_latency=0.1, llm_latency=0.3) as upstream:
+        os.environ["SERPER_API_URL"] = upstream.search_url
+        os.environ["GROQ_API_URL"] = upstream.llm_url
+
+        from agent import tools
+        from agent.tools import is_llm_error
+        from agent.ratelimit import ModelRateLimiter
+        from agent.researcher import run_research_agent
+        from agent.routing import ModelRouter
+        from config import AVAILABLE_MODELS, DEFAULT_MODEL, STAGE_MODELS, MODEL_FALLBACK_CHAIN
+
+        for scenario, options in SCENARIOS.items():
+            print(scenario)
+            upstream.model_failures = options.get("model_failures", {})
+            upstream.model_latencies = options.get("model_latencies", {})
+            for label, max_fallbacks in (("no failover", 0), ("failover", 2)):
+                # Fresh limiter and router, so one configuration's cooldowns do not leak into the next
+                tools.rate_limiter = ModelRateLimiter({}, {"rpm": 10 ** 6, "tpm": 10 ** 12})
+                tools.model_router = ModelRouter(
+                    AVAILABLE_MODELS, DEFAULT_MODEL, STAGE_MODELS, MODEL_FALLBACK_CHAIN, max_fallbacks,
+                    LATENCY_SLO, cooldown=5.0, window=50, error_rate_threshold=0.5
+                )
+
+                def run(index):
+                    start = time.perf_counter()
+                    result = run_research_agent(f"{label} topic {index}", model=MODEL, mode="fast", use_cache=False)
+                    return time.perf_counter() - start, is_llm_error(result["research"])
+
+                with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+                    outcomes = list(executor.map(run, range(RUNS)))
+                timings = [elapsed for elapsed, _ in outcomes]
+                failed = sum(1 for _, error in outcomes if error)
+                fallbacks = sum(tools.model_router.stats()["fallbacks"].values())
+                print(f"  {label:<12} p50 {percentile(timings, 0.5):5.2f}s  p95 {percentile(timings, 0.95):5.2f}s  "
+                      f"max {max(timings):5.2f}s  failed {failed}/{RUNS}  fallbacks {fallbacks}")
+
+
+if __name__ == "__main__":
+    main()
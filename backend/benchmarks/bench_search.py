@@ -0,0 +1,65 @@
+# backend/benchmarks/bench_search.py
+"""
+Benchmark the search stage against a local fake Serper server.
+
+Compares issuing the planned queries one after another with the concurrent
+`execute_searches` stage of the research graph. Run from the backend directory:
+
+    python -m benchmarks.bench_search
+"""
+import os
+import time
+
+from benchmarks.fake_upstream import FakeUpstream
+
+SEARCH_LATENCIES = [0.2, 0.4, 0.6, 0.3, 0.5]
+
+
+def main():
+    with FakeUpstream(search_latencies=SEARCH_LATENCIES, planned_queries=len(SEARCH_LATENCIES)) as upstream:
+        os.environ["SERPER_API_URL"] = upstream.search_url
+        os.environ["GROQ_API_URL"] = upstream.llm_url
+
+        from agent.tools import search_web, get_http_stats, purge_search_cache, get_search_cache_stats
+        from agent.researcher import run_research_agent
+
+        queries = [f"benchmark query {i}" for i in range(1, len(SEARCH_LATENCIES) + 1)]
+
+        start = time.perf_counter()
+        for query in queries:
+            search_web(query, use_cache=False)
+        sequential = time.perf_counter() - start
+
+        def timed_search_stage():
+            # Time the searching stage of a full run from its first to its last progress event
+            stamps = {}
+
+            def progress_callback(data):
+                if data["step"] == "searching":
+                    stamps.setdefault("start", time.perf_counter())
+                    stamps["end"] = time.perf_counter()
+
+            result = run_research_agent("benchmark topic", progress_callback=progress_callback)
+            return stamps["end"] - stamps["start"], result
+
+        purge_search_cache()
+        concurrent, result = timed_search_stage()
+        counts_before = dict(upstream.request_counts)
+        cached, _ = timed_search_stage()
+        repeat_searches = upstream.request_counts["search"] - counts_before["search"]
+        repeat_llm_calls = upstream.request_counts["llm"] - counts_before["llm"]
+
+        print(f"queries:                 {len(queries)}")
+        print(f"sum of latencies:        {sum(SEARCH_LATENCIES):.2f}s")
+        print(f"slowest latency:         {max(SEARCH_LATENCIES):.2f}s")
+        print(f"sequential search_web:   {sequential:.2f}s")
+        print(f"concurrent search stage: {concurrent:.2f}s")
+        print(f"results merged:          {len(result['search_results'])}")
+        print(f"repeated topic (cached): {cached:.3f}s, {repeat_searches} Serper requests, {repeat_llm_calls} LLM requests")
+        print(f"search cache:            {get_search_cache_stats()}")
+        for host, stats in get_http_stats().items():
+            print(f"connections to {host}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# backend/benchmarks/fake_upstream.py
+"""
+Local stand-ins for the Serper and Groq APIs used by the benchmarks.
+
+The server answers:
+    POST /search                      - Serper-style organic results
+    POST /openai/v1/chat/completions  - Groq/OpenAI-style chat completions
+
+Chat completions honour "stream": true with an SSE response that sends the
+text word by word. Search latency is chosen per query: queries ending in a
+number N use search_latencies[N - 1], everything else uses the default latency.
+Completions take llm_latency plus word_latency per generated word, and
+completion_words sets the answer length per prompt kind ("summary",
+"reflection" or "research"), so long answers take longer as with a real model.
+Per model, model_latencies replaces llm_latency and model_failures makes a
+share of requests fail, e.g. {"llama3-70b-8192": (429, 0.5)}; a 429 carries
+Retry-After: 1. Completions of a kind listed in failing_kinds are answered
+with a 503, e.g. {"reflection"} to fail runs at their last step. Result
+links point at result_base_url, so a local page server
+(benchmarks.fixture_pages) can stand in for the result pages, and the last
+prompt of each kind is kept in last_prompts.
+
+Extraction prompts ("extraction" kind) are answered with a JSON object listing
+every "Company <Name>" in the text; extraction_faults damages a share of those
+replies the way real models do, e.g. {"fenced": 0.2, "truncated": 0.1}, with
+"fenced", "trailing_comma", "truncated" or "prose" (no JSON at all).
+Correction prompts ("correction" kind) are answered cleanly. Prompts longer
+than context_chars are refused with a 400, like an exceeded context window.
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 1024  # The default backlog of 5 drops connections under load benchmarks
+
+    def handle_error(self, request, client_address):
+        # Clients that time out and fail over hang up mid-reply; that is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeUpstream:
+    """Threaded HTTP server that imitates Serper and Groq with fixed latencies"""
+
+    def __init__(self, search_latencies: Optional[List[float]] = None, default_search_latency: float = 0.2,
+                 llm_latency: float = 0.05, planned_queries: int = 5,
+                 completion_words: Optional[Dict[str, int]] = None, word_latency: float = 0.0,
+                 model_latencies: Optional[Dict[str, float]] = None,
+                 model_failures: Optional[Dict[str, Tuple[int, float]]] = None, seed: int = 0,
+                 result_base_url: str = "https://example.com",
+                 extraction_faults: Optional[Dict[str, float]] = None, context_chars: Optional[int] = None,
+                 failing_kinds: Optional[Set[str]] = None):
+        self.search_latencies = search_latencies or []
+        self.default_search_latency = default_search_latency
+        self.llm_latency = llm_latency
+        self.planned_queries = planned_queries
+        self.completion_words = completion_words or {}
+        self.word_latency = word_latency
+        self.model_latencies = model_latencies or {}
+        self.model_failures = model_failures or {}
+        self.result_base_url = result_base_url
+        self.extraction_faults = extraction_faults or {}
+        self.context_chars = context_chars
+        self.failing_kinds = failing_kinds or set()
+        self.last_prompts: Dict[str, str] = {}
+        self._random = random.Random(seed)
+        self.request_counts = {"search": 0, "llm": 0}
+        self.fault_counts: Dict[str, int] = {}
+        self.model_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.base_url}/search"
+
+    @property
+    def llm_url(self) -> str:
+        return f"{self.base_url}/openai/v1/chat/completions"
+
+    def start(self) -> "FakeUpstream":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeUpstream":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def search_latency(self, query: str) -> float:
+        match = re.search(r"(\d+)\s*$", query)
+        if match:
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(self.search_latencies):
+                return self.search_latencies[index]
+        return self.default_search_latency
+
+    @staticmethod
+    def completion_kind(prompt: str) -> str:
+        if "Identify 3-5 specific search queries" in prompt:
+            return "planning"
+        if "Summarize what the search results" in prompt:
+            return "summary"
+        if "Reflect on the following" in prompt:
+            return "reflection"
+        if "according to this JSON schema" in prompt:
+            return "extraction"
+        if "Your previous answer could not be used" in prompt:
+            return "correction"
+        return "research"
+
+    def _fault(self) -> Optional[str]:
+        with self._lock:
+            draw = self._random.random()
+            for fault, rate in self.extraction_faults.items():
+                if draw < rate:
+                    self.fault_counts[fault] = self.fault_counts.get(fault, 0) + 1
+                    return fault
+                draw -= rate
+        return None
+
+    def extraction_text(self, prompt: str, kind: str) -> str:
+        # The text follows the "Text:" line, the previous answer the "Previous answer:" line
+        marker = r"Previous answer:" if kind == "correction" else r"\n\s*Text[^\n]*:"
+        source = re.split(marker, prompt, maxsplit=1)[-1].split("Return only", 1)[0]
+        names = list(dict.fromkeys(re.findall(r"Company [A-Z][a-z]+(?: [A-Z][a-z]+)?", source)))
+        text = json.dumps({"companies": [{"name": name, "country": None} for name in names],
+                           "count": len(names)}, indent=2)
+        fault = self._fault() if kind == "extraction" else None
+        if fault == "fenced":
+            return f"Here is the extracted data:\n```json\n{text}\n```"
+        if fault == "trailing_comma":
+            return text.replace("\n  ],", ",\n  ],").replace("\n}", ",\n}")
+        if fault == "truncated":
+            return text[:int(len(text) * 0.7)]
+        if fault == "prose":
+            return "I found these companies in the text: " + ", ".join(names) + "."
+        return text
+
+    def completion_text(self, prompt: str) -> str:
+        kind = self.completion_kind(prompt)
+        if kind in ("extraction", "correction"):
+            return self.extraction_text(prompt, kind)
+        if kind == "planning":
+            return "\n".join(
+                f"- Search Query {i}: benchmark query {i}\n  - Expected information: fixture data"
+                for i in range(1, self.planned_queries + 1)
+            )
+        text = "## Findings\n\nBenchmark research output with a source (https://example.com/1).\n"
+        padding = self.completion_words.get(kind, 0) - len(text.split())
+        if padding > 0:
+            text += " ".join(["finding"] * padding) + "\n"
+        return text
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, body, status=200, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, text, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = text.split(" ")
+                events = [
+                    {"choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")}}]}
+                    for i, word in enumerate(words)
+                ]
+                events.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}})
+                for event in events:
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if self.path.endswith("/search"):
+                    with upstream._lock:
+                        upstream.request_counts["search"] += 1
+                    query = payload.get("q", "")
+                    time.sleep(upstream.search_latency(query))
+                    num = int(payload.get("num", 5))
+                    self._send_json({
+                        "organic": [
+                            {
+                                "title": f"{query} result {i}",
+                                "link": f"{upstream.result_base_url}/{abs(hash(query)) % 10000}/{i}",
+                                "snippet": f"Snippet {i} about {query}."
+                            }
+                            for i in range(1, num + 1)
+                        ]
+                    })
+                    return
+
+                if self.path.endswith("/chat/completions"):
+                    model = payload.get("model", "")
+                    with upstream._lock:
+                        upstream.request_counts["llm"] += 1
+                        upstream.model_counts[model] = upstream.model_counts.get(model, 0) + 1
+                        status, rate = upstream.model_failures.get(model, (200, 0.0))
+                        failed = upstream._random.random() < rate
+                    if failed:
+                        headers = {"Retry-After": "1"} if status == 429 else {}
+                        self._send_json({"error": {"message": "fake upstream failure"}}, status, headers)
+                        return
+                    prompt = payload.get("messages", [{}])[-1].get("content", "")
+                    if upstream.completion_kind(prompt) in upstream.failing_kinds:
+                        self._send_json({"error": {"message": "fake upstream failure"}}, 503)
+                        return
+                    if upstream.context_chars is not None and len(prompt) > upstream.context_chars:
+                        self._send_json({"error": {"message": "context length exceeded"}}, 400)
+                        return
+                    with upstream._lock:
+                        upstream.last_prompts[upstream.completion_kind(prompt)] = prompt
+                    text = upstream.completion_text(prompt)
+                    latency = upstream.model_latencies.get(model, upstream.llm_latency)
+                    time.sleep(latency + upstream.word_latency * len(text.split()))
+                    usage = {
+                        "prompt_tokens": len(prompt) // 4,
+                        "completion_tokens": len(text) // 4,
+                        "total_tokens": (len(prompt) + len(text)) // 4
+                    }
+                    if payload.get("stream"):
+                        self._send_stream(text, usage)
+                        return
+                    self._send_json({
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+                        "usage": usage
+                    })
+                    return
+
+                self.send_error(404)
+
+        return Handler
@@ -0,0 +1,190 @@
+# backend/benchmarks/fixture_pages.py
+"""
+Local web server with fixture result pages for the page fetching benchmark.
+
+Every page is generated on the fly, so large pages never exist in full:
+    GET /article/<any>  - article page (~60 KB) wrapped in scripts, styles,
+                          navigation and a footer; ETag revalidation (304)
+    GET /long/<any>     - 8 MB of article text
+    GET /huge/<any>     - 8 MB inline script before the article text
+    GET /slow/<any>     - one paragraph per second for 30 seconds
+    GET /file/<any>     - a PDF download
+
+Pages take `latency` seconds before the first byte. The server counts
+requests per kind, 304 answers and body bytes actually sent, and records
+the most requests it served at once per Host header.
+"""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+PARAGRAPH = (
+    "The committee reviewed quarterly measurements from every monitoring station and found that "
+    "average readings rose steadily through the season, with the sharpest increase in coastal areas "
+    "where sampling was most frequent."
+)
+BOILERPLATE_HEAD = (
+    "<!doctype html><html><head><title>Fixture article</title>"
+    "<style>" + "body{margin:0;padding:0}" * 400 + "</style>"
+    "<script>" + "var tracker = {events: []};" * 600 + "</script></head><body>"
+    "<header><a href='/'>Home</a> <a href='/news'>News</a> <a href='/about'>About</a></header>"
+    "<nav><ul>" + "".join(f"<li><a href='/section/{i}'>Section {i}</a></li>" for i in range(60)) + "</ul></nav>"
+)
+BOILERPLATE_TAIL = (
+    "<aside>Related: <a href='/a'>one</a> <a href='/b'>two</a></aside>"
+    "<footer>Copyright Fixture Media. All rights reserved. Terms. Privacy. Cookies.</footer>"
+    "<script>" + "window.analytics && analytics.track('view');" * 300 + "</script></body></html>"
+)
+BIG = 8 * 1024 * 1024
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The fetcher hangs up once it has enough text or hits a cap; that is the point
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FixturePages:
+    """Threaded HTTP server generating fixture web pages"""
+
+    def __init__(self, latency: float = 0.2, paragraphs: int = 40):
+        self.latency = latency
+        self.paragraphs = paragraphs
+        self.request_counts: Dict[str, int] = {}
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.max_active: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def alt_base_url(self) -> str:
+        """Same server under a second host name, for per-host limits"""
+        return f"http://localhost:{self.port}"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.request_counts = {}
+            self.not_modified = 0
+            self.bytes_sent = 0
+            self.max_active = {}
+
+    def start(self) -> "FixturePages":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FixturePages":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def article(self) -> Iterator[bytes]:
+        yield BOILERPLATE_HEAD.encode("utf-8")
+        yield b"<main><article><h1>Fixture article</h1>"
+        for i in range(self.paragraphs):
+            yield f"<p>{PARAGRAPH} Finding {i + 1}.</p>".encode("utf-8")
+        yield b"</article></main>"
+        yield BOILERPLATE_TAIL.encode("utf-8")
+
+    def long_article(self) -> Iterator[bytes]:
+        paragraph = f"<p>{PARAGRAPH}</p>".encode("utf-8")
+        for _ in range(BIG // len(paragraph)):
+            yield paragraph
+
+    def huge_script(self) -> Iterator[bytes]:
+        yield b"<html><body><script>"
+        line = b"var x = 1;" * 6553
+        for _ in range(BIG // len(line)):
+            yield line
+        yield f"</script><p>{PARAGRAPH}</p></body></html>".encode("utf-8")
+
+    def slow_article(self) -> Iterator[bytes]:
+        yield b"<html><body>"
+        for _ in range(30):
+            yield f"<p>{PARAGRAPH}</p>".encode("utf-8")
+            time.sleep(1)
+        yield b"</body></html>"
+
+    def _handler_class(self):
+        pages = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                with pages._lock:
+                    pages.bytes_sent += len(data)
+
+            def do_GET(self):
+                kind = self.path.strip("/").split("/", 1)[0]
+                host = self.headers.get("Host", "")
+                with pages._lock:
+                    pages.request_counts[kind] = pages.request_counts.get(kind, 0) + 1
+                    pages._active[host] = pages._active.get(host, 0) + 1
+                    pages.max_active[host] = max(pages.max_active.get(host, 0), pages._active[host])
+                try:
+                    time.sleep(pages.latency)
+                    self._serve(kind)
+                finally:
+                    with pages._lock:
+                        pages._active[host] -= 1
+
+            def _serve(self, kind: str) -> None:
+                if kind == "file":
+                    body = b"%PDF-1.4 fixture"
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/pdf")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                generators = {"article": pages.article, "long": pages.long_article,
+                              "huge": pages.huge_script, "slow": pages.slow_article}
+                if kind not in generators:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = f'"{kind}-{pages.paragraphs}"'
+                if kind == "article" and self.headers.get("If-None-Match") == etag:
+                    with pages._lock:
+                        pages.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("ETag", etag)
+                self.end_headers()
+                for data in generators[kind]():
+                    self._write_chunk(data)
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
@@ -9,7 +9,40 @@ SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 API_KEY = os.getenv("API_KEY")
 
 # LLM Configuration
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"  # Add this line
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+# HTTP Client Configuration (shared keep-alive sessions for Serper and Groq)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # Keep-alive connections per upstream host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))  # Transport-level retries on connection errors and 5xx
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "100"))  # Shared by all tasks on the async executor, in clients of HTTP_POOL_SIZE
+
+# Search Configuration
+SERPER_API_URL = os.getenv("SERPER_API_URL", "https://google.serper.dev/search")
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "5"))  # Concurrent Serper requests per run
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "10"))  # Seconds allowed per search query
+
+# Search Result Cache
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "512"))  # In-process LRU entries (0 disables)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "21600"))  # Seconds before a cached search goes stale
+SEARCH_CACHE_DB = os.getenv("SEARCH_CACHE_DB", "")  # SQLite file for the persistent tier (empty disables)
+
+# Page Fetching (optional stage after searching: read the main text of the top result pages)
+PAGE_FETCH_ENABLED = os.getenv("PAGE_FETCH_ENABLED", "False") == "True"
+PAGE_FETCH_MAX_PAGES = int(os.getenv("PAGE_FETCH_MAX_PAGES", "5"))  # Top-ranked results fetched per run
+PAGE_FETCH_MAX_WORKERS = int(os.getenv("PAGE_FETCH_MAX_WORKERS", "5"))  # Pages downloaded at once per run
+PAGE_FETCH_PER_HOST = int(os.getenv("PAGE_FETCH_PER_HOST", "2"))  # Downloads from one host at once, across all runs
+PAGE_FETCH_TIMEOUT = float(os.getenv("PAGE_FETCH_TIMEOUT", "8"))  # Seconds allowed per page, download included
+PAGE_FETCH_MAX_BYTES = int(os.getenv("PAGE_FETCH_MAX_BYTES", str(1024 * 1024)))  # The download stops after this many bytes
+PAGE_TEXT_MAX_CHARS = int(os.getenv("PAGE_TEXT_MAX_CHARS", "2000"))  # Main text kept per page; the download stops once it is reached
+PAGE_FETCH_ALLOW_PRIVATE = os.getenv("PAGE_FETCH_ALLOW_PRIVATE", "False") == "True"  # Allow localhost and private IP hosts (local test servers)
+PAGE_FETCH_USER_AGENT = os.getenv("PAGE_FETCH_USER_AGENT", "ResearchAgent/1.0 (+page fetcher)")
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "1024"))  # In-process LRU entries (0 disables)
+PAGE_CACHE_FRESH_SECONDS = float(os.getenv("PAGE_CACHE_FRESH_SECONDS", "3600"))  # Cached text is used without a request for this long, then revalidated by ETag
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "86400"))  # Seconds before a cached page is dropped
+PAGE_CACHE_DB = os.getenv("PAGE_CACHE_DB", "")  # SQLite file for the persistent tier (empty disables)
 
 # Available models
 AVAILABLE_MODELS = {
@@ -21,7 +54,145 @@ AVAILABLE_MODELS = {
 
 DEFAULT_MODEL = "llama3-70b-8192"
 
+# Token budget for the packed search results in the synthesis prompt, per model.
+# Kept well below each context window so the prompt template and the answer
+# still fit, and below the per-minute token quota.
+SEARCH_CONTEXT_BUDGETS = {
+    "deepseek-r1-distill-llama-70b": 4000,  # 128k context window
+    "llama3-70b-8192": 3000,  # 8k context window
+    "mistral-saba-24b": 4000,  # 32k context window
+    "gemma2-9b-it": 2500  # 8k context window
+}
+DEFAULT_SEARCH_CONTEXT_BUDGET = 3000
+
+# Per-model Groq quotas: requests per minute and tokens per minute
+MODEL_RATE_LIMITS = {
+    "deepseek-r1-distill-llama-70b": {"rpm": 30, "tpm": 6000},
+    "llama3-70b-8192": {"rpm": 30, "tpm": 6000},
+    "mistral-saba-24b": {"rpm": 30, "tpm": 6000},
+    "gemma2-9b-it": {"rpm": 30, "tpm": 15000}
+}
+DEFAULT_RATE_LIMITS = {"rpm": 30, "tpm": 6000}
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "1024"))  # Reserved per call until usage is known
+
+# LLM Response Cache (content-addressed on the full request payload)
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # In-process tier budget
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")  # SQLite file for the persistent tier (empty disables)
+LLM_CACHE_DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Structured Extraction (extract_information)
+EXTRACTION_CHUNK_TOKENS = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "2000"))  # Text per extraction call; longer text is split into chunks
+EXTRACTION_MAX_CHUNKS = int(os.getenv("EXTRACTION_MAX_CHUNKS", "20"))  # Text beyond this many chunks is not read
+EXTRACTION_MAX_WORKERS = int(os.getenv("EXTRACTION_MAX_WORKERS", "4"))  # Chunks extracted at once per call
+EXTRACTION_MAX_REASKS = int(os.getenv("EXTRACTION_MAX_REASKS", "1"))  # Corrections asked for per chunk when its reply cannot be repaired locally
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "256"))  # In-process LRU entries (0 disables)
+EXTRACTION_CACHE_TTL = float(os.getenv("EXTRACTION_CACHE_TTL", "86400"))  # Seconds a cached extraction is reused
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "")  # SQLite file for the persistent tier (empty disables)
+
+# Research Pipeline Modes
+# fast: plan -> search -> synthesize
+# standard: reflect only when the local quality gate scores the draft below the threshold
+# thorough: always reflect and rewrite
+# mapreduce: summarize each planned query's results in parallel, then merge the summaries
+PIPELINE_MODES = ("fast", "standard", "thorough", "mapreduce")
+DEFAULT_PIPELINE_MODE = os.getenv("DEFAULT_PIPELINE_MODE", "standard")
+REFLECTION_QUALITY_THRESHOLD = float(os.getenv("REFLECTION_QUALITY_THRESHOLD", "0.7"))  # 0-1 draft score
+MAPREDUCE_MAP_MODEL = os.getenv("MAPREDUCE_MAP_MODEL", "gemma2-9b-it")  # Model for the per-query summaries (empty uses the run's model)
+MAPREDUCE_MAX_CONCURRENCY = int(os.getenv("MAPREDUCE_MAX_CONCURRENCY", "5"))  # Summaries generated at once per run
+
+# Model routing: preferred model per pipeline stage and failover between models
+STAGE_MODELS = {
+    "planning": os.getenv("PLANNING_MODEL", "gemma2-9b-it"),  # Small, fast model for query planning
+    "summarizing": MAPREDUCE_MAP_MODEL,
+    "extracting": os.getenv("EXTRACTION_MODEL", "")  # Structured extraction; empty uses the caller's model
+}  # Stages not listed (or empty) use the model chosen for the run
+MODEL_FALLBACK_CHAIN = [
+    model.strip() for model in os.getenv("MODEL_FALLBACK_CHAIN", "llama3-70b-8192,mistral-saba-24b,gemma2-9b-it").split(",")
+    if model.strip()
+]  # Tried in order after the preferred model
+MODEL_MAX_FALLBACKS = int(os.getenv("MODEL_MAX_FALLBACKS", "2"))  # Other models tried per call (0 disables failover)
+LLM_LATENCY_SLO = float(os.getenv("LLM_LATENCY_SLO", "15"))  # Seconds; slower calls fail over (non-streamed) or demote the model
+MODEL_COOLDOWN_SECONDS = float(os.getenv("MODEL_COOLDOWN_SECONDS", "30"))  # How long a failing or slow model is tried last
+MODEL_STATS_WINDOW = int(os.getenv("MODEL_STATS_WINDOW", "50"))  # Recent calls per model behind the health stats
+MODEL_ERROR_RATE_THRESHOLD = float(os.getenv("MODEL_ERROR_RATE_THRESHOLD", "0.5"))  # Recent error rate that marks a model unhealthy
+
+# Semantic cache: answer paraphrases of recent research from the earlier result
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "True") == "True"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))  # Cosine similarity (0-1) needed to reuse a result
+SEMANTIC_CACHE_MAX_AGE_HOURS = float(os.getenv("SEMANTIC_CACHE_MAX_AGE_HOURS", "24"))  # Older results are never reused
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))  # Indexed queries; the oldest is replaced when full
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))  # Hash buckets per query vector
+
+# Research Job Scheduler
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", "4"))  # Research runs executing at once
+RESEARCH_QUEUE_SIZE = int(os.getenv("RESEARCH_QUEUE_SIZE", "50"))  # Waiting jobs before POST /research returns 429
+RESEARCH_MAX_PER_USER = int(os.getenv("RESEARCH_MAX_PER_USER", "2"))  # Running jobs allowed per user
+RESEARCH_EXECUTOR = os.getenv("RESEARCH_EXECUTOR", "threads")  # "threads" (one OS thread per running job) or "async" (one event loop)
+ASYNC_MAX_CONCURRENT_TASKS = int(os.getenv("ASYNC_MAX_CONCURRENT_TASKS", "256"))  # Jobs running at once on the async executor
+RESEARCH_COALESCE = os.getenv("RESEARCH_COALESCE", "True") == "True"  # Share one run between identical in-flight submissions
+
+# Batch Research (POST /api/research/batch)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))  # Items accepted in one batch
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "4"))  # Items of one batch queued or running at once
+BATCH_PRIORITY = int(os.getenv("BATCH_PRIORITY", "10"))  # Default item priority; interactive submissions default to 0 and run first
+BATCH_MIN_HEADROOM = float(os.getenv("BATCH_MIN_HEADROOM", "0.25"))  # No new items while less than this share of a model's rate limit is left
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "0.25"))  # How often a batch checks its items and admits new ones
+
+# Research Task State (GET /api/research/<task_id>)
+TASK_TTL_SECONDS = float(os.getenv("TASK_TTL_SECONDS", "3600"))  # How long finished tasks and their results stay fetchable
+TASK_STORE_MAX_ENTRIES = int(os.getenv("TASK_STORE_MAX_ENTRIES", "1000"))  # Oldest finished tasks are evicted beyond this
+TASK_SWEEP_INTERVAL = float(os.getenv("TASK_SWEEP_INTERVAL", "1"))  # Minimum seconds between sweeps for expired tasks
+TASK_WAIT_MAX_SECONDS = float(os.getenv("TASK_WAIT_MAX_SECONDS", "60"))  # Upper bound for the ?wait= long-poll
+TASK_WAIT_POLL_INTERVAL = float(os.getenv("TASK_WAIT_POLL_INTERVAL", "0.25"))  # Long-poll check interval
+
+# Research Checkpoints (POST /api/research/<task_id>/resume)
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "")  # SQLite file for per-node checkpoints of API runs, opened on first use (empty, the default, disables resume)
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", "3600"))  # Seconds a failed or cancelled run can be resumed; keep within TASK_TTL_SECONDS
+CHECKPOINT_PURGE_INTERVAL = float(os.getenv("CHECKPOINT_PURGE_INTERVAL", "60"))  # Minimum seconds between deletions of expired checkpoints
+
+# Streaming of generated research to the client (research_chunk events)
+STREAM_BATCH_CHARS = int(os.getenv("STREAM_BATCH_CHARS", "120"))  # Emit once this much text is buffered...
+STREAM_BATCH_INTERVAL = float(os.getenv("STREAM_BATCH_INTERVAL", "0.25"))  # ...or this many seconds have passed
+PROGRESS_COALESCE_INTERVAL = float(os.getenv("PROGRESS_COALESCE_INTERVAL", "0.5"))  # Per task room, at most one research_progress emit per interval within a stage (0 emits every event)
+
+# Message broker: Socket.IO emits, task state and cancellations shared between backend processes
+MESSAGE_BROKER = os.getenv("MESSAGE_BROKER", "inprocess")  # "inprocess" (single process) or "tcp" (processes sharing a broker)
+MESSAGE_BROKER_URL = os.getenv("MESSAGE_BROKER_URL", "tcp://127.0.0.1:5556")  # Address of the tcp broker (python -m api.broker)
+MESSAGE_BROKER_QUEUE_SIZE = int(os.getenv("MESSAGE_BROKER_QUEUE_SIZE", "10000"))  # Messages buffered per connection before a slow peer is dropped
+
+# Research History Storage
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "memory")  # "memory" or "sqlite"
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "history.db")  # Used by the sqlite backend
+HISTORY_MAX_ENTRIES_PER_USER = int(os.getenv("HISTORY_MAX_ENTRIES_PER_USER", "500"))  # 0 keeps everything
+HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "90"))  # 0 keeps entries forever
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))  # Default entries per GET /api/history page
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "100"))  # Upper bound for the limit parameter
+
+# Metrics (GET /metrics, Prometheus text format)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"  # Serve GET /metrics
+METRICS_LATENCY_BUCKETS = [
+    float(bucket) for bucket in os.getenv("METRICS_LATENCY_BUCKETS", "0.05,0.1,0.25,0.5,1,2.5,5,10,20,40,80").split(",")
+]  # Histogram bucket bounds in seconds
+
 # Flask Configuration
 DEBUG = os.getenv("DEBUG", "False") == "True"
 PORT = int(os.getenv("PORT", "5000"))
 HOST = os.getenv("HOST", "0.0.0.0")
+
+# Logging (records are queued and written by a background thread)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG" if DEBUG else "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "app.log")  # JSON lines; empty disables the file
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Rotate the file past this size
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))  # Rotated files kept
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records waiting for the writer; more are dropped, not waited on
+LOG_HEADER_ALLOWLIST = [
+    header.strip() for header in os.getenv("LOG_HEADER_ALLOWLIST", "User-Agent,Content-Length,X-User-ID").split(",")
+    if header.strip()
+]  # Request headers copied into request log lines; everything else (X-Api-Key, cookies) is left out
+# Share of successful requests logged per route; unlisted routes log every request, errors are always logged
+LOG_SAMPLE_RATES = {
+    "/api/health": 0.0,
+    "/metrics": 0.0,
+    "/api/research/<task_id>": 0.1,  # Long-poll and status polling
+    "/api/research/queue": 0.1
+}
@@ -0,0 +1,180 @@
+# backend/logging_setup.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Mapping, Optional, TextIO
+from flask import Flask, g, request
+from config import (
+    LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_HEADER_ALLOWLIST, LOG_SAMPLE_RATES
+)
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed as extra={"fields": {...}} become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The usual one-line text format, with any structured fields appended"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        return f"{text} | {json.dumps(fields, default=str)}" if fields else text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without ever blocking the caller
+
+    When the queue is full (the disk or console cannot keep up) records are
+    dropped and counted instead of stalling request threads.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Most records are f-strings without args or exceptions; they need no
+        # merging or copying before crossing to the writer thread
+        if not record.args and not record.exc_info:
+            record.message = record.msg = str(record.msg)
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Optional[str] = LOG_FILE,
+                  console: Optional[TextIO] = sys.stderr) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    The root logger gets a single non-blocking queue handler; the listener
+    thread formats records and writes them to the console (text) and to a
+    size-rotated file (JSON lines). Calling it again replaces the previous
+    setup.
+
+    Args:
+        level: Root logger level name
+        log_file: File for JSON lines, rotated at LOG_MAX_BYTES; empty or None disables it
+        console: Stream for human-readable lines, or None for no console output
+
+    Returns:
+        The running QueueListener (stopped automatically at exit)
+    """
+    global _listener
+    shutdown_logging()
+
+    handlers = []
+    if console is not None:
+        console_handler = logging.StreamHandler(console)
+        console_handler.setFormatter(ConsoleFormatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE)))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(root.handlers[0].queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Write out queued records, stop the writer thread and close its handlers"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def _environ_key(header: str) -> str:
+    """WSGI environ key of a request header (Content-Type and Content-Length have no HTTP_ prefix)"""
+    key = header.upper().replace("-", "_")
+    return key if key in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{key}"
+
+
+def install_request_logging(app: Flask, header_allowlist: Iterable[str] = LOG_HEADER_ALLOWLIST,
+                            sample_rates: Mapping[str, float] = LOG_SAMPLE_RATES) -> None:
+    """
+    Log one structured line per request after the response is built
+
+    Lines carry the method, path, route, status, duration and only the
+    allow-listed request headers. Successful requests to routes listed in
+    sample_rates are logged at that rate; errors are always logged.
+
+    Args:
+        app: Flask application to add the hooks to
+        header_allowlist: Request header names to include
+        sample_rates: Share of successful requests logged, keyed by route rule
+    """
+    logger = logging.getLogger("api.requests")
+    # Read straight from the WSGI environ; EnvironHeaders lookups are case-insensitive scans
+    environ_keys = [(name, _environ_key(name)) for name in header_allowlist]
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        rule = request.url_rule.rule if request.url_rule else None
+        rate = sample_rates.get(rule, 1.0)
+        if response.status_code < 400 and rate < 1.0 and random.random() >= rate:
+            return response
+        if not logger.isEnabledFor(logging.INFO):
+            return response
+
+        started = g.get("request_started")
+        environ = request.environ
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "route": rule,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2) if started else None,
+            "headers": {name: environ[key] for name, key in environ_keys if key in environ}
+        }
+        if rate < 1.0 and response.status_code < 400:
+            fields["sample_rate"] = rate  # Each line stands for 1/rate requests
+        logger.info(f"{request.method} {request.path} {response.status_code}", extra={"fields": fields})
+        return response
@@ -0,0 +1,139 @@
+# backend/tests/test_extraction.py
+import pytest
+
+from agent.extraction import chunk_text, conform, merge_extractions, normalize_schema, repair_json
+
+STRINGS = {"type": "array", "items": {"type": "string"}}
+COMPANIES = normalize_schema({"companies": [{"name": "string", "country": "string"}], "count": "integer"})
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('[1, 2]', [1, 2]),
+    ('"just a string"', "just a string"),
+])
+def test_repair_json_leaves_valid_json_alone(reply, expected):
+    assert repair_json(reply) == (expected, False)
+
+
+@pytest.mark.parametrize("reply, expected", [
+    # Code fences and prose around the value
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('```\n{"a": 1}\n```', {"a": 1}),
+    ('```json\n{"a": 1}', {"a": 1}),
+    ('Here is the JSON:\n{"a": 1}\nLet me know if you need more.', {"a": 1}),
+    ('{"a": 1} and then {"b": 2}', {"a": 1}),
+    # Trailing commas
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('```json\n{"tags": ["x", "y" , ]}\n```', {"tags": ["x", "y"]}),
+    # Truncated mid-string, mid-array and mid-object
+    ('{"name": "Acme Co', {"name": "Acme Co"}),
+    ('{"name": "Acme \\', {"name": "Acme "}),
+    ('{"tags": ["x", "y", "z', {"tags": ["x", "y", "z"]}),
+    ('{"tags": ["x", "y",', {"tags": ["x", "y"]}),
+    ('{"a": {"b": [1, 2', {"a": {"b": [1, 2]}}),
+    ('[1, 2, 3', [1, 2, 3]),
+    ('{"companies": [{"name": "A"}, {"name": "B", "country": "U',
+     {"companies": [{"name": "A"}, {"name": "B", "country": "U"}]}),
+    # Members cut off before their value are dropped
+    ('{"a": 1, "b":', {"a": 1}),
+    ('{"a": 1, "b', {"a": 1}),
+    ('{"a": 1, "b": tru', {"a": 1}),
+    # Braces inside strings do not count
+    ('{"a": "{[", "b": "x', {"a": "{[", "b": "x"}),
+])
+def test_repair_json_repairs(reply, expected):
+    assert repair_json(reply) == (expected, True)
+
+
+@pytest.mark.parametrize("reply", [
+    "I could not find any companies in this text.",
+    "",
+    "{: }",
+])
+def test_repair_json_gives_up(reply):
+    with pytest.raises(ValueError):
+        repair_json(reply)
+
+
+@pytest.mark.parametrize("schema, expected", [
+    ("string", {"type": "string"}),
+    ("Company name", {"type": "string", "description": "Company name"}),
+    (["string"], STRINGS),
+    ({"address": {"city": "string"}},
+     {"type": "object", "properties": {"address": {"type": "object", "properties": {"city": {"type": "string"}}}}}),
+    ({"type": "object", "properties": {"n": {"type": "integer"}}},
+     {"type": "object", "properties": {"n": {"type": "integer"}}}),
+    ({"properties": {"tags": ["string"]}}, {"type": "object", "properties": {"tags": STRINGS}}),
+    # A field that happens to be called "type" is shorthand, not a schema keyword
+    ({"type": "string", "name": "string"},
+     {"type": "object", "properties": {"type": {"type": "string"}, "name": {"type": "string"}}}),
+])
+def test_normalize_schema(schema, expected):
+    assert normalize_schema(schema) == expected
+
+
+@pytest.mark.parametrize("value, node, expected", [
+    # Single value where a list is expected
+    ("x", STRINGS, ["x"]),
+    (["x", "", None, " y "], STRINGS, ["x", "y"]),
+    (None, STRINGS, []),
+    # Numbers from strings
+    ("1,234.5 million", {"type": "number"}, 1234.5),
+    ("about 42 employees", {"type": "integer"}, 42),
+    (3.7, {"type": "integer"}, 3),
+    ("unknown", {"type": "number"}, None),
+    (True, {"type": "number"}, None),
+    # Booleans and strings
+    ("Yes", {"type": "boolean"}, True),
+    ("no", {"type": "boolean"}, False),
+    ("maybe", {"type": "boolean"}, None),
+    (12, {"type": "string"}, "12"),
+    ({"a": 1}, {"type": "string"}, '{"a": 1}'),
+    # Objects get defaults for missing fields and lose unknown ones
+    ({"companies": {"name": "A"}, "extra": 1}, COMPANIES,
+     {"companies": [{"name": "A", "country": None}], "count": None}),
+    ("not an object", COMPANIES, {"companies": [], "count": None}),
+    ({}, COMPANIES, {"companies": [], "count": None}),
+])
+def test_conform(value, node, expected):
+    assert conform(value, node) == expected
+
+
+@pytest.mark.parametrize("values, node, expected", [
+    # Lists are concatenated in order without repeats
+    ([["a", "b"], ["b", "c"], None], STRINGS, ["a", "b", "c"]),
+    ([{"companies": [{"name": "A", "country": "US"}], "count": 1},
+      {"companies": [{"name": "A", "country": "US"}, {"name": "B", "country": None}], "count": 2}],
+     COMPANIES,
+     {"companies": [{"name": "A", "country": "US"}, {"name": "B", "country": None}], "count": 1}),
+    # The first chunk with a value wins
+    ([None, "", "first", "second"], {"type": "string"}, "first"),
+    ([None, None], {"type": "string"}, None),
+    ([{"count": None}, {"count": 5}], COMPANIES, {"companies": [], "count": 5}),
+    ([], COMPANIES, {"companies": [], "count": None}),
+])
+def test_merge_extractions(values, node, expected):
+    assert merge_extractions(values, node) == expected
+
+
+@pytest.mark.parametrize("text, max_chars, expected", [
+    ("short text", 100, ["short text"]),
+    ("   \n\n  ", 100, []),
+    # Paragraphs are packed together up to the limit
+    ("aaaa\n\nbbbb\n\ncccc", 10, ["aaaa\n\nbbbb", "cccc"]),
+    # A long paragraph is split at sentence ends
+    ("One two. Three four. Five six.", 12, ["One two.", "Three four.", "Five six."]),
+    # Only a sentence longer than the limit is cut mid-sentence
+    ("abcdefghij", 4, ["abcd", "efgh", "ij"]),
+])
+def test_chunk_text(text, max_chars, expected):
+    assert chunk_text(text, max_chars) == expected
+
+
+def test_chunks_stay_within_the_limit_and_keep_every_word():
+    paragraphs = [" ".join(f"word{p}x{s}." for s in range(p % 7 + 1)) for p in range(40)]
+    text = "\n\n".join(paragraphs)
+    chunks = chunk_text(text, 60)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
@@ -0,0 +1,105 @@
+# backend/tests/test_history.py
+import time
+
+import pytest
+
+from agent.history import InMemoryHistoryStore, SQLiteHistoryStore, history_cursor, parse_history_cursor
+
+
+def entry(entry_id: str, age_days: float = 0.0) -> dict:
+    return {
+        "id": entry_id,
+        "timestamp": time.time() - age_days * 86400,
+        "query": f"query {entry_id}",
+        "results": {"model": "model", "status": "completed"}
+    }
+
+
+def test_clear_drops_the_user():
+    store = InMemoryHistoryStore(max_entries_per_user=10, retention_days=0)
+    store.append("user", entry("a"))
+
+    assert store.clear("user")
+    assert "user" not in store._histories
+    assert not store.clear("user")
+
+
+def test_user_is_dropped_once_their_entries_expire():
+    store = InMemoryHistoryStore(max_entries_per_user=10, retention_days=1)
+    store.append("user", entry("a", age_days=2))
+
+    assert store.list_entries("user") == []
+    assert "user" not in store._histories
+
+
+def test_sweep_drops_users_that_are_never_read_again():
+    store = InMemoryHistoryStore(max_entries_per_user=10, retention_days=1)
+    store.PURGE_INTERVAL = 3
+    store.append("anonymous-1", entry("a"))
+    store._histories["anonymous-1"][0][0]["timestamp"] -= 2 * 86400
+    store.append("anonymous-2", entry("b"))
+    assert set(store._histories) == {"anonymous-1", "anonymous-2"}
+
+    store.append("anonymous-3", entry("c"))
+
+    assert set(store._histories) == {"anonymous-2", "anonymous-3"}
+
+
+def test_list_recent_leaves_out_expired_users():
+    store = InMemoryHistoryStore(max_entries_per_user=10, retention_days=1)
+    store.append("old", entry("a"))
+    store._histories["old"][0][0]["timestamp"] -= 2 * 86400
+    store.append("new", entry("b"))
+
+    assert [item["id"] for item in store.list_recent(10)] == ["b"]
+    assert set(store._histories) == {"new"}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLiteHistoryStore(str(tmp_path / "history.db"), max_entries_per_user=2, retention_days=1)
+        yield store
+        store.close()
+    else:
+        yield InMemoryHistoryStore(max_entries_per_user=2, retention_days=1)
+
+
+def test_removed_entries_are_reported(store):
+    removed = []
+    store.on_remove = removed.extend
+    store.PURGE_INTERVAL = 4
+    store.append("user", entry("a"))
+    store.append("user", entry("b"))
+    store.append("user", entry("c"))
+    assert removed == ["a"]
+
+    store.append("other", entry("old", age_days=2))
+    assert "old" in removed
+
+    store.clear("user")
+    assert sorted(removed) == ["a", "b", "c", "old"]
+
+
+def test_pages_split_inside_a_run_of_equal_timestamps(store):
+    store.max_entries_per_user = 0
+    store.retention_seconds = None
+    now = time.time()
+    for entry_id in ["d", "b", "e", "a", "c"]:
+        store.append("user", {**entry(entry_id), "timestamp": now})
+    store.append("user", {**entry("newest"), "timestamp": now + 1})
+
+    seen, before = [], (None, None)
+    while True:
+        page = store.list_summaries("user", limit=2, before=before[0], before_id=before[1])
+        seen += [item["id"] for item in page]
+        if len(page) < 2:
+            break
+        before = parse_history_cursor(history_cursor(page[-1]))
+
+    assert seen == ["newest", "e", "d", "c", "b", "a"]
+
+
+def test_bare_timestamp_cursor_is_still_accepted():
+    assert parse_history_cursor("1700000000.5") == (1700000000.5, None)
+    assert parse_history_cursor("1700000000.5:query_1_ab") == (1700000000.5, "query_1_ab")
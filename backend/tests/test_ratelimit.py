@@ -0,0 +1,154 @@
+# backend/tests/test_ratelimit.py
+import pytest
+
+from agent.ratelimit import ModelRateLimiter, TokenBucket, parse_duration
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def bucket(capacity: float = 2, refill_per_second: float = 1) -> (TokenBucket, FakeClock):
+    clock = FakeClock()
+    return TokenBucket(capacity, refill_per_second, clock=clock), clock
+
+
+def test_reservations_go_negative_and_queue_in_arrival_order():
+    tokens, _ = bucket()
+    assert [tokens.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    assert tokens.available == -2.0
+
+
+def test_refill_is_capped_at_capacity():
+    tokens, clock = bucket()
+    tokens.reserve(2)
+    clock.now += 1.5
+    assert tokens.available == 1.5
+    clock.now += 60
+    assert tokens.available == 2.0
+
+
+def test_overdrawn_bucket_waits_for_its_refill():
+    tokens, clock = bucket()
+    tokens.reserve(2)
+    assert tokens.reserve() == 1.0
+    clock.now += 1.0
+    # The earlier reservation used up the refill, so the next one waits a full second more
+    assert tokens.reserve() == 1.0
+
+
+def test_reservation_larger_than_capacity_waits_for_a_full_bucket():
+    tokens, _ = bucket(capacity=10, refill_per_second=2)
+    tokens.reserve(10)
+    assert tokens.reserve(50) == 5.0
+
+
+@pytest.mark.parametrize("delta, expected", [
+    (2, 9.0),  # refund after an overestimate
+    (5, 10.0),  # refunds never fill past capacity
+    (-3, 4.0),  # extra debit after an underestimate
+    (-12, -5.0),  # which may overdraw the bucket
+])
+def test_adjust(delta, expected):
+    tokens, _ = bucket(capacity=10, refill_per_second=1)
+    tokens.reserve(3)
+    tokens.adjust(delta)
+    assert tokens.available == expected
+
+
+def test_sync_only_lowers_the_level():
+    tokens, _ = bucket(capacity=10, refill_per_second=1)
+    tokens.sync(4)
+    assert tokens.available == 4.0
+    tokens.sync(8)
+    assert tokens.available == 4.0
+
+
+def test_sync_with_nothing_left_blocks_until_reset():
+    tokens, clock = bucket(capacity=10, refill_per_second=10)
+    tokens.sync(0, reset_seconds=30)
+    assert tokens.headroom() == 0.0
+    assert tokens.reserve() == 30.0
+    clock.now += 30
+    assert tokens.reserve() == 0.0
+
+
+def test_block_for_refuses_tokens_until_it_ends():
+    tokens, clock = bucket()
+    tokens.block_for(5)
+    assert tokens.headroom() == 0.0
+    assert tokens.reserve() == 5.0
+    clock.now += 5
+    assert tokens.headroom() == 1.0
+    assert tokens.reserve() == 0.0
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("30", 30.0),
+    ("7.66s", 7.66),
+    ("2m59.56s", 179.56),
+    ("120ms", 0.12),
+    ("1h", 3600.0),
+    ("", None),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == pytest.approx(seconds) if seconds is not None else parse_duration(value) is None
+
+
+def limiter() -> (ModelRateLimiter, FakeClock):
+    clock = FakeClock()
+    limits = {"small": {"rpm": 2, "tpm": 600}}
+    return ModelRateLimiter(limits, {"rpm": 60, "tpm": 6000}, clock=clock), clock
+
+
+def test_models_have_separate_buckets():
+    rate_limiter, _ = limiter()
+    assert rate_limiter.reserve("small", 100) == 0.0
+    assert rate_limiter.reserve("small", 100) == 0.0
+    assert rate_limiter.reserve("small", 100) == 30.0  # third request at 2 rpm
+    assert rate_limiter.reserve("other", 100) == 0.0
+
+
+def test_reserve_waits_for_the_slower_of_requests_and_tokens():
+    rate_limiter, _ = limiter()
+    # 900 tokens against 600 tpm: 300 short at 10 tokens/s, while a request is still free
+    assert rate_limiter.reserve("small", 500) == 0.0
+    assert rate_limiter.reserve("small", 400) == 30.0
+
+
+def test_record_usage_refunds_and_debits_the_estimate():
+    rate_limiter, _ = limiter()
+    rate_limiter.reserve("small", 500)
+    rate_limiter.record_usage("small", estimated_tokens=500, actual_tokens=200)
+    assert rate_limiter._get_buckets("small")[1].available == 400.0
+    rate_limiter.record_usage("small", estimated_tokens=100, actual_tokens=250)
+    assert rate_limiter._get_buckets("small")[1].available == 250.0
+
+
+def test_update_from_headers():
+    rate_limiter, clock = limiter()
+    rate_limiter.update_from_headers("other", {
+        "x-ratelimit-remaining-requests": "10",
+        "x-ratelimit-remaining-tokens": "0",
+        "x-ratelimit-reset-tokens": "2m59.56s"
+    })
+    requests_bucket, tokens_bucket = rate_limiter._get_buckets("other")
+    assert requests_bucket.available == 10.0
+    assert rate_limiter.headroom("other") == 0.0
+    assert rate_limiter.reserve("other", 1) == pytest.approx(179.56)
+
+
+def test_update_from_headers_ignores_bad_values_and_honours_retry_after():
+    rate_limiter, clock = limiter()
+    rate_limiter.update_from_headers("other", {"x-ratelimit-remaining-requests": "n/a", "retry-after": "7"})
+    requests_bucket, _ = rate_limiter._get_buckets("other")
+    assert requests_bucket.available == 60.0
+    assert rate_limiter.reserve("other", 1) == 7.0
+    clock.now += 7
+    assert rate_limiter.reserve("other", 1) == 0.0
@@ -0,0 +1,68 @@
+# backend/tests/test_researcher.py
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from agent import researcher
+from agent.metrics import RESEARCH_RUNS
+from agent.researcher import ResearchCancelled, arun_research_agent, run_research_agent
+
+
+class CancelAfter:
+    """Progress callback that cancels the run once a matching message is reported, as a cancelled job does"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.cancelled = False
+        self.events: List[Dict[str, Any]] = []
+
+    def __call__(self, progress: Dict[str, Any]) -> None:
+        self.events.append(progress)
+        if progress["message"].startswith(self.prefix):
+            self.cancelled = True
+        if self.cancelled:
+            raise ResearchCancelled()
+
+
+@pytest.fixture(autouse=True)
+def planner(monkeypatch):
+    async def aquery_llm(*args, **kwargs):
+        return '["first query", "second query"]'
+    monkeypatch.setattr(researcher, "query_llm", lambda *args, **kwargs: '["first query", "second query"]')
+    monkeypatch.setattr(researcher, "async_query_llm", aquery_llm)
+
+
+def run(is_async: bool, progress: CancelAfter, mode: str) -> Dict[str, Any]:
+    if is_async:
+        return asyncio.run(arun_research_agent("what is a heap", progress_callback=progress, mode=mode))
+    return run_research_agent("what is a heap", progress_callback=progress, mode=mode)
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+@pytest.mark.parametrize("mode", ["fast", "mapreduce"])
+@pytest.mark.parametrize("prefix", ["Planning", "Generated"])
+def test_cancelled_run_is_not_an_error(is_async, mode, prefix):
+    errors, cancelled = RESEARCH_RUNS.value(mode, "error"), RESEARCH_RUNS.value(mode, "cancelled")
+    progress = CancelAfter(prefix)
+
+    with pytest.raises(ResearchCancelled):
+        run(is_async, progress, mode)
+
+    assert [event["step"] for event in progress.events] == ["planning"] * len(progress.events)
+    assert RESEARCH_RUNS.value(mode, "error") == errors
+    assert RESEARCH_RUNS.value(mode, "cancelled") == cancelled + 1
+
+
+def test_job_cancellation_stops_the_run():
+    from api.scheduler import JobCancelled
+
+    class CancelJob(CancelAfter):
+        def __call__(self, progress):
+            try:
+                super().__call__(progress)
+            except ResearchCancelled:
+                raise JobCancelled()
+
+    with pytest.raises(JobCancelled):
+        run(False, CancelJob("Generated"), "fast")
@@ -0,0 +1,288 @@
+# backend/tests/test_scheduler.py
+from typing import List, Optional
+
+import pytest
+
+from agent.semantic import SemanticCache
+from api import routes
+from api.scheduler import JobCancelled, QueueFullError, ResearchJob, ResearchScheduler
+from api.tasks import TaskStore
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_scheduler(**kwargs) -> (ResearchScheduler, FakeClock):
+    # No worker threads: the tests start and run jobs on their own thread
+    clock = FakeClock()
+    kwargs.setdefault("num_workers", 0)
+    return ResearchScheduler(clock=clock, **kwargs), clock
+
+
+def start_next(scheduler: ResearchScheduler) -> Optional[ResearchJob]:
+    """Take the job a worker would pick next, as a worker does"""
+    with scheduler._condition:
+        job = scheduler._next_job()
+        if job is not None:
+            scheduler._start(job)
+        return job
+
+
+def job(task_id: str, user_id: str = "user", priority: int = 0, key=None, ran: Optional[List[str]] = None,
+        target=None) -> ResearchJob:
+    def record(running_job):
+        ran.append(running_job.task_id)
+    return ResearchJob(task_id, user_id, target or (record if ran is not None else lambda _: None),
+                       priority=priority, key=key)
+
+
+def test_lower_priority_runs_first_and_ties_in_submission_order():
+    scheduler, _ = make_scheduler(max_per_user=4)
+    assert scheduler.submit(job("a", priority=10)) == 1
+    assert scheduler.submit(job("b")) == 1
+    assert scheduler.submit(job("c", priority=10)) == 3
+    assert scheduler.submit(job("d")) == 2
+    assert [start_next(scheduler).task_id for _ in range(4)] == ["b", "d", "a", "c"]
+    assert start_next(scheduler) is None
+
+
+def test_per_user_cap_skips_to_other_users():
+    scheduler, _ = make_scheduler(max_per_user=1)
+    for task_id, user_id in (("a1", "a"), ("a2", "a"), ("b1", "b")):
+        scheduler.submit(job(task_id, user_id))
+    first = start_next(scheduler)
+    assert first.task_id == "a1"
+    assert start_next(scheduler).task_id == "b1"
+    assert start_next(scheduler) is None
+    scheduler._execute(first)
+    assert start_next(scheduler).task_id == "a2"
+    assert scheduler.stats()["running"] == 2
+
+
+def test_full_queue_rejects_but_still_coalesces():
+    scheduler, _ = make_scheduler(max_queue_size=2)
+    scheduler.submit(job("a", key="same"))
+    scheduler.submit(job("b"))
+    with pytest.raises(QueueFullError):
+        scheduler.submit(job("c"))
+    joined = job("d", key="same")
+    assert scheduler.submit(joined) == 1
+    assert joined.coalesced_into is scheduler.get_job("a")
+    stats = scheduler.stats()
+    assert (stats["rejected"], stats["coalesced"], stats["queue_depth"]) == (1, 1, 2)
+
+
+def test_coalesced_tasks_share_one_run():
+    scheduler, _ = make_scheduler()
+    ran = []
+    first = job("a", "alice", key="same", ran=ran)
+    scheduler.submit(first)
+    start_next(scheduler)
+    # Joining a running job reports position 0
+    assert scheduler.submit(job("b", "bob", key="same", ran=ran)) == 0
+    assert scheduler.get_job("b") is first
+    assert first.subscribers() == {"a": "alice", "b": "bob"}
+    scheduler._execute(first)
+    assert ran == ["a"]
+    assert first.status == "completed"
+    assert scheduler.get_job("a") is None and scheduler.get_job("b") is None
+    # The key is free again, so the next submission runs afresh
+    assert scheduler.submit(job("c", key="same")) == 1
+    assert scheduler.get_job("c") is not first
+
+
+@pytest.mark.parametrize("coalesce, key", [(False, "same"), (True, None)])
+def test_no_coalescing_without_a_key_or_when_disabled(coalesce, key):
+    scheduler, _ = make_scheduler(coalesce=coalesce)
+    scheduler.submit(job("a", key=key))
+    assert scheduler.submit(job("b", key=key)) == 2
+
+
+def test_sealed_job_takes_no_new_subscribers():
+    scheduler, _ = make_scheduler()
+    first = job("a", key="same")
+    scheduler.submit(first)
+    start_next(scheduler)
+    first.seal()
+    assert scheduler.submit(job("b", key="same")) == 1
+    assert scheduler.get_job("b") is not first
+
+
+def test_cancel_while_queued():
+    scheduler, _ = make_scheduler()
+    ran = []
+    queued = job("a", key="same", ran=ran)
+    scheduler.submit(queued)
+    scheduler.submit(job("b", key="same"))
+    # One of two subscribers leaving keeps the job
+    assert scheduler.cancel("b")
+    assert not queued.cancelled and scheduler.position("a") == 1
+    assert scheduler.cancel("a")
+    assert queued.status == "cancelled"
+    assert scheduler.stats()["queue_depth"] == 0
+    assert start_next(scheduler) is None
+    assert ran == []
+    assert not scheduler.cancel("a")
+    assert scheduler.stats()["cancelled"] == 1
+
+
+def test_cancel_while_running_stops_at_the_next_checkpoint():
+    scheduler, _ = make_scheduler()
+    checkpoints = []
+
+    def target(running_job):
+        running_job.raise_if_cancelled()
+        checkpoints.append("before")
+        scheduler.cancel(running_job.task_id)
+        running_job.raise_if_cancelled()
+        checkpoints.append("after")
+
+    running = job("a", target=target)
+    scheduler.submit(running)
+    start_next(scheduler)
+    scheduler._execute(running)
+    assert checkpoints == ["before"]
+    assert running.status == "cancelled"
+    assert scheduler.stats()["running"] == 0
+
+
+def test_cancelled_run_is_in_progress_until_it_stops():
+    scheduler, _ = make_scheduler()
+    in_progress = []
+
+    def target(running_job):
+        scheduler.cancel(running_job.task_id)
+        in_progress.append(scheduler.run_in_progress(running_job.task_id))
+
+    running = job("a", target=target)
+    scheduler.submit(running)
+    assert scheduler.run_in_progress("a")
+    start_next(scheduler)
+    scheduler._execute(running)
+    assert in_progress == [True]
+    assert scheduler.get_job("a") is None
+    assert not scheduler.run_in_progress("a")
+
+
+def test_run_stays_in_progress_while_other_subscribers_share_it():
+    scheduler, _ = make_scheduler()
+    first = job("a", key="same")
+    scheduler.submit(first)
+    scheduler.submit(job("b", key="same"))
+    start_next(scheduler)
+    scheduler.cancel("a")
+    assert scheduler.run_in_progress("a")
+    scheduler._execute(first)
+    assert not scheduler.run_in_progress("a")
+
+
+def test_failed_job_is_recorded_and_frees_its_slot():
+    scheduler, _ = make_scheduler(max_per_user=1)
+
+    def target(_):
+        raise RuntimeError("upstream down")
+
+    failing = job("a", target=target)
+    scheduler.submit(failing)
+    scheduler.submit(job("b"))
+    scheduler._execute(start_next(scheduler))
+    assert failing.status == "error"
+    assert scheduler.stats()["failed"] == 1
+    assert start_next(scheduler).task_id == "b"
+
+
+def test_wait_times_use_the_scheduler_clock():
+    scheduler, clock = make_scheduler()
+    scheduler.submit(job("a"))
+    clock.now += 3
+    scheduler.submit(job("b"))
+    clock.now += 2
+    assert scheduler.stats()["oldest_wait_seconds"] == 5
+    start_next(scheduler)
+    clock.now += 5
+    start_next(scheduler)
+    stats = scheduler.stats()
+    assert stats["avg_wait_seconds"] == 6
+    assert stats["max_wait_seconds"] == 7
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    """Route-level fakes for finish_research_job: a fresh task store, semantic cache and history"""
+    tasks = TaskStore(ttl=60, max_entries=0)
+    cache = SemanticCache(max_entries=10)
+    saved = []
+
+    def save_research_query(user_id, query, result):
+        entry = {"id": f"entry-{len(saved)}", "user_id": user_id, "results": result}
+        saved.append(entry)
+        return entry
+
+    monkeypatch.setattr(routes, "task_store", tasks)
+    monkeypatch.setattr(routes, "semantic_cache", cache)
+    monkeypatch.setattr(routes, "save_research_query", save_research_query)
+    monkeypatch.setattr(routes, "SEMANTIC_CACHE_ENABLED", True)
+    return tasks, cache, saved
+
+
+def test_finish_delivers_to_every_subscriber(finished):
+    tasks, cache, saved = finished
+    scheduler, _ = make_scheduler()
+    result = {"status": "completed", "research": "findings"}
+
+    def target(running_job):
+        routes.finish_research_job(running_job, "EV market trends", "model", "standard", result)
+
+    first = job("a", "alice", key="same", target=target)
+    for task_id, user_id in (("a", "alice"), ("b", "bob")):
+        tasks.register(task_id, user_id, "EV market trends")
+    scheduler.submit(first)
+    scheduler.submit(job("b", "bob", key="same"))
+    scheduler._execute(start_next(scheduler))
+
+    assert [entry["user_id"] for entry in saved] == ["alice", "bob"]
+    assert tasks.get("a")["history_id"] == "entry-0" and tasks.get("b")["history_id"] == "entry-1"
+    assert cache.lookup("EV market trends", "model", "standard")["history_id"] == "entry-0"
+
+
+def test_cancel_between_last_checkpoint_and_seal(finished, caplog):
+    tasks, cache, saved = finished
+    scheduler, _ = make_scheduler()
+    result = {"status": "completed", "research": "findings"}
+
+    def target(running_job):
+        running_job.raise_if_cancelled()  # the run's last progress report passes
+        scheduler.cancel("a")  # the only subscriber cancels before the result is delivered
+        routes.finish_research_job(running_job, "EV market trends", "model", "standard", result)
+
+    running = job("a", target=target)
+    tasks.register("a", "user", "EV market trends")
+    scheduler.submit(running)
+    scheduler._execute(start_next(scheduler))
+
+    # The job counts as cancelled either way, so check that delivering the result did not raise
+    assert "failed" not in caplog.text
+    assert running.status == "cancelled"
+    assert saved == []
+    assert cache.lookup("EV market trends", "model", "standard") is None
+
+
+def test_cancelled_job_finishes_its_remaining_subscribers(finished):
+    tasks, _, _ = finished
+    scheduler, _ = make_scheduler()
+
+    def target(running_job):
+        raise JobCancelled(running_job.task_id)
+
+    running = job("a", key="same", target=target)
+    for task_id in ("a", "b"):
+        tasks.register(task_id, "user", "query")
+    scheduler.submit(running)
+    scheduler.submit(job("b", key="same"))
+    routes.fail_research_job(running, JobCancelled("a"))
+    assert tasks.get("a")["status"] == "cancelled" and tasks.get("b")["status"] == "cancelled"
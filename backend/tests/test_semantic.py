@@ -0,0 +1,96 @@
+# backend/tests/test_semantic.py
+import numpy as np
+import pytest
+
+from agent.semantic import SemanticCache, query_features, query_relations, query_words
+
+# Unrelated queries, so the IDF weights resemble a populated index
+BACKGROUND = [
+    "solar panel efficiency",
+    "history of the roman empire",
+    "best hiking trails in colorado",
+    "quantum computing basics",
+    "coffee health effects"
+]
+
+
+def cache_with(query: str) -> SemanticCache:
+    cache = SemanticCache(max_entries=20)
+    for background in BACKGROUND:
+        cache.add(background, "model", "standard", {"query": background})
+    cache.add(query, "model", "standard", {"query": query})
+    return cache
+
+
+@pytest.mark.parametrize("indexed, asked", [
+    ("electric vehicle market trends in 2026", "EV market trends 2026"),
+    ("electric vehicle market trends 2026", "trends in the electric vehicles market for 2026"),
+    ("impact of AI on the job market", "how AI impacts the job market"),
+    ("best programming languages for beginners", "best programming language for a beginner")
+])
+def test_paraphrase_matches(indexed, asked):
+    match = cache_with(indexed).lookup(asked, "model", "standard")
+    assert match is not None
+    assert match["query"] == indexed
+
+
+@pytest.mark.parametrize("indexed, asked", [
+    ("impact of AI on jobs", "impact of jobs on AI"),
+    ("china exports to the us", "us exports to china"),
+    ("electric vehicle market trends 2025", "electric vehicle market trends 2026"),
+    ("electric vehicle market trends 2026", "electric vehicle battery trends 2026")
+])
+def test_different_question_does_not_match(indexed, asked):
+    assert cache_with(indexed).lookup(asked, "model", "standard") is None
+
+
+def test_other_model_or_mode_does_not_match():
+    cache = cache_with("EV market trends 2026")
+    assert cache.lookup("EV market trends 2026", "other-model", "standard") is None
+    assert cache.lookup("EV market trends 2026", "model", "fast") is None
+
+
+@pytest.mark.parametrize("query, words", [
+    ("EV market trends", ["ev", "market", "trend"]),
+    ("Electric Vehicles and EVs", ["ev", "ev"]),
+    ("artificial intelligence in the United States", ["ai", "us"]),
+    ("the state of machine learning", ["state", "ml"])
+])
+def test_query_words(query, words):
+    assert query_words(query) == words
+
+
+def test_word_order_changes_features():
+    assert not np.array_equal(query_features("impact of AI on jobs"), query_features("impact of jobs on AI"))
+    assert query_relations("impact of AI on jobs") == {("impact", "ai"), ("impact", "job"), ("ai", "job")}
+    assert query_relations("EV market trends") == frozenset()
+
+
+def test_vectors_allocated_on_first_add():
+    cache = SemanticCache(max_entries=10)
+    assert cache._vectors is None
+    assert cache.lookup("anything", "model", "standard") is None
+    cache.add("EV market trends", "model", "standard", {})
+    assert cache._vectors.shape == (10, cache.dim)
+
+
+def test_discarded_history_is_not_served():
+    cache = cache_with("EV market trends 2026")
+    cache.add("impact of AI on jobs", "model", "standard", {}, history_id="entry-1")
+    entries = cache.stats()["entries"]
+
+    assert cache.discard(["entry-1", "unknown"]) == 1
+    assert cache.lookup("impact of AI on jobs", "model", "standard") is None
+    assert cache.lookup("EV market trends 2026", "model", "standard") is not None
+    assert cache.stats()["entries"] == entries - 1
+    assert cache._document_frequency.sum() == sum(np.count_nonzero(vector) for vector in cache._vectors)
+
+
+def test_discarded_slot_is_reused_by_the_ring_buffer():
+    cache = SemanticCache(max_entries=2)
+    cache.add("EV market trends", "model", "standard", {}, history_id="a")
+    cache.discard(["a"])
+    cache.add("impact of AI on jobs", "model", "standard", {}, history_id="b")
+    cache.add("coffee health effects", "model", "standard", {}, history_id="c")
+    cache.add("quantum computing basics", "model", "standard", {}, history_id="d")
+    assert cache.stats()["entries"] == 2
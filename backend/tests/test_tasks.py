@@ -0,0 +1,107 @@
+# backend/tests/test_tasks.py
+from api.tasks import TaskStore
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def store(**kwargs) -> (TaskStore, FakeClock):
+    clock = FakeClock()
+    kwargs.setdefault("ttl", 10)
+    kwargs.setdefault("max_entries", 0)
+    kwargs.setdefault("sweep_interval", 0)
+    return TaskStore(clock=clock, **kwargs), clock
+
+
+def test_finished_task_expires_after_ttl():
+    tasks, clock = store()
+    tasks.register("a", "user", "query")
+    tasks.finish("a", "completed", result={"ok": True})
+    clock.now += 10
+    assert tasks.get("a")["status"] == "completed"
+    clock.now += 1
+    assert tasks.get("a") is None
+    assert tasks.stats()["expired"] == 1
+
+
+def test_unfinished_task_never_expires():
+    tasks, clock = store()
+    tasks.register("a", "user", "query")
+    clock.now += 10 ** 6
+    tasks.register("b", "user", "query")
+    assert tasks.get("a")["status"] == "starting"
+
+
+def test_sweep_expires_in_finish_order():
+    tasks, clock = store()
+    for task_id in ("a", "b", "c"):
+        tasks.register(task_id, "user", "query")
+    # Finished out of registration order: c, then a, then b
+    for task_id in ("c", "a", "b"):
+        tasks.finish(task_id, "completed")
+        clock.now += 5
+    # c finished 15s ago and a 10s ago (still within the TTL)
+    tasks.register("d", "user", "query")
+    assert tasks.stats() == {"tasks": 3, "active": 1, "finished": 2, "expired": 1, "evicted": 0}
+    assert tasks.get("c") is None and tasks.get("a") is not None
+
+
+def test_sweep_runs_at_most_once_per_interval():
+    tasks, clock = store(sweep_interval=60)
+    tasks.register("a", "user", "query")  # sweeps; the next sweep is due in 60s
+    tasks.finish("a", "completed")
+    clock.now += 61
+    tasks.register("b", "user", "query")  # sweeps; a expired
+    tasks.register("c", "user", "query")
+    tasks.finish("c", "completed")
+    clock.now += 11
+    tasks.register("d", "user", "query")  # within the interval; c stays until the next sweep
+    assert tasks.stats()["expired"] == 1
+    assert tasks.stats()["tasks"] == 3
+    # Reads still hide expired tasks between sweeps
+    assert tasks.get("c") is None
+
+
+def test_cap_evicts_oldest_finished_before_unfinished():
+    tasks, clock = store(max_entries=3)
+    for task_id in ("a", "b", "c"):
+        tasks.register(task_id, "user", "query")
+    tasks.finish("b", "error")
+    tasks.finish("a", "completed")
+    tasks.register("d", "user", "query")
+    assert tasks.get("b") is None
+    assert tasks.get("a") is not None
+    tasks.register("e", "user", "query")
+    assert tasks.get("a") is None
+    # Only unfinished tasks left: the oldest registered goes
+    tasks.register("f", "user", "query")
+    assert tasks.get("c") is None
+    assert tasks.stats()["evicted"] == 3
+
+
+def test_reregistered_task_is_unfinished_again():
+    tasks, clock = store()
+    tasks.register("a", "user", "query")
+    tasks.finish("a", "error")
+    tasks.register("a", "user", "query")
+    clock.now += 100
+    tasks.register("b", "user", "query")
+    assert tasks.get("a")["status"] == "starting"
+    assert tasks.update("a", status="running", progress=40)
+    tasks.finish("a", "completed")
+    assert tasks.get("a")["progress"] == 100
+    assert tasks.stats()["finished"] == 1
+
+
+def test_finish_is_applied_once():
+    tasks, clock = store()
+    tasks.register("a", "user", "query")
+    tasks.finish("a", "cancelled")
+    tasks.finish("a", "completed")
+    assert tasks.get("a")["status"] == "cancelled"
+    assert not tasks.update("a", progress=50)
@@ -12,23 +12,37 @@ function App() {
   const [hasCompleted, setHasCompleted] = useState(false);
   const [history, setHistory] = useState([]);
   const [isLoadingHistory, setIsLoadingHistory] = useState(false);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [progressData, setProgressData] = useState(null);
   const [currentTaskId, setCurrentTaskId] = useState(null);
+  const [streamingText, setStreamingText] = useState(null);
 
   const refreshHistory = useCallback(async () => {
     try {
-      const updatedHistory = await researchService.getHistory();
-      setHistory(updatedHistory);
-      
-      if (currentTaskId && updatedHistory.length > 0) {
-        setResults(updatedHistory[0].results);
-        setIsLoading(false);
-        setHasCompleted(true);
-      }
+      const page = await researchService.getHistory();
+      setHistory(page.history);
+      setHistoryCursor(page.next_before);
     } catch (error) {
       console.error('Failed to refresh history:', error);
     }
-  }, [currentTaskId]);
+  }, []);
+
+  const loadTaskResult = useCallback(async (taskId) => {
+    try {
+      // The completed event can arrive just before the result is stored, so wait briefly for it
+      const task = await researchService.getResearchTask(taskId, 30);
+      if (task.result) {
+        setResults(task.result);
+      }
+    } catch (error) {
+      console.error('Failed to load research result:', error);
+    } finally {
+      setStreamingText(null);
+      setIsLoading(false);
+      setHasCompleted(true);
+    }
+    refreshHistory();
+  }, [refreshHistory]);
 
   // Load history on component mount
   useEffect(() => {
@@ -36,8 +50,9 @@ function App() {
       if (localStorage.getItem('user_id')) {
         try {
           setIsLoadingHistory(true);
-          const history = await researchService.getHistory();
-          setHistory(history);
+          const page = await researchService.getHistory();
+          setHistory(page.history);
+          setHistoryCursor(page.next_before);
         } catch (error) {
           console.error('Failed to load history:', error);
         } finally {
@@ -57,28 +72,46 @@ function App() {
       setProgressData(data);
       
       if (data.status === 'completed') {
-        refreshHistory();
+        loadTaskResult(currentTaskId);
+      } else if (data.status === 'cancelled' || data.status === 'error') {
+        setIsLoading(false);
+        setHasCompleted(true);
       }
     });
     
+    // Show the draft and final research as they are generated; a new stage replaces the text
+    const unsubscribeChunks = researchService.subscribeToChunks(currentTaskId, (data) => {
+      setStreamingText((previous) => (
+        previous && previous.stage === data.stage
+          ? { stage: data.stage, text: previous.text + data.text }
+          : { stage: data.stage, text: data.text }
+      ));
+    });
+    
     return () => {
       unsubscribe();
+      unsubscribeChunks();
     };
-  }, [currentTaskId, refreshHistory]);
+  }, [currentTaskId, loadTaskResult]);
 
-  const handleStartResearch = async (query, model) => {
+  const handleStartResearch = async (query, model, mode, forceRefresh) => {
     try {
       setIsLoading(true);
       setHasCompleted(false);
       setResults(null);
       setProgressData(null);
+      setStreamingText(null);
       
-      const response = await researchService.startResearch(query, model);
+      const response = await researchService.startResearch(query, model, mode, forceRefresh);
       setCurrentTaskId(response.task_id);
       
       setProgressData({
-        status: 'starting',
-        message: `Starting research with ${model}...`,
+        status: response.status,
+        message: response.semantic_match
+          ? `Answered from earlier research on "${response.semantic_match.query}"`
+          : response.queue_position > 1
+            ? `Queued at position ${response.queue_position}...`
+            : `Starting research with ${model}...`,
         progress: 0
       });
     } catch (error) {
@@ -91,16 +124,45 @@ function App() {
     }
   };
 
-  const handleSelectQuery = (historyItem) => {
-    setResults(historyItem.results);
-    setProgressData(null);
-    setCurrentTaskId(null);
+  const handleCancelResearch = async () => {
+    if (!currentTaskId) return;
+    try {
+      await researchService.cancelResearch(currentTaskId);
+    } catch (error) {
+      console.error('Failed to cancel research:', error);
+    }
+  };
+
+  const handleSelectQuery = async (historyItem) => {
+    try {
+      const entry = await researchService.getHistoryEntry(historyItem.id);
+      setResults(entry.results);
+      setProgressData(null);
+      setCurrentTaskId(null);
+    } catch (error) {
+      console.error('Failed to load history entry:', error);
+    }
+  };
+
+  const handleLoadMoreHistory = async () => {
+    if (!historyCursor) return;
+    try {
+      setIsLoadingHistory(true);
+      const page = await researchService.getHistory(historyCursor);
+      setHistory((previous) => [...previous, ...page.history]);
+      setHistoryCursor(page.next_before);
+    } catch (error) {
+      console.error('Failed to load more history:', error);
+    } finally {
+      setIsLoadingHistory(false);
+    }
   };
 
   const handleClearHistory = async () => {
     try {
       await researchService.clearHistory();
       setHistory([]);
+      setHistoryCursor(null);
     } catch (error) {
       console.error('Failed to clear history:', error);
     }
@@ -130,6 +192,7 @@ function App() {
                 history={history}
                 onSelectQuery={handleSelectQuery}
                 onClearHistory={handleClearHistory}
+                onLoadMore={historyCursor ? handleLoadMoreHistory : null}
                 isLoading={isLoading || isLoadingHistory}
               />
             </div>
@@ -140,7 +203,13 @@ function App() {
                 onNewChat={handleNewChat}
                 hasCompleted={hasCompleted}
               />
-              {progressData && <ResearchProgress progressData={progressData} />}
+              {progressData && (
+                <ResearchProgress
+                  progressData={progressData}
+                  streamingText={isLoading ? streamingText : null}
+                  onCancel={isLoading ? handleCancelResearch : null}
+                />
+              )}
               <ResearchResults 
                 results={results} 
                 isLoading={isLoading && !progressData} 
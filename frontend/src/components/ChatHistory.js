@@ -1,7 +1,7 @@
 // frontend/src/components/ChatHistory.js
 import React from 'react';
 
-const ChatHistory = ({ history, onSelectQuery, onClearHistory, isLoading }) => {
+const ChatHistory = ({ history, onSelectQuery, onClearHistory, onLoadMore, isLoading }) => {
   if (history.length === 0) {
     return (
       <div className="bg-white p-6 rounded-lg shadow-md mb-8">
@@ -40,6 +40,15 @@ const ChatHistory = ({ history, onSelectQuery, onClearHistory, isLoading }) => {
             </li>
           ))}
         </ul>
+        {onLoadMore && (
+          <button
+            onClick={onLoadMore}
+            disabled={isLoading}
+            className="w-full mt-2 px-3 py-1 text-sm text-blue-600 hover:text-blue-800 focus:outline-none"
+          >
+            Load more
+          </button>
+        )}
       </div>
     </div>
   );
@@ -8,6 +8,9 @@ const ResearchForm = ({ onSubmit, isLoading, onNewChat, hasCompleted }) => {
   const [models, setModels] = useState([]);
   const [loadingModels, setLoadingModels] = useState(true);
   const [modelError, setModelError] = useState('');
+  const [mode, setMode] = useState('');
+  const [modes, setModes] = useState([]);
+  const [forceRefresh, setForceRefresh] = useState(false);
 
   useEffect(() => {
     const fetchModels = async () => {
@@ -15,6 +18,8 @@ const ResearchForm = ({ onSubmit, isLoading, onNewChat, hasCompleted }) => {
         const data = await researchService.getModels();
         setModels(data.models || []);
         setModel(data.default || '');
+        setModes(data.modes || []);
+        setMode(data.default_mode || '');
       } catch (error) {
         console.error('Error fetching models:', error);
         setModelError('Failed to load models. Please refresh the page.');
@@ -29,7 +34,7 @@ const ResearchForm = ({ onSubmit, isLoading, onNewChat, hasCompleted }) => {
   const handleSubmit = (e) => {
     e.preventDefault();
     if (query.trim() && model) {
-      onSubmit(query, model);
+      onSubmit(query, model, mode || undefined, forceRefresh);
     }
   };
 
@@ -110,6 +115,45 @@ const ResearchForm = ({ onSubmit, isLoading, onNewChat, hasCompleted }) => {
           )}
         </div>
         
+        {modes.length > 0 && (
+          <div className="mb-4">
+            <label htmlFor="mode" className="block text-sm font-medium text-gray-700 mb-1">
+              Research Depth
+            </label>
+            <select
+              id="mode"
+              name="mode"
+              className={`w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 ${
+                (isLoading || hasCompleted) ? 'bg-gray-100' : ''
+              }`}
+              value={mode}
+              onChange={(e) => setMode(e.target.value)}
+              disabled={isLoading || hasCompleted}
+            >
+              {modes.map((modeName) => (
+                <option key={modeName} value={modeName}>
+                  {modeName.charAt(0).toUpperCase() + modeName.slice(1)}
+                </option>
+              ))}
+            </select>
+          </div>
+        )}
+        
+        <div className="mb-4 flex items-center">
+          <input
+            id="forceRefresh"
+            name="forceRefresh"
+            type="checkbox"
+            className="h-4 w-4 text-blue-600 border-gray-300 rounded"
+            checked={forceRefresh}
+            onChange={(e) => setForceRefresh(e.target.checked)}
+            disabled={isLoading || hasCompleted}
+          />
+          <label htmlFor="forceRefresh" className="ml-2 block text-sm text-gray-700">
+            Force fresh research (ignore earlier results for similar questions)
+          </label>
+        </div>
+        
         <button
           type="submit"
           disabled={isLoading || loadingModels || !model || hasCompleted}
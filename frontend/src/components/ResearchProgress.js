@@ -1,7 +1,7 @@
 // frontend/src/components/ResearchProgress.js
 import React from 'react';
 
-const ResearchProgress = ({ progressData }) => {
+const ResearchProgress = ({ progressData, streamingText, onCancel }) => {
   // Don't render if no progress data
   if (!progressData) return null;
 
@@ -22,6 +22,9 @@ const ResearchProgress = ({ progressData }) => {
         return 'bg-green-500';
       case 'error':
         return 'bg-red-500';
+      case 'queued':
+      case 'cancelled':
+        return 'bg-gray-400';
       default:
         return 'bg-gray-500';
     }
@@ -35,7 +38,17 @@ const ResearchProgress = ({ progressData }) => {
 
   return (
     <div className="bg-white p-6 rounded-lg shadow-md mb-6">
-      <h2 className="text-xl font-bold mb-4 text-gray-800">Research Progress</h2>
+      <div className="flex justify-between items-center mb-4">
+        <h2 className="text-xl font-bold text-gray-800">Research Progress</h2>
+        {onCancel && (
+          <button
+            onClick={onCancel}
+            className="px-3 py-1 text-sm text-red-600 hover:text-red-800 focus:outline-none"
+          >
+            Cancel
+          </button>
+        )}
+      </div>
       
       <div className="mb-2 flex justify-between">
         <span className="text-sm font-medium text-gray-700">
@@ -55,6 +68,17 @@ const ResearchProgress = ({ progressData }) => {
       
       <p className="mt-2 text-sm text-gray-600">{message}</p>
       
+      {streamingText && streamingText.text && (
+        <div className="mt-4">
+          <p className="text-xs font-medium text-gray-500 mb-1">
+            {streamingText.stage === 'reflecting' ? 'Final research (live)' : 'Draft research (live)'}
+          </p>
+          <div className="max-h-64 overflow-y-auto p-3 bg-gray-50 border border-gray-200 rounded text-sm text-gray-700 whitespace-pre-wrap">
+            {streamingText.text}
+          </div>
+        </div>
+      )}
+      
       {status === 'error' && (
         <div className="mt-4 p-3 bg-red-100 border border-red-200 text-red-700 rounded">
           {message}
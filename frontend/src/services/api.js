@@ -64,11 +64,12 @@ export const researchService = {
    * Start a research task
    * @param {string} query - The research query
    * @param {string} model - The model to use
+   * @param {string} [mode] - Pipeline mode ("fast", "standard", "thorough" or "mapreduce")
    * @returns {Promise} - Promise with the task ID and initial status
    */
-  startResearch: async (query, model) => {
+  startResearch: async (query, model, mode, forceRefresh = false) => {
     try {
-      const response = await apiClient.post('/research', { query, model });
+      const response = await apiClient.post('/research', { query, model, mode, force_refresh: forceRefresh });
       
       // Store user ID if returned
       if (response.data.user_id) {
@@ -82,6 +83,21 @@ export const researchService = {
     }
   },
   
+  /**
+   * Cancel a queued or running research task
+   * @param {string} taskId - The task ID
+   * @returns {Promise} - Promise with the cancelled task status
+   */
+  cancelResearch: async (taskId) => {
+    try {
+      const response = await apiClient.post(`/research/${taskId}/cancel`);
+      return response.data;
+    } catch (error) {
+      console.error('Error cancelling research:', error);
+      throw error;
+    }
+  },
+  
   /**
    * Subscribe to research progress updates
    * @param {string} taskId - The task ID
@@ -111,19 +127,75 @@ export const researchService = {
   },
   
   /**
-   * Get research history
-   * @returns {Promise} - Promise with research history
+   * Subscribe to research text streamed while it is being generated
+   * @param {string} taskId - The task ID
+   * @param {Function} callback - Called with {stage, text} for each batch of text
+   * @returns {Function} - Unsubscribe function
    */
-  getHistory: async () => {
+  subscribeToChunks: (taskId, callback) => {
+    const socket = getSocket();
+    
+    const handleChunk = (data) => {
+      if (data.task_id === taskId) {
+        callback(data);
+      }
+    };
+    
+    socket.on('research_chunk', handleChunk);
+    
+    return () => {
+      socket.off('research_chunk', handleChunk);
+    };
+  },
+  
+  /**
+   * Get the state of a research task, including its result once finished
+   * @param {string} taskId - ID of the research task
+   * @param {number} wait - Seconds the server may hold the request until the task finishes
+   * @returns {Promise} - Promise with the task state
+   */
+  getResearchTask: async (taskId, wait = 0) => {
+    try {
+      const params = wait ? { wait } : {};
+      const response = await apiClient.get(`/research/${taskId}`, { params });
+      return response.data;
+    } catch (error) {
+      console.error('Error getting research task:', error);
+      throw error;
+    }
+  },
+  
+  /**
+   * Get a page of research history summaries (newest first)
+   * @param {string} before - Cursor from the previous page's next_before
+   * @returns {Promise} - Promise with { history, next_before }
+   */
+  getHistory: async (before = null) => {
     try {
-      const response = await apiClient.get('/history');
-      return response.data.history;
+      const params = before ? { before } : {};
+      const response = await apiClient.get('/history', { params });
+      return response.data;
     } catch (error) {
       console.error('Error getting history:', error);
       throw error;
     }
   },
   
+  /**
+   * Get a single history entry with its full results
+   * @param {string} entryId - ID of the history entry
+   * @returns {Promise} - Promise with the history entry
+   */
+  getHistoryEntry: async (entryId) => {
+    try {
+      const response = await apiClient.get(`/history/${entryId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error getting history entry:', error);
+      throw error;
+    }
+  },
+  
   /**
    * Clear research history
    * @returns {Promise} - Promise with success status